@@ -0,0 +1,172 @@
+import array
+import json
+import os
+
+import numpy
+
+# One append-only file per column, in array typecodes numpy reads directly
+COLUMNS = (
+    ("question_id", "q"),
+    ("player", "i"),
+    ("chosen", "b"),
+    ("latency", "f"),
+    ("correct", "B"),
+)
+PLAYERS_FILE = "players.jsonl"
+# Chosen answers are stored as 0 for the correct one and 1-3 for the
+# incorrect ones in bank order; anything else a client sends is -1.
+CHOICES = 4
+NOT_AN_ANSWER = -1
+# Latencies stay under this, so id * span + latency sorts by id, then latency
+LATENCY_SPAN = 64.0
+
+
+def answer_index(question, chosen_answer):
+    if chosen_answer == question["correct_answer"]:
+        return 0
+    try:
+        return question["incorrect_answers"].index(chosen_answer) + 1
+    except ValueError:
+        return NOT_AN_ANSWER
+
+
+class AnswerStore:
+    def __init__(self, directory=None):
+        self.directory = directory
+        self.columns = {name: array.array(typecode) for name, typecode in COLUMNS}
+        self.players = []
+        self.player_ids = {}
+        # The history on disk is only read once stats are asked for; until
+        # then self.columns holds just the answers not yet flushed, which
+        # start at row first_row of the whole store.
+        self.loaded = directory is None
+        self.first_row = 0
+        self.saved_rows = 0
+        self.saved_players = 0
+        if directory is not None:
+            self.open()
+
+    def __len__(self):
+        return self.first_row + len(self.columns["question_id"])
+
+    def column_path(self, name):
+        return os.path.join(self.directory, f"{name}.bin")
+
+    def open(self):
+        os.makedirs(self.directory, exist_ok=True)
+        sizes = {}
+        for name, column in self.columns.items():
+            path = self.column_path(name)
+            sizes[name] = os.path.getsize(path) if os.path.exists(path) else 0
+        # A crash between column writes leaves some columns a row ahead
+        rows = min(
+            sizes[name] // column.itemsize for name, column in self.columns.items()
+        )
+        for name, column in self.columns.items():
+            if sizes[name] != rows * column.itemsize:
+                os.truncate(self.column_path(name), rows * column.itemsize)
+        path = os.path.join(self.directory, PLAYERS_FILE)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as file:
+                for line in file:
+                    self.player_id(json.loads(line))
+        self.first_row = self.saved_rows = rows
+        self.saved_players = len(self.players)
+
+    def load(self):
+        if self.loaded:
+            return
+        columns = {}
+        for name, column in self.columns.items():
+            loaded = columns[name] = array.array(column.typecode)
+            if self.saved_rows:
+                with open(self.column_path(name), "rb") as file:
+                    loaded.frombytes(file.read(self.saved_rows * column.itemsize))
+            loaded.extend(column)
+        self.columns = columns
+        self.first_row = 0
+        self.loaded = True
+
+    def player_id(self, name):
+        player = self.player_ids.get(name)
+        if player is None:
+            player = self.player_ids[name] = len(self.players)
+            self.players.append(name)
+        return player
+
+    def add_answer(self, question, player_name, chosen_answer, latency):
+        chosen = answer_index(question, chosen_answer)
+        columns = self.columns
+        columns["question_id"].append(question["id"])
+        columns["player"].append(self.player_id(player_name))
+        columns["chosen"].append(chosen)
+        columns["latency"].append(min(max(0.0, latency), LATENCY_SPAN / 2))
+        columns["correct"].append(chosen == 0)
+
+    def flush(self):
+        if self.directory is None:
+            return
+        rows = len(self)
+        for name, column in self.columns.items():
+            with open(self.column_path(name), "ab") as file:
+                file.write(memoryview(column)[self.saved_rows - self.first_row :])
+        with open(
+            os.path.join(self.directory, PLAYERS_FILE), "a", encoding="utf-8"
+        ) as file:
+            for name in self.players[self.saved_players :]:
+                file.write(json.dumps(name) + "\n")
+        self.saved_rows = rows
+        self.saved_players = len(self.players)
+        if not self.loaded:
+            for column in self.columns.values():
+                del column[:]
+            self.first_row = rows
+
+    def view(self, name):
+        # Zero-copy; released before the store is appended to again
+        column = self.columns[name]
+        return numpy.frombuffer(column, dtype=column.typecode)
+
+    def question_stats(self):
+        # Per question: answer count, share correct, median latency and how
+        # often each answer was picked, in the order answer_index numbers them.
+        self.load()
+        if not len(self):
+            return []
+        question_ids = self.view("question_id")
+        chosen = self.view("chosen")
+        answers = numpy.bincount(question_ids)
+        correct = numpy.bincount(question_ids, weights=self.view("correct"))
+        picked = chosen >= 0
+        picks = numpy.bincount(
+            question_ids[picked] * CHOICES + chosen[picked],
+            minlength=len(answers) * CHOICES,
+        ).reshape(-1, CHOICES)
+        # One float sort on a packed key instead of a much slower lexsort;
+        # ids stay exact and latencies lose well under a microsecond.
+        keys = question_ids * LATENCY_SPAN + self.view("latency")
+        keys.sort()
+        asked = numpy.flatnonzero(answers)
+        counts = answers[asked]
+        starts = numpy.cumsum(answers)[asked] - counts
+        base = asked * LATENCY_SPAN
+        medians = (
+            keys[starts + (counts - 1) // 2] + keys[starts + counts // 2]
+        ) / 2 - base
+        rates = picks[asked] / counts[:, None]
+        return [
+            {
+                "question_id": question_id,
+                "answers": count,
+                "correct_rate": right / count,
+                "median_latency": median,
+                "pick_rates": tuple(pick_rates),
+            }
+            for question_id, count, right, median, pick_rates in zip(
+                asked.tolist(),
+                counts.tolist(),
+                correct[asked].tolist(),
+                medians.tolist(),
+                rates.tolist(),
+            )
+        ]
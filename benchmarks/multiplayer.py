@@ -0,0 +1,135 @@
+# Answer-ingest latency of the networked game server on loopback.
+# The simulated clients share the server's event loop, so round trips under a
+# burst (--think 0) are an upper bound on what separate devices would see.
+# Run from the repository root: python benchmarks/multiplayer.py --clients 300
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from server import GameServer, Room, encode  # noqa: E402
+from session import Game  # noqa: E402
+from storage import QuestionBank  # noqa: E402
+
+
+def build_game(questions):
+    bank = QuestionBank(":memory:")
+    bank.add_questions(
+        (
+            {
+                "question": f"What is {i} + {i}?",
+                "correct_answer": str(2 * i),
+                "incorrect_answers": [str(2 * i + j) for j in range(1, 4)],
+            },
+            (),
+        )
+        for i in range(questions)
+    )
+    session = Game(bank)
+    session.questions_per_round = questions
+    return session
+
+
+async def bot(name, port, think_seconds, accuracy, rng, joined, round_trips):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(encode({"type": "join", "name": name}))
+    sent_at = None
+    while line := await reader.readline():
+        message = json.loads(line)
+        kind = message["type"]
+        if kind == "welcome":
+            joined.release()
+        elif kind == "question":
+            await asyncio.sleep(rng.uniform(0, think_seconds))
+            answers = message["answers"]
+            correct = str(2 * int(message["question"].split()[2]))
+            chosen = correct if rng.random() < accuracy else rng.choice(answers)
+            sent_at = time.perf_counter()
+            writer.write(
+                encode({"type": "answer", "index": message["index"], "answer": chosen})
+            )
+        elif kind == "ack":
+            round_trips.append(time.perf_counter() - sent_at)
+        elif kind == "scoreboard":
+            break
+    writer.close()
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def print_latencies(label, seconds):
+    print(
+        f"{label:<28} p50 {percentile(seconds, 0.5) * 1000:7.2f} ms  "
+        f"p95 {percentile(seconds, 0.95) * 1000:7.2f} ms  "
+        f"p99 {percentile(seconds, 0.99) * 1000:7.2f} ms  "
+        f"max {max(seconds) * 1000:7.2f} ms"
+    )
+
+
+async def run(args):
+    room = Room(build_game(args.questions), result_seconds=0)
+    server = GameServer(room, "127.0.0.1", 0)
+    await server.start()
+    rng = random.Random(args.seed)
+    joined = asyncio.Semaphore(0)
+    round_trips = []
+    bots = [
+        asyncio.create_task(
+            bot(
+                f"bot{i}",
+                server.port,
+                args.think,
+                args.accuracy,
+                random.Random(rng.random()),
+                joined,
+                round_trips,
+            )
+        )
+        for i in range(args.clients)
+    ]
+    for _ in bots:
+        await joined.acquire()
+    room.game.start_round()
+    started = time.perf_counter()
+    await server.start_game()
+    elapsed = time.perf_counter() - started
+    await asyncio.gather(*bots)
+    await server.close()
+    answers = len(room.game.answer_log)
+    print(
+        f"{args.clients} clients, {args.questions} questions, {answers} answers "
+        f"in {elapsed:.2f} s"
+    )
+    print_latencies("answer round trip", round_trips)
+    print_latencies("server handling", room.handling_times)
+    top = room.game.leaderboard.top(1)[0]
+    print(f"leader: {top[1]} with {top[2]} points")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load-test the game server with simulated clients."
+    )
+    parser.add_argument("--clients", type=int, default=300)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument(
+        "--think",
+        type=float,
+        default=0.5,
+        help="longest simulated thinking time; 0 sends every answer at once",
+    )
+    parser.add_argument("--accuracy", type=float, default=0.7)
+    parser.add_argument("--seed", type=int, default=0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+# Many rooms on one machine: per-room tick latency across a worker pool, and
+# what happens to the other rooms when one worker is killed mid-game.
+# Run from the repository root: python benchmarks/rooms.py --rooms 8 --kill-after 3
+import argparse
+import asyncio
+import json
+import os
+import random
+import signal
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rooms import REPORT_SECONDS, RoomScheduler, RoomSpec  # noqa: E402
+from server import encode  # noqa: E402
+from storage import QuestionBank  # noqa: E402
+
+CONNECT_ATTEMPTS = 100
+
+
+def build_database(path, questions):
+    bank = QuestionBank(path)
+    bank.add_questions(
+        (
+            {
+                "question": f"What is {i} + {i}?",
+                "correct_answer": str(2 * i),
+                "incorrect_answers": [str(2 * i + j) for j in range(1, 4)],
+            },
+            (),
+        )
+        for i in range(questions)
+    )
+    bank.close()
+
+
+async def connect(port):
+    for _ in range(CONNECT_ATTEMPTS):
+        try:
+            return await asyncio.open_connection("127.0.0.1", port)
+        except OSError:
+            await asyncio.sleep(0.05)
+    raise ConnectionError(f"room on port {port} never came up")
+
+
+async def bot(name, port, think_seconds, rng):
+    reader, writer = await connect(port)
+    writer.write(encode({"type": "join", "name": name}))
+    try:
+        while line := await reader.readline():
+            message = json.loads(line)
+            if message["type"] == "question":
+                await asyncio.sleep(rng.uniform(0, think_seconds))
+                answer = rng.choice(message["answers"])
+                writer.write(
+                    encode(
+                        {"type": "answer", "index": message["index"], "answer": answer}
+                    )
+                )
+            elif message["type"] == "scoreboard":
+                break
+        else:
+            writer.close()
+            return "disconnected"
+    except ConnectionError:
+        writer.close()
+        return "disconnected"
+    writer.close()
+    await writer.wait_closed()
+    return "finished"
+
+
+async def play_room(spec, clients, think_seconds, seed):
+    rng = random.Random(seed)
+    outcomes = await asyncio.gather(
+        *(
+            bot(f"{spec.name}-bot{i}", spec.port, think_seconds, rng)
+            for i in range(clients)
+        )
+    )
+    return spec.name, outcomes.count("finished"), outcomes.count("disconnected")
+
+
+def kill_worker(scheduler, worker_id, delay):
+    time.sleep(delay)
+    process = scheduler.processes[worker_id]
+    print(f"killing worker {worker_id} (pid {process.pid})")
+    os.kill(process.pid, signal.SIGKILL)
+
+
+async def run(args, scheduler, specs):
+    results = await asyncio.gather(
+        *(
+            play_room(spec, args.clients, args.think, index)
+            for index, spec in enumerate(specs)
+        )
+    )
+    for name, finished, disconnected in results:
+        print(f"{name}: {finished} clients finished, {disconnected} disconnected")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Load-test many rooms spread over a worker pool."
+    )
+    parser.add_argument("--rooms", type=int, default=8)
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--clients", type=int, default=30, help="per room")
+    parser.add_argument("--questions", type=int, default=5)
+    parser.add_argument("--think", type=float, default=0.3)
+    parser.add_argument("--base-port", type=int, default=9300)
+    parser.add_argument(
+        "--kill-after",
+        type=float,
+        help="SIGKILL the first worker this many seconds into the games",
+    )
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as directory:
+        database = os.path.join(directory, "rooms.db")
+        build_database(database, args.questions * 4)
+        specs = [
+            RoomSpec(
+                f"room{index + 1}",
+                args.base_port + index,
+                "127.0.0.1",
+                seed=index,
+                questions=args.questions,
+                min_players=args.clients,
+                lobby_seconds=1,
+                result_seconds=0.2,
+            )
+            for index in range(args.rooms)
+        ]
+        scheduler = RoomScheduler(
+            specs, args.workers, database, os.path.join(directory, "analytics")
+        )
+        scheduler.start()
+        done = threading.Event()
+
+        def monitor():
+            while not done.is_set():
+                scheduler.poll(0.5)
+
+        monitor_thread = threading.Thread(target=monitor, daemon=True)
+        monitor_thread.start()
+        if args.kill_after is not None:
+            threading.Thread(
+                target=kill_worker, args=(scheduler, 0, args.kill_after), daemon=True
+            ).start()
+        try:
+            asyncio.run(run(args, scheduler, specs))
+            # Let every worker send one more report after its games ended
+            time.sleep(REPORT_SECONDS + 0.5)
+        finally:
+            # Stop polling first, or the monitor would respawn stopped workers
+            done.set()
+            monitor_thread.join()
+            scheduler.stop()
+        scheduler.report()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# Frame time of the text input editor while typing a long question.
+# Run from the repository root: python benchmarks/text_input.py
+import os
+import random
+import statistics
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pygame  # noqa: E402
+
+import game  # noqa: E402
+
+CHECKPOINTS = (250, 500, 1000, 2000, 4000, 8000)
+SAMPLE_FRAMES = 50
+WORDS = ["kahoot", "question", "answer", "a", "the", "photosynthesis", "quiz"]
+
+
+def typed_text(length):
+    rng = random.Random(0)
+    text = ""
+    while len(text) < length + SAMPLE_FRAMES:
+        text += rng.choice(WORDS) + " "
+    return text
+
+
+def frame_times(screen, text, length, full_relayout):
+    text_input = game.TextInput((50, 100, game.SCREEN_WIDTH - 100, 200))
+    text_input.insert(text[:length])
+    text_input.draw(screen)
+    samples = []
+    for char in text[length : length + SAMPLE_FRAMES]:
+        start = time.perf_counter()
+        text_input.insert(char)
+        if full_relayout:
+            text_input.lines = [(0, 0)]
+            text_input.layout_from = 0
+        text_input.draw(screen)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main():
+    pygame.init()
+    screen = pygame.display.set_mode((game.SCREEN_WIDTH, game.SCREEN_HEIGHT))
+    text = typed_text(CHECKPOINTS[-1])
+    print(f"{'chars':>6} {'incremental ms':>15} {'full relayout ms':>17}")
+    for length in CHECKPOINTS:
+        incremental = frame_times(screen, text, length, False)
+        full = frame_times(screen, text, length, True)
+        print(f"{length:>6} {incremental:>15.3f} {full:>17.3f}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import json
+import sys
+import threading
+
+from server import DEFAULT_PORT, encode
+
+
+def show(message):
+    kind = message.get("type")
+    if kind == "welcome":
+        print(f"Joined as {message['name']}, waiting for the host to start.")
+    elif kind == "question":
+        print(f"\nQuestion {message['index'] + 1}/{message['total']}:")
+        print(message["question"])
+        for number, answer in enumerate(message["answers"], 1):
+            print(f"  {number}. {answer}")
+        print(f"Type a number and press Enter ({int(message['seconds'])} s).")
+    elif kind == "result":
+        verdict = "Correct!" if message["correct"] else "Wrong."
+        print(f"{verdict} The answer was {message['correct_answer']}.")
+        print(
+            f"+{message['score']} points, {message['total']} total, "
+            f"rank {message['rank']}"
+        )
+    elif kind == "scoreboard":
+        print("\nScoreboard")
+        for rank, name, score, _ in message["rows"]:
+            print(f"{rank:>3}. {name} {score}")
+    elif kind == "error":
+        print(f"Server: {message['message']}")
+
+
+async def play(host, port, name):
+    reader, writer = await asyncio.open_connection(host, port)
+    writer.write(encode({"type": "join", "name": name}))
+    loop = asyncio.get_running_loop()
+    typed_lines = asyncio.Queue()
+
+    # input() blocks, so stdin is read on a thread and fed into the loop
+    def read_stdin():
+        for line in sys.stdin:
+            loop.call_soon_threadsafe(typed_lines.put_nowait, line)
+
+    threading.Thread(target=read_stdin, daemon=True).start()
+    question = None
+    received = asyncio.ensure_future(reader.readline())
+    typed = asyncio.ensure_future(typed_lines.get())
+    try:
+        while True:
+            done, _ = await asyncio.wait(
+                (received, typed), return_when=asyncio.FIRST_COMPLETED
+            )
+            if received in done:
+                line = received.result()
+                if not line:
+                    print("Disconnected from the host.")
+                    return
+                message = json.loads(line)
+                show(message)
+                if message.get("type") == "question":
+                    question = message
+                elif message.get("type") == "result":
+                    question = None
+                elif message.get("type") == "scoreboard":
+                    return
+                received = asyncio.ensure_future(reader.readline())
+            if typed in done:
+                choice = typed.result().strip()
+                if question is not None and choice.isdigit():
+                    answers = question["answers"]
+                    if 1 <= int(choice) <= len(answers):
+                        writer.write(
+                            encode(
+                                {
+                                    "type": "answer",
+                                    "index": question["index"],
+                                    "answer": answers[int(choice) - 1],
+                                }
+                            )
+                        )
+                        question = None
+                typed = asyncio.ensure_future(typed_lines.get())
+    finally:
+        received.cancel()
+        typed.cancel()
+        writer.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Join a networked quiz game.")
+    parser.add_argument("host")
+    parser.add_argument("name")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(play(args.host, args.port, args.name))
+    except OSError as error:
+        print(f"Cannot reach the host: {error}", file=sys.stderr)
+        return 1
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import hashlib
+import re
+import struct
+import zlib
+
+SHINGLE_SIZE = 4
+SKETCH_SLOTS = 32
+SLOT_BITS = 5
+VALUE_BITS = 32 - SLOT_BITS
+BANDS = 8
+ROWS_PER_BAND = SKETCH_SLOTS // BANDS
+SIGNATURE = struct.Struct(f"<{SKETCH_SLOTS}I")
+NEAR_DUPLICATE_JACCARD = 0.7
+# Numbers stay whole ("3.5" is not "35") and operators and other symbols are
+# tokens of their own, so "2+2" and "2-2" or "5 > 3" and "5 < 3" differ.
+# Only sentence punctuation that never changes what is asked is dropped.
+TOKEN = re.compile(r"\d+(?:[.,]\d+)*|\w+|[^\w\s]")
+IGNORED_PUNCTUATION = frozenset("?!.,;:'\"`\u00bf\u00a1\u2018\u2019\u201c\u201d")
+
+
+def normalize(text):
+    return " ".join(
+        token
+        for token in TOKEN.findall(text.lower())
+        if token not in IGNORED_PUNCTUATION
+    )
+
+
+def fingerprint(text, correct_answer):
+    key = f"{normalize(text)}\n{normalize(correct_answer)}"
+    digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def shingles(text):
+    data = normalize(text).encode()
+    if len(data) <= SHINGLE_SIZE:
+        return {data}
+    return {data[i : i + SHINGLE_SIZE] for i in range(len(data) - SHINGLE_SIZE + 1)}
+
+
+def numbers(text):
+    return set(re.findall(r"\d+", text))
+
+
+def sketch(shingle_set):
+    # One-permutation MinHash: every shingle is hashed once and only competes
+    # for the slot picked by its top bits, instead of once per hash function.
+    slots = [None] * SKETCH_SLOTS
+    for shingle in shingle_set:
+        value = (zlib.crc32(shingle) * 0x9E3779B1) & 0xFFFFFFFF
+        slot = value >> VALUE_BITS
+        value &= (1 << VALUE_BITS) - 1
+        if slots[slot] is None or value < slots[slot]:
+            slots[slot] = value
+    # Short questions leave slots empty; each borrows the next filled slot's
+    # value tagged with its distance, so similar texts still agree on them.
+    # Walking right to left twice covers the wrap-around in one linear pass.
+    if None in slots:
+        filled = slots[:]
+        nearest = distance = None
+        for position in range(2 * SKETCH_SLOTS - 1, -1, -1):
+            value = filled[position % SKETCH_SLOTS]
+            if value is not None:
+                nearest, distance = value, 0
+            elif nearest is not None:
+                distance += 1
+                if position < SKETCH_SLOTS:
+                    slots[position] = (distance << VALUE_BITS) | nearest
+    return slots
+
+
+def band_buckets(signature, key):
+    # The band number in the high bits keeps equal rows in different bands
+    # apart, and seeding each band's hash with the key keeps questions with
+    # another answer or other numbers out of the bucket altogether.
+    size = ROWS_PER_BAND * 4
+    return [
+        (band << 32) | zlib.crc32(signature[band * size : (band + 1) * size], key)
+        for band in range(BANDS)
+    ]
+
+
+def similarity(signature, other_signature):
+    # The share of equal MinHash slots estimates the shingles' Jaccard index
+    slots = zip(SIGNATURE.unpack(signature), SIGNATURE.unpack(other_signature))
+    return sum(first == second for first, second in slots) / SKETCH_SLOTS
+
+
+class QuestionSketch:
+    def __init__(self, text, correct_answer):
+        self.text = text
+        self.answer = normalize(correct_answer)
+        self.fingerprint = fingerprint(text, correct_answer)
+        self.signature = SIGNATURE.pack(*sketch(shingles(text)))
+        # Near-identical wording with different numbers ("12 + 13" vs
+        # "12 + 14") is a different question, not a rephrasing, so the
+        # numbers share the bucket key with the answer.
+        key = f"{self.answer}\n{' '.join(sorted(numbers(text)))}"
+        self.buckets = band_buckets(self.signature, zlib.crc32(key.encode()))
+
+    def is_near_duplicate(self, other_signature):
+        return similarity(self.signature, other_signature) >= NEAR_DUPLICATE_JACCARD
@@ -1,11 +1,26 @@
+import argparse
+import atexit
+import csv
+import heapq
+import itertools
+import json
+import math
+import os
 import random
+import socket
 import sys
+import threading
 import time
+import zlib
+from collections import OrderedDict, deque
 
 import pygame
 
-pygame.init()
-pygame.mixer.init()
+from analytics import CHOICES, AnswerStore
+from leaderboard import QUESTION_SECONDS, answer_score
+from recording import SessionReader, SessionWriter
+from server import DEFAULT_PORT, GameServer, Room
+from session import Game
 
 # Constants
 SCREEN_WIDTH = 800
@@ -15,60 +30,1480 @@ BLACK = (0, 0, 0)
 BUTTON_BG_COLOR = (255, 255, 255)
 BUTTON_SHADOW_COLOR = (200, 200, 200)
 BUTTON_TEXT_COLOR = (0, 0, 0)
-LOGO_FONT = pygame.font.Font("fonts/gooddog-plain.regular.ttf", 150)
-MAIN_FONT = pygame.font.Font("fonts/Montserrat-Bold.ttf", 20)
-BUTTON_FONT = pygame.font.Font("fonts/Montserrat-Bold.ttf", 20)
+LOGO_FONT_FILE = "fonts/gooddog-plain.regular.ttf"
+TEXT_FONT_FILE = "fonts/Montserrat-Bold.ttf"
+LOGO_FONT = (LOGO_FONT_FILE, 150)
+SMALL_LOGO_FONT = (LOGO_FONT_FILE, 80)
+MAIN_FONT = (TEXT_FONT_FILE, 20)
+BUTTON_FONT = (TEXT_FONT_FILE, 20)
+RANKING_FONT = (TEXT_FONT_FILE, 25)
+HEADING_FONT = (TEXT_FONT_FILE, 40)
+OVERLAY_FONT = (TEXT_FONT_FILE, 12)
 BACKGROUND_IMAGE = "images/background.jpg"
+MENU_MUSIC = "music/background.mp3"
+GAME_MUSIC = "music/gameplay.mp3"
+CORRECT_SOUND = "music/correct.wav"
+WRONG_SOUND = "music/wrong.wav"
+EFFECT_CHANNELS = 4
+MUSIC_FADE_MS = 800
+PRELOAD_FONTS = (
+    LOGO_FONT,
+    SMALL_LOGO_FONT,
+    MAIN_FONT,
+    RANKING_FONT,
+    HEADING_FONT,
+    OVERLAY_FONT,
+)
+PRELOAD_IMAGES = ((BACKGROUND_IMAGE, (SCREEN_WIDTH, SCREEN_HEIGHT)),)
+PRELOAD_SOUNDS = (CORRECT_SOUND, WRONG_SOUND)
 BUTTON_RADIUS = 10
+TIMER_RECT = (SCREEN_WIDTH - 80, 20, 60, 60)
+INPUT_BORDER_RADIUS = 20
+PLACEHOLDER_COLOR = (150, 150, 150)
+SEARCH_RECT = (50, 30, SCREEN_WIDTH - 100, 50)
+VISIBLE_LIST_ROWS = 4
+LIST_ROW_HEIGHT = 70
+LIST_RECT = (50, 100, SCREEN_WIDTH - 100, VISIBLE_LIST_ROWS * LIST_ROW_HEIGHT)
+LIST_ROW_CACHE_SIZE = 64
+LIST_SCROLLBAR_WIDTH = 6
+LIST_SCROLLBAR_MIN_HEIGHT = 24
+PREFETCH_QUESTIONS = 2
+FPS = 30
+IDLE_TIMEOUT_SECONDS = 1.0
+PROFILE_WINDOW = 300
+DUPLICATE_MESSAGES = {
+    "exact": "This question is already in the bank",
+    "near": "A very similar question is already in the bank",
+}
+PROFILE_STAT_COLUMNS = ("count", "mean", "p50", "p95", "p99", "max")
+OVERLAY_HOTKEY = pygame.K_F3
+OVERLAY_RECT = (10, SCREEN_HEIGHT - 90, 320, 80)
+OVERLAY_REFRESH_SECONDS = 0.25
+MESSAGE_SECONDS = 3
+FEEDBACK_SECONDS = 3
+SCORE_SECONDS = 5
+SCOREBOARD_ROWS = 7
+SCORE_ROW_CACHE_SIZE = 64
+SCORE_PREVIOUS_KEYS = (pygame.K_LEFT, pygame.K_PAGEUP)
+INPUT_WHITESPACE = str.maketrans("\r\n\t", "   ")
+LOADING_BAR_RECT = (SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT // 2 - 10, 300, 20)
+LOADING_COLOR = (70, 23, 143)
+SCALED_IMAGE_CACHE_SIZE = 8
+TEXT_CACHE_SIZE = 512
+HIT_GRID_CELL = 64
+MENU_OPTION_TOP = 220
+MENU_OPTION_SPACING = 50
+MENU_OPTION_HEIGHT = 44
+HOST_NAME_COLUMNS = 3
+HOST_NAME_ROWS = 4
+ROOM_UPDATED = pygame.event.custom_type()
+RECORDINGS_DIRECTORY = "recordings"
+RECORDINGS_KEPT = 20
+ANALYTICS_DIRECTORY = "analytics"
+STATS_FONT = (TEXT_FONT_FILE, 14)
+STATS_SUMMARY_Y = 400
+REPLAY_PERCENTILES = (("p50", 0.5), ("p95", 0.95), ("max", 1.0))
+# One group per player, in answer-slot order: top left, top right, bottom left,
+# bottom right. Gamepads use their first four buttons the same way.
+PARTY_KEY_GROUPS = (
+    (pygame.K_1, pygame.K_2, pygame.K_3, pygame.K_4),
+    (pygame.K_q, pygame.K_w, pygame.K_e, pygame.K_r),
+    (pygame.K_a, pygame.K_s, pygame.K_d, pygame.K_f),
+    (pygame.K_z, pygame.K_x, pygame.K_c, pygame.K_v),
+    (pygame.K_7, pygame.K_8, pygame.K_9, pygame.K_0),
+    (pygame.K_u, pygame.K_i, pygame.K_o, pygame.K_p),
+)
+PARTY_JOYSTICK_BUTTONS = 4
+PARTY_BINDING_ROWS = 6
+PARTY_STATUS_RECT = (50, SCREEN_HEIGHT - 45, SCREEN_WIDTH - 100, 40)
+
+
+class AssetManager:
+    def __init__(self, max_scaled=SCALED_IMAGE_CACHE_SIZE):
+        self.images = {}
+        self.decoded = {}
+        self.scaled = OrderedDict()
+        self.max_scaled = max_scaled
+
+    def decode(self, path, size=None):
+        # Safe off the main thread: decoding and scaling do not touch the
+        # display, conversion waits until image() or scaled_image() asks for it.
+        key = (path, tuple(size) if size is not None else None)
+        if key not in self.decoded:
+            image = pygame.image.load(path)
+            if size is not None:
+                image = pygame.transform.scale(image, key[1])
+            self.decoded[key] = image
+
+    def convert(self, image):
+        # convert() needs a display mode; images loaded earlier stay as decoded
+        if pygame.display.get_surface() is None:
+            return image
+        if image.get_flags() & pygame.SRCALPHA:
+            return image.convert_alpha()
+        return image.convert()
+
+    def image(self, path):
+        image = self.images.get(path)
+        if image is None:
+            image = self.decoded.pop((path, None), None)
+            if image is None:
+                image = pygame.image.load(path)
+            image = self.convert(image)
+            self.images[path] = image
+        return image
+
+    def scaled_image(self, path, size):
+        key = (path, tuple(size))
+        image = self.scaled.get(key)
+        if image is not None:
+            self.scaled.move_to_end(key)
+            return image
+        image = self.decoded.pop(key, None)
+        if image is not None:
+            image = self.convert(image)
+        else:
+            image = pygame.transform.scale(self.image(path), key[1])
+        self.scaled[key] = image
+        if len(self.scaled) > self.max_scaled:
+            self.scaled.popitem(last=False)
+        return image
+
+    def clear(self):
+        self.images.clear()
+        self.decoded.clear()
+        self.scaled.clear()
+
+
+assets = AssetManager()
+
+
+class FontRegistry:
+    def __init__(self):
+        self.fonts = {}
+
+    def get(self, path, size):
+        key = (path, size)
+        font = self.fonts.get(key)
+        if font is None:
+            font = pygame.font.Font(path, size)
+            self.fonts[key] = font
+        return font
+
+
+class TextCache:
+    def __init__(self, max_entries=TEXT_CACHE_SIZE):
+        self.surfaces = OrderedDict()
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font, text, antialias, color):
+        key = (font, text, antialias, tuple(color))
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.hits += 1
+            self.surfaces.move_to_end(key)
+            return surface
+        self.misses += 1
+        surface = font.render(text, antialias, color)
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries:
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self.surfaces),
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def clear(self):
+        self.surfaces.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+fonts = FontRegistry()
+text_cache = TextCache()
+
+
+class FrameClock:
+    def __init__(self):
+        self.clock = pygame.time.Clock()
+
+    def now(self):
+        return time.perf_counter()
+
+    def tick(self, framerate):
+        return self.clock.tick(framerate)
+
+
+class EventSource:
+    # Everything the screens read from outside the program goes through here
+    # and the clock, so a recorded session can be fed back in exactly.
+    def __init__(self):
+        self.joysticks = []
+
+    def get(self, screen_name, owner=None, timeout=0):
+        received = self.poll(timeout)
+        # pygame does not expose SDL's event timestamps, so events are stamped
+        # when dequeued; while idling in wait() that is their arrival time.
+        received_at = clock.now()
+        for event in received:
+            if not hasattr(event, "timestamp"):
+                event.timestamp = received_at
+            if event.type == pygame.KEYDOWN and event.key == OVERLAY_HOTKEY:
+                profiler.toggle_overlay()
+        return received
+
+    def poll(self, timeout):
+        if timeout > 0:
+            event = pygame.event.wait(math.ceil(timeout * 1000))
+            received = [] if event.type == pygame.NOEVENT else [event]
+            received.extend(pygame.event.get())
+            return received
+        return pygame.event.get()
+
+    def mouse_pos(self):
+        return pygame.mouse.get_pos()
+
+    def clipboard_text(self):
+        return clipboard_text()
+
+    def open_joysticks(self):
+        # Startup only brings up display and fonts; gamepads are needed here only
+        if not pygame.joystick.get_init():
+            pygame.joystick.init()
+        self.joysticks = [
+            pygame.joystick.Joystick(i) for i in range(pygame.joystick.get_count())
+        ]
+        return [joystick.get_instance_id() for joystick in self.joysticks]
+
+    def music_busy(self):
+        # Whether a track still plays decides if the next one waits on a fade
+        return pygame.mixer.music.get_busy()
+
+    def end_frame(self, screen_name, seconds, presented):
+        pass
+
+
+def screen_checksum(presented):
+    # Zero marks a frame that showed nothing new, or one under the F3 overlay,
+    # whose numbers never match between a session and its replay.
+    if not presented or profiler.overlay_visible:
+        return 0
+    return zlib.crc32(pygame.display.get_surface().get_view("2"))
+
+
+class RecordingClock(FrameClock):
+    def __init__(self, writer):
+        super().__init__()
+        self.writer = writer
+
+    def now(self):
+        now = super().now()
+        self.writer.time(now)
+        return now
+
+
+class RecordingEvents(EventSource):
+    def __init__(self, writer):
+        super().__init__()
+        self.writer = writer
+
+    def poll(self, timeout):
+        received = super().poll(timeout)
+        self.writer.events(received)
+        return received
+
+    def mouse_pos(self):
+        pos = super().mouse_pos()
+        self.writer.mouse(pos)
+        return pos
+
+    def clipboard_text(self):
+        text = super().clipboard_text()
+        self.writer.clipboard(text)
+        return text
+
+    def open_joysticks(self):
+        instance_ids = super().open_joysticks()
+        self.writer.joysticks(instance_ids)
+        return instance_ids
+
+    def music_busy(self):
+        busy = super().music_busy()
+        self.writer.music_busy(busy)
+        return busy
+
+    def end_frame(self, screen_name, seconds, presented):
+        self.writer.frame(screen_name, seconds, screen_checksum(presented))
+
+
+class RecordingBank:
+    # Logs what every bank call returned, so a replay needs only the rows the
+    # session actually read instead of a copy of the whole database.
+    def __init__(self, bank, writer):
+        self.bank = bank
+        self.writer = writer
+
+    def __getattr__(self, name):
+        method = getattr(self.bank, name)
+
+        def call(*args, **kwargs):
+            result = method(*args, **kwargs)
+            self.writer.bank(name, result)
+            return result
+
+        return call
+
+
+class ReplayBank:
+    # Answers from the recording; writes are never applied anywhere
+    def __init__(self, reader):
+        self.reader = reader
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.reader.bank(name)
+
+
+class ReplayClock(FrameClock):
+    def __init__(self, reader):
+        super().__init__()
+        self.reader = reader
+
+    def now(self):
+        return self.reader.time()
+
+    def tick(self, framerate):
+        return 0
+
+
+class ReplayEvents(EventSource):
+    def __init__(self, reader):
+        super().__init__()
+        self.reader = reader
+        self.timings = {}
+        self.mismatched_frames = []
+
+    def poll(self, timeout):
+        try:
+            return self.reader.events()
+        except EOFError:
+            return [pygame.event.Event(pygame.QUIT)]
+
+    def mouse_pos(self):
+        return self.reader.mouse()
+
+    def clipboard_text(self):
+        return self.reader.clipboard()
+
+    def open_joysticks(self):
+        return self.reader.joysticks()
+
+    def music_busy(self):
+        return self.reader.music_busy()
+
+    def end_frame(self, screen_name, seconds, presented):
+        recorded_name, recorded_seconds, recorded_checksum = self.reader.frame()
+        if recorded_name != screen_name:
+            raise ValueError(
+                f"replay diverged at frame {self.reader.frames}: recorded "
+                f"{recorded_name}, replayed {screen_name}"
+            )
+        checksum = screen_checksum(presented)
+        if recorded_checksum and checksum and recorded_checksum != checksum:
+            self.mismatched_frames.append(self.reader.frames)
+        self.timings.setdefault(screen_name, []).append((recorded_seconds, seconds))
+
+    def report(self, file=None):
+        file = sys.stdout if file is None else file
+        print(
+            f"{self.reader.frames} frames replayed, "
+            f"{len(self.mismatched_frames)} screens differ from the recording",
+            file=file,
+        )
+        if self.mismatched_frames:
+            print(f"first differing frame: {self.mismatched_frames[0]}", file=file)
+        # Frame times in ms as recorded and as replayed on this machine
+        header = "".join(
+            f" {'rec ' + label:>9} {'now ' + label:>9}"
+            for label, _ in REPLAY_PERCENTILES
+        )
+        print(f"{'screen':<14} {'frames':>7}{header}", file=file)
+        for screen_name, timings in sorted(self.timings.items()):
+            recorded = sorted(timing[0] for timing in timings)
+            replayed = sorted(timing[1] for timing in timings)
+            columns = "".join(
+                f" {percentile(recorded, fraction) * 1000:>9.3f}"
+                f" {percentile(replayed, fraction) * 1000:>9.3f}"
+                for _, fraction in REPLAY_PERCENTILES
+            )
+            print(f"{screen_name:<14} {len(timings):>7}{columns}", file=file)
+
+
+class ScheduledCall:
+    def __init__(self, when, callback, args):
+        self.when = when
+        self.callback = callback
+        self.args = args
+        self.cancelled = False
+
+    def cancel(self):
+        self.cancelled = True
+
+
+class Scheduler:
+    def __init__(self):
+        self.queue = []
+        self.counter = itertools.count()
+
+    def call_later(self, delay, callback, *args):
+        call = ScheduledCall(clock.now() + delay, callback, args)
+        heapq.heappush(self.queue, (call.when, next(self.counter), call))
+        return call
+
+    def run_due(self):
+        now = clock.now()
+        while self.queue and self.queue[0][0] <= now:
+            call = heapq.heappop(self.queue)[2]
+            if not call.cancelled:
+                call.callback(*call.args)
+
+    def next_deadline(self):
+        while self.queue and self.queue[0][2].cancelled:
+            heapq.heappop(self.queue)
+        return self.queue[0][0] if self.queue else None
+
+
+class AudioManager:
+    def __init__(self, effect_channels=EFFECT_CHANNELS, fade_ms=MUSIC_FADE_MS):
+        self.sounds = {}
+        self.effect_channels = effect_channels
+        self.channels = None
+        self.next_channel = 0
+        self.fade_ms = fade_ms
+        self.track = None
+        self.pending_track = None
+
+    def sound(self, path):
+        sound = self.sounds.get(path)
+        if sound is None:
+            sound = pygame.mixer.Sound(path)
+            self.sounds[path] = sound
+        return sound
+
+    def preload(self, *paths):
+        for path in paths:
+            self.sound(path)
+
+    def reserve_channels(self):
+        # Reserved channels are never handed out by Sound.play(), so effects
+        # only compete with each other inside this pool.
+        if pygame.mixer.get_num_channels() < self.effect_channels:
+            pygame.mixer.set_num_channels(self.effect_channels)
+        pygame.mixer.set_reserved(self.effect_channels)
+        self.channels = [pygame.mixer.Channel(i) for i in range(self.effect_channels)]
+
+    def play(self, path):
+        if self.channels is None:
+            self.reserve_channels()
+        sound = self.sound(path)
+        for channel in self.channels:
+            if not channel.get_busy():
+                channel.play(sound)
+                return channel
+        channel = self.channels[self.next_channel]
+        self.next_channel = (self.next_channel + 1) % len(self.channels)
+        channel.play(sound)
+        return channel
+
+    def play_music(self, path):
+        if self.pending_track is not None:
+            if self.pending_track.args[0] == path:
+                return
+            self.pending_track.cancel()
+            self.pending_track = None
+        elif path == self.track:
+            return
+        if self.track is None or not events.music_busy():
+            self.start_music(path)
+            return
+        # The music stream cannot overlap two tracks, and load() blocks until
+        # a running fade ends, so the next track starts once the fade is over.
+        pygame.mixer.music.fadeout(self.fade_ms)
+        self.pending_track = scheduler.call_later(
+            self.fade_ms / 1000, self.start_music, path
+        )
+
+    def start_music(self, path):
+        self.pending_track = None
+        self.track = path
+        pygame.mixer.music.load(path)
+        pygame.mixer.music.play(-1, fade_ms=self.fade_ms)
+
+
+clock = FrameClock()
+events = EventSource()
+scheduler = Scheduler()
+audio = AudioManager()
+
+
+class StartupProfile:
+    def __init__(self):
+        self.start = self.phase_start = time.perf_counter()
+        self.phases = []
+        self.preloads = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self.phase_start))
+        self.phase_start = now
+
+    def record_preload(self, label, seconds):
+        self.preloads.append((label, seconds))
+
+    def report(self, file=None):
+        file = file or sys.stdout
+        print("startup phases:", file=file)
+        for phase, seconds in self.phases:
+            print(f"  {phase:<40} {seconds * 1000:>9.1f} ms", file=file)
+        print("background preload (worker thread):", file=file)
+        for label, seconds in self.preloads:
+            print(f"  {label:<40} {seconds * 1000:>9.1f} ms", file=file)
+        total = self.phase_start - self.start
+        print(f"  {'total':<40} {total * 1000:>9.1f} ms", file=file)
+
+
+class Preloader:
+    def __init__(self, startup):
+        self.startup = startup
+        self.tasks = [
+            (f"{path} {size}pt", fonts.get, (path, size))
+            for path, size in PRELOAD_FONTS
+        ]
+        self.tasks += [
+            (path, assets.decode, (path, size)) for path, size in PRELOAD_IMAGES
+        ]
+        self.tasks += [(path, audio.preload, (path,)) for path in PRELOAD_SOUNDS]
+        self.completed = 0
+        self.error = None
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def run(self):
+        try:
+            for label, load, args in self.tasks:
+                start = time.perf_counter()
+                load(*args)
+                self.startup.record_preload(label, time.perf_counter() - start)
+                self.completed += 1
+        except Exception as error:
+            self.error = error
+
+    @property
+    def progress(self):
+        return self.completed / len(self.tasks)
+
+    @property
+    def finished(self):
+        return self.thread.ident is not None and not self.thread.is_alive()
+
+
+class Frame:
+    def __init__(self, profiler, screen_name):
+        self.profiler = profiler
+        self.screen_name = screen_name
+        self.phase = "events"
+        self.start = self.phase_start = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.profiler.record(self.screen_name, self.phase, now - self.phase_start)
+        self.phase = phase
+        self.phase_start = now
+
+    def end(self):
+        self.mark(None)
+        seconds = self.phase_start - self.start
+        self.profiler.record(self.screen_name, "frame", seconds)
+        self.profiler.frame_counts[self.screen_name] = (
+            self.profiler.frame_counts.get(self.screen_name, 0) + 1
+        )
+        return seconds
+
+
+def percentile(sorted_values, fraction):
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * fraction))
+    return sorted_values[index]
+
+
+class FrameProfiler:
+    def __init__(self, window=PROFILE_WINDOW):
+        self.window = window
+        self.samples = {}
+        self.frame_counts = {}
+        self.current_screen = None
+        self.last_frame_start = None
+        self.last_frame_cpu = None
+        self.cpu_time = {}
+        self.wall_time = {}
+        self.overlay_visible = False
+        self.overlay_underlay = None
+        self.overlay_refreshed = 0.0
+
+    def begin_frame(self, screen_name):
+        frame = Frame(self, screen_name)
+        cpu = time.process_time()
+        if self.last_frame_start is not None:
+            previous = self.current_screen
+            wall = frame.start - self.last_frame_start
+            self.record(previous, "cpu", cpu - self.last_frame_cpu)
+            self.cpu_time[previous] = (
+                self.cpu_time.get(previous, 0.0) + cpu - self.last_frame_cpu
+            )
+            self.wall_time[previous] = self.wall_time.get(previous, 0.0) + wall
+            if screen_name == previous:
+                self.record(screen_name, "interval", wall)
+        self.current_screen = screen_name
+        self.last_frame_start = frame.start
+        self.last_frame_cpu = cpu
+        return frame
+
+    def record(self, screen_name, phase, seconds):
+        phases = self.samples.get(screen_name)
+        if phases is None:
+            phases = self.samples[screen_name] = {}
+        samples = phases.get(phase)
+        if samples is None:
+            samples = phases[phase] = deque(maxlen=self.window)
+        samples.append(seconds * 1000)
+
+    def stats(self, screen_name, phase):
+        values = sorted(self.samples.get(screen_name, {}).get(phase, ()))
+        if not values:
+            return None
+        return {
+            "count": len(values),
+            "mean": sum(values) / len(values),
+            "p50": percentile(values, 0.50),
+            "p95": percentile(values, 0.95),
+            "p99": percentile(values, 0.99),
+            "max": values[-1],
+        }
+
+    def cpu_percent(self, screen_name):
+        wall = self.wall_time.get(screen_name)
+        if not wall:
+            return None
+        return 100 * self.cpu_time[screen_name] / wall
+
+    def summary(self):
+        return {
+            screen_name: {
+                "frames": self.frame_counts.get(screen_name, 0),
+                "cpu_percent": self.cpu_percent(screen_name),
+                **{phase: self.stats(screen_name, phase) for phase in phases},
+            }
+            for screen_name, phases in self.samples.items()
+        }
+
+    def export(self, path):
+        summary = self.summary()
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            if not path.lower().endswith(".csv"):
+                json.dump({"text_cache": text_cache.stats(), "screens": summary}, file)
+                return
+            writer = csv.writer(file)
+            writer.writerow(["screen", "phase", *PROFILE_STAT_COLUMNS])
+            for screen_name, phases in summary.items():
+                for phase, stats in phases.items():
+                    if phase not in ("frames", "cpu_percent"):
+                        writer.writerow(
+                            [screen_name, phase]
+                            + [
+                                round(stats[column], 3)
+                                for column in PROFILE_STAT_COLUMNS
+                            ]
+                        )
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+
+    def draw_overlay(self, screen, full_update):
+        rect = pygame.Rect(OVERLAY_RECT)
+        if not self.overlay_visible:
+            if self.overlay_underlay is None:
+                return None
+            screen.blit(self.overlay_underlay, rect)
+            self.overlay_underlay = None
+            return rect
+        now = time.perf_counter()
+        if self.overlay_underlay is None or full_update:
+            self.overlay_underlay = screen.subsurface(rect).copy()
+        elif now - self.overlay_refreshed < OVERLAY_REFRESH_SECONDS:
+            return None
+        self.overlay_refreshed = now
+        panel = pygame.Surface(rect.size)
+        panel.fill(BLACK)
+        panel.set_alpha(200)
+        screen.blit(self.overlay_underlay, rect)
+        screen.blit(panel, rect)
+        for i, line in enumerate(self.overlay_lines()):
+            screen.blit(
+                fonts.get(*OVERLAY_FONT).render(line, True, WHITE),
+                (rect.x + 8, rect.y + 6 + i * 16),
+            )
+        return rect
+
+    def overlay_lines(self):
+        screen_name = self.current_screen
+        interval = self.stats(screen_name, "interval")
+        cpu_percent = self.cpu_percent(screen_name)
+        heading = screen_name
+        if interval:
+            heading += f"  {1000 / interval['p50']:.0f} fps"
+        if cpu_percent is not None:
+            heading += f"  cpu {cpu_percent:.0f}%"
+        lines = [heading]
+        for phase in ("frame", "draw", "present"):
+            stats = self.stats(screen_name, phase)
+            if stats:
+                lines.append(
+                    f"{phase:<8} p50 {stats['p50']:.2f}  p95 {stats['p95']:.2f}  "
+                    f"p99 {stats['p99']:.2f} ms"
+                )
+        return lines
+
+
+profiler = FrameProfiler()
+
+
+class Renderer:
+    def __init__(self, dirty_rects=True):
+        self.dirty_rects = dirty_rects
+        self.rects = []
+        self.full_update = False
+        self.present_callbacks = []
+
+    def after_present(self, callback):
+        self.present_callbacks.append(callback)
+
+    def invalidate(self, rect=None):
+        if rect is None:
+            self.full_update = True
+        else:
+            self.rects.append(pygame.Rect(rect))
+
+    def present(self):
+        overlay_rect = profiler.draw_overlay(
+            pygame.display.get_surface(), self.full_update
+        )
+        if overlay_rect is not None:
+            self.invalidate(overlay_rect)
+        presented = self.full_update or bool(self.rects)
+        if self.full_update or (self.rects and not self.dirty_rects):
+            pygame.display.flip()
+        elif self.rects:
+            pygame.display.update(self.rects)
+        self.rects = []
+        self.full_update = False
+        if self.present_callbacks:
+            presented_at = clock.now()
+            callbacks, self.present_callbacks = self.present_callbacks, []
+            for callback in callbacks:
+                callback(presented_at)
+        return presented
+
+    def update_hover(self, screen, widgets):
+        for rect in widgets.update_hover(screen, events.mouse_pos()):
+            self.invalidate(rect)
+
+
+renderer = Renderer()
+
+
+def draw_background(screen):
+    screen.blit(
+        assets.scaled_image(BACKGROUND_IMAGE, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0)
+    )
+
+
+class VirtualList:
+    def __init__(self, rect, count, fetch, row_height=LIST_ROW_HEIGHT, render=None):
+        self.rect = pygame.Rect(rect)
+        self.count = count
+        self.fetch = fetch
+        self.render = render if render is not None else self.render_text
+        self.row_height = row_height
+        self.visible_rows = self.rect.height // row_height
+        self.offset = 0
+        self.rows = OrderedDict()
+        self.changed = True
+
+    def reset(self):
+        self.rows.clear()
+        self.offset = min(self.offset, self.max_offset())
+        self.changed = True
+
+    def max_offset(self):
+        return max(0, self.count() - self.visible_rows)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(offset, self.max_offset()))
+        if offset != self.offset:
+            self.offset = offset
+            self.changed = True
+
+    def handle_event(self, event):
+        if event.type == pygame.MOUSEWHEEL:
+            if self.rect.collidepoint(events.mouse_pos()):
+                self.scroll_to(self.offset - event.y)
+                return True
+        elif event.type == pygame.KEYDOWN:
+            step = {
+                pygame.K_UP: -1,
+                pygame.K_DOWN: 1,
+                pygame.K_PAGEUP: -self.visible_rows,
+                pygame.K_PAGEDOWN: self.visible_rows,
+            }.get(event.key)
+            if step is not None:
+                self.scroll_to(self.offset + step)
+                return True
+            if event.key in (pygame.K_HOME, pygame.K_END):
+                self.scroll_to(0 if event.key == pygame.K_HOME else self.max_offset())
+                return True
+        return False
+
+    def row_surfaces(self):
+        end = min(self.offset + self.visible_rows, self.count())
+        missing = [index for index in range(self.offset, end) if index not in self.rows]
+        if missing:
+            items = self.fetch(missing[0], missing[-1] - missing[0] + 1)
+            for index, item in enumerate(items, missing[0]):
+                self.rows[index] = self.render(item)
+            while len(self.rows) > max(LIST_ROW_CACHE_SIZE, self.visible_rows):
+                self.rows.popitem(last=False)
+        surfaces = []
+        for index in range(self.offset, end):
+            self.rows.move_to_end(index)
+            surfaces.append(self.rows[index])
+        return surfaces
+
+    def row_at(self, pos):
+        if not self.rect.collidepoint(pos):
+            return None
+        index = self.offset + (pos[1] - self.rect.y) // self.row_height
+        return index if index < self.count() else None
+
+    def render_text(self, text):
+        return fonts.get(*MAIN_FONT).render(text, True, WHITE)
+
+    def draw(self, screen):
+        screen.blit(
+            assets.scaled_image(BACKGROUND_IMAGE, (SCREEN_WIDTH, SCREEN_HEIGHT)),
+            self.rect,
+            area=self.rect,
+        )
+        for i, surface in enumerate(self.row_surfaces()):
+            screen.blit(surface, (self.rect.x, self.rect.y + i * self.row_height))
+        total = self.count()
+        if total > self.visible_rows:
+            thumb_height = max(
+                LIST_SCROLLBAR_MIN_HEIGHT, self.rect.height * self.visible_rows // total
+            )
+            thumb_y = self.rect.y + (self.rect.height - thumb_height) * self.offset // (
+                total - self.visible_rows
+            )
+            pygame.draw.rect(
+                screen,
+                WHITE,
+                (
+                    self.rect.right - LIST_SCROLLBAR_WIDTH,
+                    thumb_y,
+                    LIST_SCROLLBAR_WIDTH,
+                    thumb_height,
+                ),
+                border_radius=LIST_SCROLLBAR_WIDTH // 2,
+            )
+        self.changed = False
+        return self.rect
+
+
+class ScoreRowCache:
+    def __init__(self, max_rows=SCORE_ROW_CACHE_SIZE):
+        self.rows = OrderedDict()
+        self.max_rows = max_rows
+
+    def render(self, rank, player, score, difference):
+        key = (rank, player, score, difference)
+        surface = self.rows.get(key)
+        if surface is not None:
+            self.rows.move_to_end(key)
+            return surface
+        font = fonts.get(*RANKING_FONT)
+        surface = pygame.Surface(
+            (SCREEN_WIDTH - 100, font.get_height()), pygame.SRCALPHA
+        )
+        surface.blit(font.render(f"{rank}. {player}", True, WHITE), (0, 0))
+        if difference is not None:
+            diff_text = font.render(f"-{difference}", True, WHITE)
+            surface.blit(
+                diff_text, (SCREEN_WIDTH // 2 - 100 - diff_text.get_width() // 2, 0)
+            )
+        surface.blit(font.render(f"{score}", True, WHITE), (SCREEN_WIDTH - 300, 0))
+        self.rows[key] = surface
+        if len(self.rows) > self.max_rows:
+            self.rows.popitem(last=False)
+        return surface
+
+
+score_rows = ScoreRowCache()
 
 
 class Button:
-    def __init__(self, rect, color, text):
+    def __init__(self, rect, color, text, callback=None):
         self.rect = pygame.Rect(rect)
         self.color = color
         self.original_color = color
         self.hover_color = (200, 200, 200)
         self.text = text
-        self.text_surf = BUTTON_FONT.render(text, True, BUTTON_TEXT_COLOR)
+        self.callback = callback
+        self.text_surf = text_cache.render(
+            fonts.get(*BUTTON_FONT), text, True, BUTTON_TEXT_COLOR
+        )
         self.text_rect = self.text_surf.get_rect(center=self.rect.center)
+        self.hovered = False
 
     def draw(self, screen):
         shadow_rect = self.rect.move(4, 4)
         pygame.draw.rect(
             screen, BUTTON_SHADOW_COLOR, shadow_rect, border_radius=BUTTON_RADIUS
         )
-        pygame.draw.rect(screen, self.color, self.rect, border_radius=BUTTON_RADIUS)
+        self.draw_face(screen)
+
+    def draw_face(self, screen):
+        color = self.hover_color if self.hovered else self.color
+        pygame.draw.rect(screen, color, self.rect, border_radius=BUTTON_RADIUS)
         screen.blit(self.text_surf, self.text_rect)
-        if self.rect.collidepoint(pygame.mouse.get_pos()):
-            pygame.draw.rect(
-                screen, self.hover_color, self.rect, border_radius=BUTTON_RADIUS
+
+
+class WidgetLayer:
+    def __init__(self, cell_size=HIT_GRID_CELL):
+        self.cell_size = cell_size
+        self.widgets = []
+        self.grid = {}
+        self.hovered = None
+
+    def __iter__(self):
+        return iter(self.widgets)
+
+    def __len__(self):
+        return len(self.widgets)
+
+    def add(self, widget):
+        self.widgets.append(widget)
+        for cell in self.cells(widget.rect):
+            self.grid.setdefault(cell, []).append(widget)
+        return widget
+
+    def clear(self):
+        self.widgets = []
+        self.grid.clear()
+        self.hovered = None
+
+    def cells(self, rect):
+        size = self.cell_size
+        for x in range(rect.left // size, (rect.right - 1) // size + 1):
+            for y in range(rect.top // size, (rect.bottom - 1) // size + 1):
+                yield x, y
+
+    def hit(self, pos):
+        cell = (pos[0] // self.cell_size, pos[1] // self.cell_size)
+        # Later widgets are drawn on top, so they win overlapping hits
+        for widget in reversed(self.grid.get(cell, ())):
+            if widget.rect.collidepoint(pos):
+                return widget
+        return None
+
+    def draw(self, screen):
+        self.hovered = self.hit(events.mouse_pos())
+        for widget in self.widgets:
+            widget.hovered = widget is self.hovered
+            widget.draw(screen)
+
+    def update_hover(self, screen, pos):
+        hovered = self.hit(pos)
+        if hovered is self.hovered:
+            return []
+        rects = []
+        for widget, state in ((self.hovered, False), (hovered, True)):
+            if widget is not None:
+                widget.hovered = state
+                widget.draw_face(screen)
+                rects.append(widget.rect)
+        self.hovered = hovered
+        return rects
+
+
+def is_click(event):
+    # pygame 2 also reports every wheel notch as button 4 or 5 going down
+    return event.type == pygame.MOUSEBUTTONDOWN and event.button == pygame.BUTTON_LEFT
+
+
+def clipboard_text():
+    try:
+        if not pygame.scrap.get_init():
+            pygame.scrap.init()
+        data = pygame.scrap.get(pygame.SCRAP_TEXT)
+    except pygame.error:
+        return ""
+    if not data:
+        return ""
+    return data.decode("utf-8", "ignore").rstrip("\x00")
+
+
+class TextInput:
+    def __init__(self, rect, font=None, color=BLACK, placeholder=""):
+        self.rect = pygame.Rect(rect)
+        self.font = font or fonts.get(*MAIN_FONT)
+        self.color = color
+        self.placeholder = placeholder
+        self.max_width = self.rect.width - 20
+        self.line_height = self.font.get_height()
+        self.max_lines = max(1, (self.rect.height - 20) // self.line_height)
+        self.text = ""
+        self.lines = [(0, 0)]
+        self.layout_from = 0
+        self.changed = True
+
+    def insert(self, text):
+        text = text.replace("\r\n", " ").translate(INPUT_WHITESPACE)
+        if not text:
+            return
+        self.mark_edited(len(self.text))
+        self.text += text
+
+    def backspace(self):
+        if self.text:
+            self.text = self.text[:-1]
+            self.mark_edited(len(self.text))
+
+    def mark_edited(self, offset):
+        self.layout_from = min(self.layout_from, offset)
+        self.changed = True
+
+    def handle_event(self, event):
+        if event.type == pygame.TEXTINPUT:
+            self.insert(event.text)
+        elif event.type == pygame.KEYDOWN:
+            if event.key == pygame.K_BACKSPACE:
+                self.backspace()
+            elif event.key == pygame.K_v and event.mod & (
+                pygame.KMOD_CTRL | pygame.KMOD_META
+            ):
+                self.insert(events.clipboard_text())
+
+    def update_layout(self):
+        if self.layout_from > len(self.text):
+            return
+        # A shorter first word on the edited line may now fit on the line above,
+        # so greedy wrapping restarts one line before the edit.
+        index = len(self.lines) - 1
+        while index > 0 and self.lines[index][0] > self.layout_from:
+            index -= 1
+        index = max(0, index - 1)
+        start = self.lines[index][0]
+        del self.lines[index:]
+        self.wrap_from(start)
+        self.layout_from = len(self.text) + 1
+
+    def wrap_from(self, start):
+        text = self.text
+        line_start = line_end = start
+        word_start = start
+        while True:
+            word_end = text.find(" ", word_start)
+            if word_end == -1:
+                word_end = len(text)
+            if (
+                line_end == line_start
+                or self.font.size(text[line_start:word_end])[0] <= self.max_width
+            ):
+                line_end = word_end
+            else:
+                self.lines.append((line_start, line_end))
+                line_start = word_start
+                line_end = word_end
+            if word_end == len(text):
+                break
+            word_start = word_end + 1
+        self.lines.append((line_start, line_end))
+
+    def visible_lines(self):
+        self.update_layout()
+        return [self.text[start:end] for start, end in self.lines[-self.max_lines :]]
+
+    def draw(self, screen):
+        pygame.draw.rect(screen, WHITE, self.rect, border_radius=INPUT_BORDER_RADIUS)
+        if not self.text and self.placeholder:
+            screen.blit(
+                text_cache.render(self.font, self.placeholder, True, PLACEHOLDER_COLOR),
+                (self.rect.x + 10, self.rect.y + 10),
             )
+        for i, line in enumerate(self.visible_lines()):
+            line_text = text_cache.render(self.font, line, True, self.color)
+            screen.blit(
+                line_text,
+                (self.rect.x + 10, self.rect.y + 10 + i * self.line_height),
+            )
+        self.changed = False
+        return self.rect
+
+
+class Scene:
+    screen_name = "scene"
+
+    def __init__(self, screen):
+        self.screen = screen
+        self.needs_redraw = True
+        self.flow = None
+
+    def enter(self):
+        self.needs_redraw = True
+
+    def handle_event(self, event):
+        pass
+
+    def update(self):
+        pass
+
+    def display(self):
+        pass
+
+    def update_display(self):
+        pass
+
+    def next_wake(self):
+        return None
+
+
+class SceneManager:
+    def __init__(self):
+        self.stack = []
+
+    @property
+    def top(self):
+        return self.stack[-1] if self.stack else None
+
+    def push(self, scene):
+        self.stack.append(scene)
+        scene.enter()
+
+    def pop(self):
+        scene = self.stack.pop()
+        if self.stack:
+            self.stack[-1].enter()
+        return scene
+
+    def replace(self, scene):
+        self.stack.pop()
+        self.push(scene)
+
+    def start_flow(self, flow):
+        self.advance_flow(flow, None)
+
+    def advance_flow(self, flow, value):
+        try:
+            scene = flow.send(value)
+        except StopIteration:
+            return
+        scene.flow = flow
+        self.push(scene)
+
+    def finish(self, scene, result=None):
+        if scene is self.top:
+            self.pop()
+        if scene.flow is not None:
+            self.advance_flow(scene.flow, result)
+
+    def idle_timeout(self, scene):
+        if scene.needs_redraw:
+            return 0
+        now = clock.now()
+        timeout = IDLE_TIMEOUT_SECONDS
+        for deadline in (scheduler.next_deadline(), scene.next_wake()):
+            if deadline is not None:
+                timeout = min(timeout, deadline - now)
+        if profiler.overlay_visible:
+            timeout = min(timeout, OVERLAY_REFRESH_SECONDS)
+        # event.wait() sleeps in whole milliseconds, anything shorter is a poll
+        return timeout if timeout >= 0.001 else 0
+
+    def run(self, scene):
+        self.push(scene)
+        while self.stack:
+            scene = self.top
+            received = events.get(scene.screen_name, scene, self.idle_timeout(scene))
+            frame = profiler.begin_frame(scene.screen_name)
+            for event in received:
+                if event.type == pygame.QUIT:
+                    pygame.quit()
+                    sys.exit()
+                if self.stack:
+                    self.top.handle_event(event)
+            scheduler.run_due()
+            if not self.stack:
+                break
+            self.top.update()
+            frame.mark("draw")
+            scene = self.top
+            if scene.needs_redraw:
+                scene.needs_redraw = False
+                scene.display()
+                renderer.invalidate()
+            else:
+                scene.update_display()
+            frame.mark("present")
+            presented = renderer.present()
+            events.end_frame(frame.screen_name, frame.end(), presented)
+            clock.tick(FPS)
+
+
+scenes = SceneManager()
+
+
+class MessageScene(Scene):
+    screen_name = "message"
+
+    def __init__(self, screen, message, duration=MESSAGE_SECONDS):
+        super().__init__(screen)
+        self.message = message
+        self.duration = duration
+        self.timer = None
+
+    def enter(self):
+        super().enter()
+        if self.timer is None:
+            self.timer = scheduler.call_later(self.duration, self.close)
+
+    def handle_event(self, event):
+        if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+            self.close()
+
+    def close(self):
+        self.timer.cancel()
+        scenes.finish(self)
+
+    def display(self):
+        draw_background(self.screen)
+        message_surf = text_cache.render(
+            fonts.get(*MAIN_FONT), self.message, True, WHITE
+        )
+        self.screen.blit(
+            message_surf,
+            (SCREEN_WIDTH // 2 - message_surf.get_width() // 2, SCREEN_HEIGHT // 2),
+        )
+
+
+class ConfirmScene(Scene):
+    screen_name = "confirm"
+
+    def __init__(self, screen, message, detail, confirm_text):
+        super().__init__(screen)
+        self.message = message
+        self.detail = detail
+        self.widgets = WidgetLayer()
+        self.confirm_button = self.widgets.add(
+            Button(
+                (SCREEN_WIDTH // 2 - 310, SCREEN_HEIGHT - 150, 300, 50),
+                BUTTON_BG_COLOR,
+                confirm_text,
+            )
+        )
+        self.cancel_button = self.widgets.add(
+            Button(
+                (SCREEN_WIDTH // 2 + 10, SCREEN_HEIGHT - 150, 300, 50),
+                BUTTON_BG_COLOR,
+                "Cancel",
+            )
+        )
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE:
+            scenes.finish(self, False)
+        elif is_click(event):
+            button = self.widgets.hit(event.pos)
+            if button is not None:
+                scenes.finish(self, button is self.confirm_button)
+
+    def display(self):
+        draw_background(self.screen)
+        font = fonts.get(*MAIN_FONT)
+        self.screen.blit(text_cache.render(font, self.message, True, WHITE), (50, 50))
+        self.screen.blit(text_cache.render(font, self.detail, True, WHITE), (50, 100))
+        self.widgets.draw(self.screen)
+
+    def update_display(self):
+        renderer.update_hover(self.screen, self.widgets)
+
+
+class LoadingScene(Scene):
+    screen_name = "loading"
+
+    def __init__(
+        self, screen, startup, report=False, port=DEFAULT_PORT, record=None, replay=None
+    ):
+        super().__init__(screen)
+        self.startup = startup
+        self.report = report
+        self.port = port
+        self.record = record
+        self.replay = replay
+        self.preloader = Preloader(startup)
+        self.shown_progress = None
+
+    def enter(self):
+        super().enter()
+        # Runs on the next frame, after the first loading screen is presented
+        scheduler.call_later(0, self.begin)
+
+    def begin(self):
+        self.startup.mark("first frame")
+        pygame.mixer.init()
+        self.startup.mark("mixer init")
+        if self.replay is None:
+            open_game(analytics=AnswerStore(ANALYTICS_DIRECTORY))
         else:
-            pygame.draw.rect(screen, self.color, self.rect, border_radius=BUTTON_RADIUS)
-        screen.blit(self.text_surf, self.text_rect)
+            # Answers replayed stay in memory, out of the real statistics
+            open_game(ReplayBank(self.replay))
+        self.startup.mark("question bank")
+        self.preloader.start()
 
-    def is_clicked(self, mouse_pos):
-        return self.rect.collidepoint(mouse_pos)
+    def update(self):
+        if not self.preloader.finished:
+            return
+        if self.preloader.error is not None:
+            raise self.preloader.error
+        self.startup.mark("wait for preload")
+        for path, size in PRELOAD_IMAGES:
+            assets.scaled_image(path, size)
+        self.startup.mark("convert images")
+        if self.report:
+            self.startup.report()
+        # Loading waits on a thread, so a session is recorded from the menu on
+        if self.record is not None:
+            start_recording(self.record)
+        elif self.replay is not None:
+            start_replay(self.replay)
+        scenes.replace(MainMenu(self.screen, self.port))
+
+    def next_wake(self):
+        return clock.now()
+
+    def display(self):
+        self.screen.fill(LOADING_COLOR)
+        pygame.draw.rect(self.screen, WHITE, LOADING_BAR_RECT, 2)
+        self.shown_progress = None
+        self.update_display()
+
+    def update_display(self):
+        progress = self.preloader.progress
+        if progress == self.shown_progress:
+            return
+        self.shown_progress = progress
+        bar = pygame.Rect(LOADING_BAR_RECT).inflate(-8, -8)
+        bar.width = int(bar.width * progress)
+        pygame.draw.rect(self.screen, WHITE, bar)
+        renderer.invalidate(LOADING_BAR_RECT)
+
+
+class TextInputScene(Scene):
+    screen_name = "text_input"
+
+    def __init__(self, screen, prompt, input_height):
+        super().__init__(screen)
+        self.prompt = prompt
+        self.widgets = WidgetLayer()
+        self.submit_button = self.widgets.add(
+            Button(
+                (SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 150, 300, 50),
+                BUTTON_BG_COLOR,
+                "Submit",
+            )
+        )
+        self.cancel_button = self.widgets.add(
+            Button(
+                (SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 80, 300, 50),
+                BUTTON_BG_COLOR,
+                "Cancel",
+            )
+        )
+        self.text_input = TextInput((50, 100, SCREEN_WIDTH - 100, input_height))
+
+    def handle_event(self, event):
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
+            scenes.finish(self, self.text_input.text)
+        elif is_click(event):
+            button = self.widgets.hit(event.pos)
+            if button is self.cancel_button:
+                scenes.finish(self, None)
+            elif button is self.submit_button:
+                scenes.finish(self, self.text_input.text)
+        else:
+            self.text_input.handle_event(event)
+
+    def display(self):
+        draw_background(self.screen)
+        prompt_text = text_cache.render(fonts.get(*MAIN_FONT), self.prompt, True, WHITE)
+        self.screen.blit(prompt_text, (50, 50))
+        self.widgets.draw(self.screen)
+        self.text_input.draw(self.screen)
+
+    def update_display(self):
+        if self.text_input.changed:
+            renderer.invalidate(self.text_input.draw(self.screen))
+        renderer.update_hover(self.screen, self.widgets)
 
 
-class BaseMenu:
+class BaseMenu(Scene):
+    screen_name = "menu"
+
     def __init__(self, screen, title=None):
-        self.screen = screen
+        super().__init__(screen)
         self.title = title
-        self.options = []
+        self.widgets = WidgetLayer()
 
     def add_option(self, text, callback):
-        self.options.append((text, callback))
+        index = len(self.widgets)
+        self.widgets.add(
+            Button(
+                (
+                    SCREEN_WIDTH // 2 - 150,
+                    MENU_OPTION_TOP + index * MENU_OPTION_SPACING,
+                    300,
+                    MENU_OPTION_HEIGHT,
+                ),
+                BUTTON_BG_COLOR,
+                text,
+                callback,
+            )
+        )
 
     def display_background(self):
-        background = pygame.image.load(BACKGROUND_IMAGE)
-        self.screen.blit(
-            pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0)
-        )
+        draw_background(self.screen)
 
     def display_title(self):
         if self.title:
-            title_text = LOGO_FONT.render(self.title, True, WHITE)
+            title_text = text_cache.render(
+                fonts.get(*LOGO_FONT), self.title, True, WHITE
+            )
             self.screen.blit(
                 title_text, (SCREEN_WIDTH // 2 - title_text.get_width() // 2, 50)
             )
@@ -76,301 +1511,491 @@ class BaseMenu:
     def display(self):
         self.display_background()
         self.display_title()
-        for index, (option_text, callback) in enumerate(self.options):
-            option_button = Button(
-                (SCREEN_WIDTH // 2 - 150, 300 + index * 70, 300, 50),
-                BUTTON_BG_COLOR,
-                option_text,
-            )
-            option_button.draw(self.screen)
-        pygame.display.flip()
+        self.widgets.draw(self.screen)
 
-    def run(self):
-        running = True
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    for index, (option_text, callback) in enumerate(self.options):
-                        option_button = Button(
-                            (SCREEN_WIDTH // 2 - 150, 300 + index * 70, 300, 50),
-                            BUTTON_BG_COLOR,
-                            option_text,
-                        )
-                        if option_button.is_clicked(event.pos):
-                            callback()
-            self.display()
-            pygame.time.Clock().tick(30)
+    def update_display(self):
+        renderer.update_hover(self.screen, self.widgets)
+
+    def handle_event(self, event):
+        if is_click(event):
+            button = self.widgets.hit(event.pos)
+            if button is not None:
+                button.callback()
+                self.needs_redraw = True
 
 
 class MainMenu(BaseMenu):
-    def __init__(self, screen):
+    screen_name = "main_menu"
+
+    def __init__(self, screen, port=DEFAULT_PORT):
         super().__init__(screen, "Kahoot!")
+        self.port = port
         self.add_option("Add a Question", self.create_question_set)
         self.add_option("Add a Player", self.add_player)
         self.add_option("Start the Game", self.start_game)
+        self.add_option("Play Together", self.start_party)
+        self.add_option("Host a Network Game", self.host_game)
+        self.add_option("Statistics", self.show_statistics)
         self.add_option("Exit", self.exit_game)
-        pygame.mixer.music.load("music/background.mp3")
-        pygame.mixer.music.play(-1)
+
+    def enter(self):
+        super().enter()
+        audio.play_music(MENU_MUSIC)
 
     def create_question_set(self):
-        QuestionSetMenu(self.screen).run()
+        scenes.push(QuestionSetMenu(self.screen))
 
     def add_player(self):
-        PlayerMenu(self.screen).run()
+        scenes.push(PlayerMenu(self.screen))
 
     def start_game(self):
-        if len(game.question_sets) > 0 and len(game.players) > 0:
-            GameMenu(self.screen).run()
+        if game.question_count() > 0 and len(game.players) > 0:
+            scenes.push(
+                RoundMenu(self.screen, lambda: scenes.push(GameMenu(self.screen)))
+            )
         else:
             self.show_message(
                 "Cannot start game: At least one question and one player required"
             )
 
+    def start_party(self):
+        if game.question_count() == 0 or not game.players:
+            self.show_message(
+                "Cannot start game: At least one question and one player required"
+            )
+            return
+        joysticks = events.open_joysticks()
+        inputs = len(PARTY_KEY_GROUPS) + len(joysticks)
+        if len(game.players) > inputs:
+            self.show_message(
+                f"Cannot start game: {len(game.players)} players but only "
+                f"{inputs} key groups and gamepads"
+            )
+            return
+        scenes.push(
+            RoundMenu(
+                self.screen,
+                lambda: scenes.push(PartyGameMenu(self.screen, joysticks)),
+            )
+        )
+
+    def host_game(self):
+        if game.question_count() == 0:
+            self.show_message("Cannot host a game: Add at least one question first")
+            return
+        host = HostMenu(self.screen, self.port)
+        try:
+            host.server.start_in_thread()
+        except OSError as error:
+            self.show_message(f"Cannot host a game: {error.strerror}")
+        else:
+            scenes.push(host)
+
+    def show_statistics(self):
+        scenes.push(StatsMenu(self.screen))
+
     def exit_game(self):
         pygame.quit()
         sys.exit()
 
     def show_message(self, message):
-        self.display_background()
-        message_surf = MAIN_FONT.render(message, True, WHITE)
-        self.screen.blit(
-            message_surf,
-            (SCREEN_WIDTH // 2 - message_surf.get_width() // 2, SCREEN_HEIGHT // 2),
+        scenes.push(MessageScene(self.screen, message))
+
+
+class QuestionSlide:
+    def __init__(self, surface, buttons):
+        self.surface = surface
+        self.buttons = buttons
+
+
+def render_question_slide(question, answers):
+    surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+    draw_background(surface)
+    qa_rect = pygame.Rect(50, 50, SCREEN_WIDTH - 100, SCREEN_HEIGHT - 100)
+    pygame.draw.rect(surface, WHITE, qa_rect)
+    question_text = text_cache.render(
+        fonts.get(*MAIN_FONT), question["question"], True, BLACK
+    )
+    surface.blit(question_text, (qa_rect.x + 10, qa_rect.y + 10))
+    colors = [(224, 27, 62), (22, 103, 207), (214, 158, 1), (40, 135, 13)]
+    shapes = ["triangle", "diamond", "circle", "square"]
+    margin = 5
+    box_width = (qa_rect.width - 3 * margin) // 2
+    box_height = (qa_rect.height - 120 - 3 * margin) // 2
+    answer_positions = [
+        (qa_rect.x + margin, qa_rect.y + 120 + margin, box_width, box_height),
+        (
+            qa_rect.x + box_width + 2 * margin,
+            qa_rect.y + 120 + margin,
+            box_width,
+            box_height,
+        ),
+        (
+            qa_rect.x + margin,
+            qa_rect.y + 120 + box_height + 2 * margin,
+            box_width,
+            box_height,
+        ),
+        (
+            qa_rect.x + box_width + 2 * margin,
+            qa_rect.y + 120 + box_height + 2 * margin,
+            box_width,
+            box_height,
+        ),
+    ]
+    buttons = []
+    for i, answer in enumerate(answers):
+        color = colors[i]
+        shape = shapes[i]
+        pos = answer_positions[i]
+        answer_rect = pygame.Rect(pos)
+        pygame.draw.rect(surface, color, answer_rect)
+        draw_answer_shape(surface, shape, answer_rect, WHITE)
+        answer_text = text_cache.render(fonts.get(*MAIN_FONT), answer, True, WHITE)
+        surface.blit(
+            answer_text,
+            (answer_rect.x + 70, answer_rect.y + answer_rect.height // 2 - 10),
+        )
+        buttons.append(Button(answer_rect, color, answer))
+    return QuestionSlide(surface, buttons)
+
+
+def draw_answer_shape(screen, shape, rect, color):
+    text_height = fonts.get(*MAIN_FONT).size("A")[1]
+    shape_size = text_height // 2
+    center_x = rect.x + 35
+    center_y = rect.y + rect.height // 2
+    if shape == "triangle":
+        points = [
+            (center_x, center_y - shape_size),
+            (center_x - shape_size, center_y + shape_size),
+            (center_x + shape_size, center_y + shape_size),
+        ]
+        pygame.draw.polygon(screen, color, points)
+    elif shape == "diamond":
+        points = [
+            (center_x, center_y - shape_size),
+            (center_x - shape_size, center_y),
+            (center_x, center_y + shape_size),
+            (center_x + shape_size, center_y),
+        ]
+        pygame.draw.polygon(screen, color, points)
+    elif shape == "circle":
+        pygame.draw.circle(screen, color, (center_x, center_y), shape_size)
+    elif shape == "square":
+        pygame.draw.rect(
+            screen,
+            color,
+            pygame.Rect(
+                center_x - shape_size,
+                center_y - shape_size,
+                2 * shape_size,
+                2 * shape_size,
+            ),
         )
-        pygame.display.flip()
-        pygame.time.wait(3000)
+
+
+def draw_timer(screen, remaining_time):
+    timer_text = text_cache.render(
+        fonts.get(*MAIN_FONT), str(remaining_time), True, WHITE
+    )
+    timer_circle_color = (137, 76, 192)
+    pygame.draw.circle(screen, (0, 0, 0), (SCREEN_WIDTH - 50, 50), 30)
+    pygame.draw.circle(screen, timer_circle_color, (SCREEN_WIDTH - 50, 50), 30)
+    screen.blit(
+        timer_text,
+        (
+            SCREEN_WIDTH - 50 - timer_text.get_width() // 2,
+            50 - timer_text.get_height() // 2,
+        ),
+    )
+    renderer.invalidate(TIMER_RECT)
 
 
 class GameMenu(BaseMenu):
     def __init__(self, screen):
         super().__init__(screen, "Game Menu")
+        self.phase = "get_ready"
         self.current_question_index = 0
         self.start_time = None
-        self.answer_buttons = []
+        self.requested_at = None
+        self.presentation_delay = None
+        self.timer_value = None
         self.message = ""
         self.message_color = (102, 191, 58)
-        self.correct_sound = pygame.mixer.Sound("music/correct.wav")
-        self.incorrect_sound = pygame.mixer.Sound("music/wrong.wav")
-
-    def run(self):
-        self.current_question_index = 0
+        self.feedback = None
+        self.transition = None
+        self.score_page = 0
+        self.slides = {}
+        self.prefetch_call = None
+        audio.preload(CORRECT_SOUND, WRONG_SOUND)
+        game.start_round()
         game.current_player_index = 0
-        self.ask_questions_for_current_player()
 
-    def ask_questions_for_current_player(self):
-        player = game.players[game.current_player_index][0]
-        self.display_get_ready_screen(player)
-        waiting_for_enter = True
+    @property
+    def screen_name(self):
+        return self.phase
 
-        while waiting_for_enter:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        waiting_for_enter = False
+    def enter(self):
+        super().enter()
+        audio.play_music(GAME_MUSIC)
 
-        self.ask_questions()
-
-    def display_get_ready_screen(self, player):
-        background = pygame.image.load(BACKGROUND_IMAGE)
-        self.screen.blit(
-            pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0)
-        )
-        logo_text = LOGO_FONT.render("Kahoot!", True, WHITE)
-        logo_text = pygame.transform.scale(
-            logo_text,
-            (int(logo_text.get_width() * 0.5), int(logo_text.get_height() * 0.5)),
-        )
-        self.screen.blit(
-            logo_text, (SCREEN_WIDTH // 2 - logo_text.get_width() // 2, 20)
-        )
-        larger_font = pygame.font.Font("fonts/Montserrat-Bold.ttf", 40)
-        ready_text = larger_font.render(f"Get ready to play, {player}!", True, WHITE)
-        self.screen.blit(
-            ready_text,
-            (SCREEN_WIDTH // 2 - ready_text.get_width() // 2, SCREEN_HEIGHT // 2 - 50),
-        )
-        ready_press_text = MAIN_FONT.render(
-            "If you are ready, press ENTER.", True, WHITE
-        )
-        self.screen.blit(
-            ready_press_text,
-            (
-                SCREEN_WIDTH // 2 - ready_press_text.get_width() // 2,
-                SCREEN_HEIGHT - 100,
-            ),
-        )
-        pygame.display.flip()
+    def handle_event(self, event):
+        if self.phase == "get_ready":
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_RETURN:
+                self.start_question()
+        elif self.phase == "question":
+            if is_click(event) and self.start_time is not None:
+                button = self.widgets.hit(event.pos)
+                if button is not None:
+                    question = game.question_sets[self.current_question_index]
+                    self.check_answer(
+                        question,
+                        question["correct_answer"],
+                        button.text,
+                        getattr(event, "timestamp", None),
+                    )
+        elif (
+            self.phase == "score"
+            and event.type == pygame.KEYDOWN
+            and event.key in SCORE_PREVIOUS_KEYS
+        ):
+            if self.score_page > 0:
+                self.transition.cancel()
+                self.show_score_page(self.score_page - 1)
+        elif event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+            self.skip_transition()
+
+    def schedule_transition(self, delay, callback):
+        self.transition = scheduler.call_later(delay, self.run_transition, callback)
+
+    def run_transition(self, callback):
+        self.transition = None
+        callback()
+
+    def skip_transition(self):
+        if self.transition is not None:
+            transition = self.transition
+            transition.cancel()
+            self.run_transition(*transition.args)
+
+    def update(self):
+        if (
+            self.phase == "question"
+            and self.start_time is not None
+            and clock.now() - self.start_time >= QUESTION_SECONDS
+        ):
+            self.next_question()
 
-    def ask_questions(self):
-        while self.current_question_index < len(game.question_sets):
+    def display(self):
+        if self.phase == "get_ready":
+            self.display_get_ready_screen(game.players[game.current_player_index][0])
+            self.schedule_prefetch()
+        elif self.phase == "question":
             question = game.question_sets[self.current_question_index]
+            self.requested_at = clock.now()
             self.display_question_with_answers(question)
-            waiting_for_answer = True
-            self.start_time = time.time()
-            while waiting_for_answer and (time.time() - self.start_time) < 30:
-                for event in pygame.event.get():
-                    if event.type == pygame.QUIT:
-                        pygame.quit()
-                        sys.exit()
-                    if event.type == pygame.MOUSEBUTTONDOWN:
-                        for i, button in enumerate(self.answer_buttons):
-                            if button.is_clicked(event.pos):
-                                chosen_answer = button.text
-                                self.check_answer(
-                                    question, question["correct_answer"], chosen_answer
-                                )
-                                waiting_for_answer = False
-                self.update_timer()
-                pygame.time.Clock().tick(30)
-            self.current_question_index += 1
+            self.update_timer()
+            # The answer clock starts when the slide is on screen, not when
+            # drawing begins, so a slow frame never eats into the player's time.
+            renderer.after_present(self.question_presented)
+            self.schedule_prefetch()
+        elif self.phase == "feedback":
+            self.display_feedback(*self.feedback)
+        else:
+            self.display_score()
+
+    def question_presented(self, presented_at):
+        self.start_time = presented_at
+        self.presentation_delay = presented_at - self.requested_at
+
+    def update_display(self):
+        if self.phase == "question":
+            self.update_timer()
+
+    def next_wake(self):
+        if self.phase != "question" or self.start_time is None:
+            return None
+        elapsed = clock.now() - self.start_time
+        return self.start_time + math.floor(elapsed) + 1
+
+    def start_player(self):
+        self.phase = "get_ready"
+        self.current_question_index = 0
+        self.needs_redraw = True
+
+    def start_question(self):
+        self.phase = "question"
+        self.start_time = None
+        self.requested_at = None
+        self.presentation_delay = None
+        self.timer_value = None
+        self.needs_redraw = True
+
+    def next_question(self):
+        self.current_question_index += 1
+        if self.current_question_index < len(game.question_sets):
+            self.start_question()
+            return
         game.current_player_index += 1
         if game.current_player_index < len(game.players):
-            self.current_question_index = 0
-            self.ask_questions_for_current_player()
+            self.start_player()
         else:
-            self.display_score()
+            self.phase = "score"
+            self.show_score_page(0)
 
-    def update_timer(self):
-        elapsed_time = time.time() - self.start_time
-        remaining_time = max(0, int(30 - elapsed_time))
-        timer_text = MAIN_FONT.render(str(remaining_time), True, WHITE)
-        timer_circle_color = (137, 76, 192)
-        pygame.draw.circle(self.screen, (0, 0, 0), (SCREEN_WIDTH - 50, 50), 30)
-        pygame.draw.circle(self.screen, timer_circle_color, (SCREEN_WIDTH - 50, 50), 30)
-        self.screen.blit(
-            timer_text,
-            (
-                SCREEN_WIDTH - 50 - timer_text.get_width() // 2,
-                50 - timer_text.get_height() // 2,
-            ),
-        )
-        pygame.display.flip()
+    def show_score_page(self, page):
+        self.score_page = page
+        self.needs_redraw = True
+        self.schedule_transition(SCORE_SECONDS, self.next_score_page)
 
-    def show_points(self, points=0):
-        player_name = game.players[game.current_player_index][0]
-        game.scores[player_name] = game.scores.get(player_name, 0) + points
+    def next_score_page(self):
+        if (self.score_page + 1) * SCOREBOARD_ROWS < len(game.leaderboard):
+            self.show_score_page(self.score_page + 1)
+        else:
+            self.finish_game()
 
-    def display_question_with_answers(self, question):
-        background = pygame.image.load(BACKGROUND_IMAGE)
+    def finish_game(self):
+        if self.prefetch_call is not None:
+            self.prefetch_call.cancel()
+            self.prefetch_call = None
+        self.slides.clear()
+        game.reset_scores()
+        game.analytics.flush()
+        scenes.pop()
+
+    def display_get_ready_screen(self, player):
+        self.display_background()
+        logo_text = text_cache.render(fonts.get(*LOGO_FONT), "Kahoot!", True, WHITE)
+        logo_text = pygame.transform.scale(
+            logo_text,
+            (int(logo_text.get_width() * 0.5), int(logo_text.get_height() * 0.5)),
+        )
         self.screen.blit(
-            pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0)
+            logo_text, (SCREEN_WIDTH // 2 - logo_text.get_width() // 2, 20)
         )
-        qa_rect = pygame.Rect(50, 50, SCREEN_WIDTH - 100, SCREEN_HEIGHT - 100)
-        pygame.draw.rect(self.screen, WHITE, qa_rect)
-        question_text = MAIN_FONT.render(question["question"], True, BLACK)
-        self.screen.blit(question_text, (qa_rect.x + 10, qa_rect.y + 10))
-        colors = [(224, 27, 62), (22, 103, 207), (214, 158, 1), (40, 135, 13)]
-        shapes = ["triangle", "diamond", "circle", "square"]
-        answers = question["incorrect_answers"] + [question["correct_answer"]]
-        random.shuffle(answers)
-        margin = 5
-        box_width = (qa_rect.width - 3 * margin) // 2
-        box_height = (qa_rect.height - 120 - 3 * margin) // 2
-        answer_positions = [
-            (qa_rect.x + margin, qa_rect.y + 120 + margin, box_width, box_height),
-            (
-                qa_rect.x + box_width + 2 * margin,
-                qa_rect.y + 120 + margin,
-                box_width,
-                box_height,
-            ),
-            (
-                qa_rect.x + margin,
-                qa_rect.y + 120 + box_height + 2 * margin,
-                box_width,
-                box_height,
-            ),
+        ready_text = text_cache.render(
+            fonts.get(*HEADING_FONT), f"Get ready to play, {player}!", True, WHITE
+        )
+        self.screen.blit(
+            ready_text,
+            (SCREEN_WIDTH // 2 - ready_text.get_width() // 2, SCREEN_HEIGHT // 2 - 50),
+        )
+        ready_press_text = text_cache.render(
+            fonts.get(*MAIN_FONT), "If you are ready, press ENTER.", True, WHITE
+        )
+        self.screen.blit(
+            ready_press_text,
             (
-                qa_rect.x + box_width + 2 * margin,
-                qa_rect.y + 120 + box_height + 2 * margin,
-                box_width,
-                box_height,
+                SCREEN_WIDTH // 2 - ready_press_text.get_width() // 2,
+                SCREEN_HEIGHT - 100,
             ),
-        ]
-        self.answer_buttons = []
-        for i, answer in enumerate(answers):
-            color = colors[i]
-            shape = shapes[i]
-            pos = answer_positions[i]
-            answer_rect = pygame.Rect(pos)
-            pygame.draw.rect(self.screen, color, answer_rect)
-            self.draw_shape(self.screen, shape, answer_rect, WHITE)
-            answer_text = MAIN_FONT.render(answer, True, WHITE)
-            self.screen.blit(
-                answer_text,
-                (answer_rect.x + 70, answer_rect.y + answer_rect.height // 2 - 10),
-            )
-            answer_button = Button(answer_rect, color, answer)
-            self.answer_buttons.append(answer_button)
-        pygame.display.flip()
-
-    def draw_shape(self, screen, shape, rect, color):
-        text_height = MAIN_FONT.size("A")[1]
-        shape_size = text_height // 2
-        center_x = rect.x + 35
-        center_y = rect.y + rect.height // 2
-        if shape == "triangle":
-            points = [
-                (center_x, center_y - shape_size),
-                (center_x - shape_size, center_y + shape_size),
-                (center_x + shape_size, center_y + shape_size),
-            ]
-            pygame.draw.polygon(screen, color, points)
-        elif shape == "diamond":
-            points = [
-                (center_x, center_y - shape_size),
-                (center_x - shape_size, center_y),
-                (center_x, center_y + shape_size),
-                (center_x + shape_size, center_y),
-            ]
-            pygame.draw.polygon(screen, color, points)
-        elif shape == "circle":
-            pygame.draw.circle(screen, color, (center_x, center_y), shape_size)
-        elif shape == "square":
-            pygame.draw.rect(
-                screen,
-                color,
-                pygame.Rect(
-                    center_x - shape_size,
-                    center_y - shape_size,
-                    2 * shape_size,
-                    2 * shape_size,
-                ),
-            )
+        )
+
+    def update_timer(self):
+        elapsed_time = 0 if self.start_time is None else clock.now() - self.start_time
+        remaining_time = max(0, int(QUESTION_SECONDS - elapsed_time))
+        if remaining_time == self.timer_value:
+            return
+        self.timer_value = remaining_time
+        draw_timer(self.screen, remaining_time)
+
+    def show_points(self, points=0):
+        player_name = game.players[game.current_player_index][0]
+        game.leaderboard.add(player_name, points)
+
+    def display_question_with_answers(self, question):
+        slide = self.slides.pop(self.slide_key(), None)
+        if slide is None:
+            slide = self.render_slide(question)
+        self.screen.blit(slide.surface, (0, 0))
+        self.widgets.clear()
+        for button in slide.buttons:
+            self.widgets.add(button)
+
+    def slide_key(self):
+        return game.current_player_index, self.current_question_index
+
+    def upcoming_slides(self):
+        player, index = self.slide_key()
+        # The current slide stays upcoming until the question screen shows it
+        if self.phase != "get_ready" and self.start_time is not None:
+            index += 1
+        for _ in range(PREFETCH_QUESTIONS):
+            if index >= len(game.question_sets):
+                player, index = player + 1, 0
+                if player >= len(game.players):
+                    return
+            yield player, index
+            index += 1
+
+    def schedule_prefetch(self):
+        if self.prefetch_call is None:
+            self.prefetch_call = scheduler.call_later(0, self.prefetch)
+
+    def prefetch(self):
+        # Renders one slide per frame so a long window never stalls the timer
+        self.prefetch_call = None
+        wanted = list(self.upcoming_slides())
+        for key in list(self.slides):
+            if key not in wanted:
+                del self.slides[key]
+        for key in wanted:
+            if key not in self.slides:
+                self.slides[key] = self.render_slide(game.question_sets[key[1]])
+                self.schedule_prefetch()
+                return
+
+    def render_slide(self, question):
+        answers = question["incorrect_answers"] + [question["correct_answer"]]
+        random.shuffle(answers)
+        return render_question_slide(question, answers)
 
-    def check_answer(self, question, correct_answer, chosen_answer):
-        end_time = time.time()
-        time_taken = end_time - self.start_time
+    def check_answer(self, question, correct_answer, chosen_answer, answered_at=None):
+        player_name = game.players[game.current_player_index][0]
+        score = self.record_answer(player_name, question, chosen_answer, answered_at)
         if chosen_answer == correct_answer:
-            score = max(0, 100 - int(time_taken * 10))
             self.message = f"Good job! +{score} points"
             self.message_color = (102, 191, 58)
-            self.correct_sound.play()
+            audio.play(CORRECT_SOUND)
         else:
-            score = 0
             self.message = "You were close! 0 points"
             self.message_color = (224, 27, 62)
-            self.incorrect_sound.play()
-        player_name = game.players[game.current_player_index][0]
-        if player_name not in game.scores:
-            game.scores[player_name] = 0
-        game.scores[player_name] += score
-        self.display_feedback(question, correct_answer, chosen_answer)
+            audio.play(WRONG_SOUND)
+        self.phase = "feedback"
+        self.feedback = (question, correct_answer, chosen_answer)
+        self.needs_redraw = True
+        self.schedule_transition(FEEDBACK_SECONDS, self.next_question)
+
+    def record_answer(self, player_name, question, chosen_answer, answered_at=None):
+        handled_at = clock.now()
+        if answered_at is None:
+            answered_at = handled_at
+        time_taken = max(0.0, answered_at - self.start_time)
+        correct = chosen_answer == question["correct_answer"]
+        score = answer_score(correct, time_taken)
+        game.leaderboard.add(player_name, score)
+        game.analytics.add_answer(question, player_name, chosen_answer, time_taken)
+        game.answer_log.append(
+            {
+                "player": player_name,
+                "question": question["question"],
+                "correct": correct,
+                "score": score,
+                "response_seconds": time_taken,
+                "handling_delay": handled_at - answered_at,
+                "presentation_delay": self.presentation_delay,
+            }
+        )
+        return score
 
     def display_feedback(self, question, correct_answer, chosen_answer):
-        background = pygame.image.load(BACKGROUND_IMAGE)
-        self.screen.blit(
-            pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0)
-        )
+        self.display_background()
         qa_rect = pygame.Rect(50, 50, SCREEN_WIDTH - 100, SCREEN_HEIGHT - 100)
         pygame.draw.rect(self.screen, WHITE, qa_rect)
-        question_text = MAIN_FONT.render(question["question"], True, BLACK)
+        question_text = text_cache.render(
+            fonts.get(*MAIN_FONT), question["question"], True, BLACK
+        )
         self.screen.blit(question_text, (qa_rect.x + 10, qa_rect.y + 10))
         margin = 5
         box_width = (qa_rect.width - 3 * margin) // 2
@@ -396,7 +2021,7 @@ class GameMenu(BaseMenu):
                 box_height,
             ),
         ]
-        for i, button in enumerate(self.answer_buttons):
+        for i, button in enumerate(self.widgets):
             answer_rect = button.rect
             if button.text == correct_answer:
                 color = (102, 191, 58)
@@ -411,12 +2036,16 @@ class GameMenu(BaseMenu):
             surface.set_alpha(alpha)
             surface.fill(color)
             self.screen.blit(surface, (answer_rect.x, answer_rect.y))
-            answer_text = MAIN_FONT.render(button.text, True, WHITE)
+            answer_text = text_cache.render(
+                fonts.get(*MAIN_FONT), button.text, True, WHITE
+            )
             self.screen.blit(
                 answer_text,
                 (answer_rect.x + 70, answer_rect.y + answer_rect.height // 2 - 10),
             )
-        message_surface = MAIN_FONT.render(self.message, True, BLACK)
+        message_surface = text_cache.render(
+            fonts.get(*MAIN_FONT), self.message, True, BLACK
+        )
         message_bg = pygame.Surface(
             (message_surface.get_width() + 20, message_surface.get_height() + 10)
         )
@@ -425,70 +2054,206 @@ class GameMenu(BaseMenu):
         self.screen.blit(
             message_surface, (qa_rect.x + 20, qa_rect.y + qa_rect.height + 25)
         )
-        pygame.display.flip()
-        pygame.time.wait(3000)
 
     def display_score(self):
-        background = pygame.image.load(BACKGROUND_IMAGE)
-        self.screen.blit(
-            pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0)
-        )
-        small_logo_font = pygame.font.Font("fonts/gooddog-plain.regular.ttf", 80)
-        logo_text = small_logo_font.render("Kahoot!", True, WHITE)
+        self.display_background()
+        small_logo_font = fonts.get(*SMALL_LOGO_FONT)
+        logo_text = text_cache.render(small_logo_font, "Kahoot!", True, WHITE)
         self.screen.blit(
             logo_text, (SCREEN_WIDTH // 2 - logo_text.get_width() // 2, 20)
         )
-        title_font = pygame.font.Font("fonts/Montserrat-Bold.ttf", 40)
-        scoreboard_text = title_font.render("Scoreboard", True, WHITE)
+        title_font = fonts.get(*HEADING_FONT)
+        scoreboard_text = text_cache.render(title_font, "Scoreboard", True, WHITE)
         self.screen.blit(
             scoreboard_text, (SCREEN_WIDTH // 2 - scoreboard_text.get_width() // 2, 120)
         )
-        sorted_scores = sorted(
-            game.scores.items(), key=lambda item: item[1], reverse=True
-        )
-        ranking_font = pygame.font.Font("fonts/Montserrat-Bold.ttf", 25)
-        y_offset = 200
-        previous_score = None
-        for rank, (player, score) in enumerate(sorted_scores, 1):
-            rank_text = ranking_font.render(f"{rank}. {player}", True, WHITE)
-            score_text = ranking_font.render(f"{score}", True, WHITE)
-            self.screen.blit(rank_text, (100, y_offset))
-            self.screen.blit(score_text, (SCREEN_WIDTH - 200, y_offset))
-            if previous_score is not None:
-                difference = previous_score - score
-                diff_text = ranking_font.render(f"-{difference}", True, WHITE)
-                self.screen.blit(
-                    diff_text,
-                    (SCREEN_WIDTH // 2 - diff_text.get_width() // 2, y_offset),
-                )
-            previous_score = score
-            y_offset += 50
-        pygame.display.flip()
-        pygame.time.wait(5000)
-        game.reset_scores()
-        main_menu = MainMenu(self.screen)
-        main_menu.run()
+        for index, row in enumerate(
+            game.leaderboard.page(self.score_page * SCOREBOARD_ROWS, SCOREBOARD_ROWS)
+        ):
+            self.screen.blit(score_rows.render(*row), (100, 200 + index * 50))
+        pages = -(-len(game.leaderboard) // SCOREBOARD_ROWS)
+        if pages > 1:
+            page_text = text_cache.render(
+                fonts.get(*MAIN_FONT),
+                f"Page {self.score_page + 1} / {pages}",
+                True,
+                WHITE,
+            )
+            self.screen.blit(
+                page_text,
+                (SCREEN_WIDTH // 2 - page_text.get_width() // 2, SCREEN_HEIGHT - 45),
+            )
 
 
-class Game:
-    def __init__(self):
-        self.players = []
-        self.question_sets = []
-        self.current_player_index = 0
-        self.scores = {}
-
-    def start(self, screen):
-        if len(self.question_sets) > 0 and len(self.players) > 0:
-            pygame.quit()
-            sys.exit()
+class PartyGameMenu(GameMenu):
+    # Every player answers the same question at once on one screen, each on
+    # their own key group or gamepad, so a round takes one question set.
+    def __init__(self, screen, joysticks=()):
+        super().__init__(screen)
+        # Instance ids of the open gamepads, as their button events carry them
+        self.joysticks = list(joysticks)
+        self.bindings = []
+        self.keys = {}
+        self.buttons = {}
+        for (name, _), group in zip(game.players, PARTY_KEY_GROUPS):
+            self.bind(name, " ".join(pygame.key.name(key) for key in group))
+            for slot, key in enumerate(group):
+                self.keys[key] = (name, slot)
+        gamepad_players = game.players[len(PARTY_KEY_GROUPS) :]
+        for number, ((name, _), instance_id) in enumerate(
+            zip(gamepad_players, self.joysticks)
+        ):
+            self.bind(name, f"gamepad {number + 1}")
+            for slot in range(PARTY_JOYSTICK_BUTTONS):
+                self.buttons[instance_id, slot] = (name, slot)
+        self.slot_answers = []
+        self.responses = {}
+        self.shown_status = None
+
+    def bind(self, player_name, label):
+        self.bindings.append((player_name, label))
+        game.leaderboard.add(player_name, 0)
+
+    def input_binding(self, event):
+        # One dict lookup per event, so a whole frame's burst is cheap to score
+        if event.type == pygame.KEYDOWN:
+            return self.keys.get(event.key)
+        if event.type == pygame.JOYBUTTONDOWN:
+            return self.buttons.get((event.instance_id, event.button))
+        return None
+
+    def handle_event(self, event):
+        binding = self.input_binding(event)
+        if binding is None:
+            if self.phase != "question":
+                super().handle_event(event)
+        elif self.phase == "question" and self.start_time is not None:
+            self.check_answer(*binding, getattr(event, "timestamp", None))
+
+    def check_answer(self, player_name, slot, answered_at=None):
+        if player_name in self.responses or slot >= len(self.slot_answers):
+            return
+        if answered_at is not None and (
+            answered_at - self.start_time > QUESTION_SECONDS
+        ):
+            return
+        question = game.question_sets[self.current_question_index]
+        chosen_answer = self.slot_answers[slot]
+        score = self.record_answer(player_name, question, chosen_answer, answered_at)
+        self.responses[player_name] = (chosen_answer, score)
+
+    def update(self):
+        # Runs after the frame's events, so inputs stamped before the deadline
+        # still count even when they are handled just after it.
+        if self.phase == "question" and self.start_time is not None:
+            if len(self.responses) == len(self.bindings) or (
+                clock.now() - self.start_time >= QUESTION_SECONDS
+            ):
+                self.end_question()
+
+    def start_question(self):
+        super().start_question()
+        self.responses = {}
+        self.shown_status = None
+
+    def end_question(self):
+        question = game.question_sets[self.current_question_index]
+        correct_answer = question["correct_answer"]
+        correct = sum(chosen == correct_answer for chosen, _ in self.responses.values())
+        self.message = f"{correct} of {len(self.bindings)} got it right"
+        if correct:
+            self.message_color = (102, 191, 58)
+            audio.play(CORRECT_SOUND)
         else:
-            main_menu = MainMenu(screen)
-            main_menu.show_message(
-                "Cannot start game: At least one question and one player required"
+            self.message_color = (224, 27, 62)
+            audio.play(WRONG_SOUND)
+        self.phase = "feedback"
+        self.feedback = (question, correct_answer, None)
+        self.needs_redraw = True
+        self.schedule_transition(FEEDBACK_SECONDS, self.next_question)
+
+    def next_question(self):
+        self.current_question_index += 1
+        if self.current_question_index < len(game.question_sets):
+            self.start_question()
+        else:
+            self.phase = "score"
+            self.show_score_page(0)
+
+    def display(self):
+        if self.phase == "get_ready":
+            self.display_bindings()
+            self.schedule_prefetch()
+            return
+        super().display()
+        if self.phase == "question":
+            self.slot_answers = [button.text for button in self.widgets]
+            self.shown_status = None
+            self.update_status()
+
+    def update_display(self):
+        super().update_display()
+        if self.phase == "question":
+            self.update_status()
+
+    def update_status(self):
+        status = len(self.responses)
+        if status == self.shown_status:
+            return
+        self.shown_status = status
+        self.screen.blit(
+            assets.scaled_image(BACKGROUND_IMAGE, (SCREEN_WIDTH, SCREEN_HEIGHT)),
+            PARTY_STATUS_RECT[:2],
+            PARTY_STATUS_RECT,
+        )
+        status_text = text_cache.render(
+            fonts.get(*MAIN_FONT),
+            f"{status} / {len(self.bindings)} answered",
+            True,
+            WHITE,
+        )
+        self.screen.blit(
+            status_text,
+            (SCREEN_WIDTH // 2 - status_text.get_width() // 2, SCREEN_HEIGHT - 40),
+        )
+        renderer.invalidate(PARTY_STATUS_RECT)
+
+    def display_bindings(self):
+        self.display_background()
+        ready_text = text_cache.render(
+            fonts.get(*HEADING_FONT), "Get ready to play together!", True, WHITE
+        )
+        self.screen.blit(
+            ready_text, (SCREEN_WIDTH // 2 - ready_text.get_width() // 2, 60)
+        )
+        font = fonts.get(*MAIN_FONT)
+        for index, (player_name, label) in enumerate(self.bindings):
+            column, row = divmod(index, PARTY_BINDING_ROWS)
+            binding_text = text_cache.render(
+                font, f"{player_name}: {label}", True, WHITE
             )
+            self.screen.blit(binding_text, (100 + column * 350, 160 + row * 45))
+        ready_press_text = text_cache.render(
+            font, "If you are ready, press ENTER.", True, WHITE
+        )
+        self.screen.blit(
+            ready_press_text,
+            (
+                SCREEN_WIDTH // 2 - ready_press_text.get_width() // 2,
+                SCREEN_HEIGHT - 100,
+            ),
+        )
 
-    def reset_scores(self):
-        self.scores = {}
+    def slide_key(self):
+        return 0, self.current_question_index
+
+    def upcoming_slides(self):
+        start = self.current_question_index
+        if self.phase != "get_ready" and self.start_time is not None:
+            start += 1
+        end = min(start + PREFETCH_QUESTIONS, len(game.question_sets))
+        for index in range(start, end):
+            yield 0, index
 
 
 class QuestionSet:
@@ -503,342 +2268,671 @@ class QuestionSet:
             BUTTON_BG_COLOR,
             "Back to main menu",
         )
-        pygame.mixer.music.load("music/background.mp3")
-        pygame.mixer.music.play(-1)
-        self.button_click_sound = pygame.mixer.Sound("music/click.mp3")
 
     def process_add_question_set(self, screen):
-        question = self.get_text_input("Enter the question: ", screen)
+        question = yield self.get_text_input("Enter the question: ", screen)
         if question is None:
             return
-        correct_answer = self.get_text_input("Enter the correct answer: ", screen)
+        correct_answer = yield self.get_text_input("Enter the correct answer: ", screen)
         if correct_answer is None:
             return
+        # Checked once the answer is known, since a similar question with
+        # another answer is a different question; the teacher has the final say.
+        duplicate = game.find_duplicate(
+            {"question": question, "correct_answer": correct_answer}
+        )
+        if duplicate is not None:
+            kind, question_id = duplicate
+            add_anyway = yield ConfirmScene(
+                screen,
+                f"{DUPLICATE_MESSAGES[kind]}:",
+                game.bank.get_question(question_id)["question"],
+                "Add it anyway",
+            )
+            if not add_anyway:
+                return
         incorrect_answers = []
         for i in range(3):
-            incorrect_answer = self.get_text_input(
+            incorrect_answer = yield self.get_text_input(
                 f"Enter incorrect answer {i + 1}: ", screen
             )
             if incorrect_answer is None:
                 return
             incorrect_answers.append(incorrect_answer)
-        game.question_sets.append(
+        game.add_question(
             {
                 "question": question,
                 "correct_answer": correct_answer,
                 "incorrect_answers": incorrect_answers,
-            }
+            },
+            skip_duplicates=False,
         )
-        self.display_message(screen, "Question added")
+        yield self.display_message(screen, "Question added")
 
     def get_text_input(self, prompt, screen):
-        text = ""
-        input_active = True
-        submit_button = Button(
-            (SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 150, 300, 50),
-            BUTTON_BG_COLOR,
-            "Submit",
-        )
-        cancel_button = Button(
-            (SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 80, 300, 50),
-            BUTTON_BG_COLOR,
-            "Cancel",
-        )
-        input_rect = pygame.Rect(50, 100, SCREEN_WIDTH - 100, 200)
-        input_color = WHITE
-        input_border_radius = 20
-        max_text_width = input_rect.width - 20
-        max_lines = (input_rect.height - 20) // MAIN_FONT.get_height()
-
-        while input_active:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        input_active = False
-                    elif event.key == pygame.K_BACKSPACE:
-                        text = text[:-1]
-                    else:
-                        text += event.unicode
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if cancel_button.is_clicked(event.pos):
-                        return None
-                    if submit_button.is_clicked(event.pos):
-                        input_active = False
-
-            background = pygame.image.load(BACKGROUND_IMAGE)
-            screen.blit(
-                pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT)),
-                (0, 0),
-            )
-            prompt_text = MAIN_FONT.render(prompt, True, WHITE)
-            pygame.draw.rect(
-                screen, input_color, input_rect, border_radius=input_border_radius
-            )
-
-            words = text.split(" ")
-            lines = []
-            current_line = ""
-            for word in words:
-                if current_line:
-                    test_line = current_line + " " + word
-                else:
-                    test_line = word
-                if (
-                    MAIN_FONT.render(test_line, True, BLACK).get_width()
-                    <= max_text_width
-                ):
-                    current_line = test_line
-                else:
-                    lines.append(current_line)
-                    current_line = word + " "
-
-            lines.append(current_line)
-            lines = lines[-max_lines:]
-
-            screen.blit(prompt_text, (50, 50))
-            for i, line in enumerate(lines):
-                input_text = MAIN_FONT.render(line, True, BLACK)
-                screen.blit(
-                    input_text,
-                    (input_rect.x + 10, input_rect.y + 10 + i * MAIN_FONT.get_height()),
-                )
-            submit_button.draw(screen)
-            cancel_button.draw(screen)
-            pygame.display.flip()
-            pygame.time.Clock().tick(30)
-        return text
+        return TextInputScene(screen, prompt, 200)
 
     def display_message(self, screen, message):
-        background = pygame.image.load(BACKGROUND_IMAGE)
-        screen.blit(
-            pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0)
-        )
-        message_surf = MAIN_FONT.render(message, True, WHITE)
-        screen.blit(
-            message_surf,
-            (SCREEN_WIDTH // 2 - message_surf.get_width() // 2, SCREEN_HEIGHT // 2),
-        )
-        pygame.display.flip()
-        pygame.time.wait(3000)
+        return MessageScene(screen, message)
 
 
 class QuestionSetMenu(BaseMenu):
+    screen_name = "question_list"
+
     def __init__(self, screen):
         super().__init__(screen, "Questions")
         self.question_set = QuestionSet()
+        self.widgets.add(self.question_set.add_button)
+        self.widgets.add(self.question_set.back_button)
+        self.search_input = TextInput(
+            SEARCH_RECT, placeholder="Type to search questions and answers"
+        )
+        self.query = ""
+        self.match_count = 0
+        self.list_view = VirtualList(
+            LIST_RECT,
+            lambda: self.match_count,
+            lambda offset, limit: [
+                question["question"]
+                for question in game.bank.search(self.query, offset, limit)
+            ],
+        )
 
-    def run(self):
-        running = True
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                self.handle_event(event)
-            self.display()
-            pygame.time.Clock().tick(30)
+    def enter(self):
+        super().enter()
+        self.match_count = game.bank.search_count(self.query)
+        self.list_view.reset()
+
+    def search(self, query):
+        # Counting is a single FTS lookup; rows are fetched lazily by the list
+        self.query = query
+        self.match_count = game.bank.search_count(query)
+        self.list_view.offset = 0
+        self.list_view.reset()
+        self.needs_redraw = True
 
     def display(self):
-        background = pygame.image.load(BACKGROUND_IMAGE)
-        self.screen.blit(
-            pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0)
-        )
-        if not game.question_sets:
-            no_questions_text = MAIN_FONT.render("No questions yet!", True, WHITE)
+        self.display_background()
+        self.search_input.draw(self.screen)
+        self.list_view.draw(self.screen)
+        if not self.match_count:
+            no_questions_text = text_cache.render(
+                fonts.get(*MAIN_FONT),
+                "No matching questions." if self.query else "No questions yet!",
+                True,
+                WHITE,
+            )
             self.screen.blit(
                 no_questions_text,
                 (SCREEN_WIDTH // 2 - no_questions_text.get_width() // 2, 200),
             )
-        for index, qset in enumerate(game.question_sets):
-            qset_text = MAIN_FONT.render(qset["question"], True, WHITE)
-            self.screen.blit(qset_text, (50, 100 + index * 70))
-        self.question_set.add_button.draw(self.screen)
-        self.question_set.back_button.draw(self.screen)
-        pygame.display.flip()
+        self.widgets.draw(self.screen)
+
+    def update_display(self):
+        if self.list_view.changed:
+            renderer.invalidate(self.list_view.draw(self.screen))
+        super().update_display()
 
     def handle_event(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if self.question_set.add_button.is_clicked(event.pos):
-                self.question_set.process_add_question_set(self.screen)
-            if self.question_set.back_button.is_clicked(event.pos):
+        if self.list_view.handle_event(event):
+            return
+        self.search_input.handle_event(event)
+        if self.search_input.text != self.query:
+            self.search(self.search_input.text)
+        if is_click(event):
+            button = self.widgets.hit(event.pos)
+            if button is self.question_set.add_button:
+                scenes.start_flow(
+                    self.question_set.process_add_question_set(self.screen)
+                )
+            elif button is self.question_set.back_button:
                 self.go_back_to_main_menu()
 
     def go_back_to_main_menu(self):
-        main_menu = MainMenu(self.screen)
-        main_menu.run()
+        scenes.pop()
 
 
 class PlayerSet:
     def __init__(self):
         self.add_button = Button(
-            (SCREEN_WIDTH // 2 - 150, 400, 300, 50), BUTTON_BG_COLOR, "Add a player"
+            (SCREEN_WIDTH // 2 - 310, 400, 300, 50), BUTTON_BG_COLOR, "Add a player"
+        )
+        self.clear_button = Button(
+            (SCREEN_WIDTH // 2 + 10, 400, 300, 50),
+            BUTTON_BG_COLOR,
+            "Remove all players",
         )
         self.back_button = Button(
             (SCREEN_WIDTH // 2 - 150, 500, 300, 50),
             BUTTON_BG_COLOR,
             "Back to main menu",
         )
-        self.button_click_sound = pygame.mixer.Sound("music/click.mp3")
 
     def process_add_player(self, screen):
-        player_name = self.get_text_input("Enter player's name: ", screen)
+        player_name = yield self.get_text_input("Enter player's name: ", screen)
         if player_name is not None:
-            game.players.append((player_name, 0))
-            self.display_message(screen, "Player added")
+            game.add_player(player_name)
+            yield self.display_message(screen, "Player added")
         else:
-            self.display_message(screen, "Adding player was cancelled.")
+            yield self.display_message(screen, "Adding player was cancelled.")
 
     def get_text_input(self, prompt, screen):
-        text = ""
-        input_active = True
-        submit_button = Button(
-            (SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 150, 300, 50),
-            BUTTON_BG_COLOR,
-            "Submit",
-        )
-        cancel_button = Button(
-            (SCREEN_WIDTH // 2 - 150, SCREEN_HEIGHT - 80, 300, 50),
-            BUTTON_BG_COLOR,
-            "Cancel",
-        )
-        input_rect = pygame.Rect(50, 100, SCREEN_WIDTH - 100, 50)
-        input_color = WHITE
-        input_border_radius = 20
-        max_text_width = input_rect.width - 20
-        max_lines = (input_rect.height - 20) // MAIN_FONT.get_height()
-
-        while input_active:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_RETURN:
-                        input_active = False
-                    elif event.key == pygame.K_BACKSPACE:
-                        text = text[:-1]
-                    else:
-                        text += event.unicode
-                if event.type == pygame.MOUSEBUTTONDOWN:
-                    if cancel_button.is_clicked(event.pos):
-                        return None
-                    if submit_button.is_clicked(event.pos):
-                        input_active = False
-
-            background = pygame.image.load(BACKGROUND_IMAGE)
-            screen.blit(
-                pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT)),
-                (0, 0),
-            )
-            prompt_text = MAIN_FONT.render(prompt, True, WHITE)
-            pygame.draw.rect(
-                screen, input_color, input_rect, border_radius=input_border_radius
-            )
-
-            words = text.split(" ")
-            lines = []
-            current_line = ""
-
-            for word in words:
-                test_line = current_line + word + " "
-                if (
-                    MAIN_FONT.render(test_line, True, BLACK).get_width()
-                    <= max_text_width
-                ):
-                    current_line = test_line
-                else:
-                    lines.append(current_line)
-                    current_line = word + " "
-
-            lines.append(current_line)
-            lines = lines[-max_lines:]
-
-            screen.blit(prompt_text, (50, 50))
-            for i, line in enumerate(lines):
-                input_text = MAIN_FONT.render(line.strip(), True, BLACK)
-                screen.blit(
-                    input_text,
-                    (input_rect.x + 10, input_rect.y + 10 + i * MAIN_FONT.get_height()),
-                )
-            submit_button.draw(screen)
-            cancel_button.draw(screen)
-            pygame.display.flip()
-            pygame.time.Clock().tick(30)
-        return text
+        return TextInputScene(screen, prompt, 50)
 
     def display_message(self, screen, message):
-        background = pygame.image.load(BACKGROUND_IMAGE)
-        screen.blit(
-            pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0)
-        )
-        message_surf = MAIN_FONT.render(message, True, WHITE)
-        screen.blit(
-            message_surf,
-            (SCREEN_WIDTH // 2 - message_surf.get_width() // 2, SCREEN_HEIGHT // 2),
-        )
-        pygame.display.flip()
-        pygame.time.wait(3000)
+        return MessageScene(screen, message)
 
 
 class PlayerMenu(BaseMenu):
+    screen_name = "player_list"
+
     def __init__(self, screen):
         super().__init__(screen, "Current players")
         self.player_set = PlayerSet()
+        self.widgets.add(self.player_set.add_button)
+        self.widgets.add(self.player_set.clear_button)
+        self.widgets.add(self.player_set.back_button)
+        self.list_view = VirtualList(
+            LIST_RECT,
+            lambda: len(game.players),
+            lambda offset, limit: [
+                name for name, _ in game.players[offset : offset + limit]
+            ],
+        )
 
-    def run(self):
-        running = True
-        while running:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    pygame.quit()
-                    sys.exit()
-                self.handle_event(event)
-            self.display()
-            pygame.time.Clock().tick(30)
+    def enter(self):
+        super().enter()
+        self.list_view.reset()
 
     def display(self):
-        background = pygame.image.load(BACKGROUND_IMAGE)
-        self.screen.blit(
-            pygame.transform.scale(background, (SCREEN_WIDTH, SCREEN_HEIGHT)), (0, 0)
-        )
+        self.display_background()
+        self.list_view.draw(self.screen)
         if not game.players:
-            no_players_text = MAIN_FONT.render("No players yet!", True, WHITE)
+            no_players_text = text_cache.render(
+                fonts.get(*MAIN_FONT), "No players yet!", True, WHITE
+            )
             self.screen.blit(
                 no_players_text,
                 (SCREEN_WIDTH // 2 - no_players_text.get_width() // 2, 200),
             )
-        for index, player in enumerate(game.players):
-            player_text = MAIN_FONT.render(player[0], True, WHITE)
-            self.screen.blit(player_text, (50, 100 + index * 70))
-        self.player_set.add_button.draw(self.screen)
-        self.player_set.back_button.draw(self.screen)
-        pygame.display.flip()
+        self.widgets.draw(self.screen)
+
+    def update_display(self):
+        if self.list_view.changed:
+            renderer.invalidate(self.list_view.draw(self.screen))
+        super().update_display()
 
     def handle_event(self, event):
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if self.player_set.add_button.is_clicked(event.pos):
-                self.player_set.process_add_player(self.screen)
-            if self.player_set.back_button.is_clicked(event.pos):
+        if self.list_view.handle_event(event):
+            return
+        if is_click(event):
+            button = self.widgets.hit(event.pos)
+            if button is self.player_set.add_button:
+                scenes.start_flow(self.player_set.process_add_player(self.screen))
+            elif button is self.player_set.clear_button:
+                game.clear_players()
+                self.list_view.reset()
+                self.needs_redraw = True
+            elif button is self.player_set.back_button:
                 self.go_back_to_main_menu()
 
     def go_back_to_main_menu(self):
-        main_menu = MainMenu(self.screen)
-        main_menu.run()
+        scenes.pop()
+
+
+class RoundMenu(BaseMenu):
+    screen_name = "round_setup"
+
+    def __init__(self, screen, start):
+        super().__init__(screen, "Choose questions")
+        self.start = start
+        self.widgets.add(
+            Button(
+                (SCREEN_WIDTH // 2 - 150, 500, 300, 50),
+                BUTTON_BG_COLOR,
+                "Back",
+                scenes.pop,
+            )
+        )
+        # Each choice is the (tag, question ids) pair Game.choose_round takes
+        self.choices = []
+        if game.session_question_ids:
+            self.choices.append((None, list(game.session_question_ids)))
+        self.choices.append((None, None))
+        self.choices += [(tag, None) for tag in game.bank.tags()]
+        self.list_view = VirtualList(
+            LIST_RECT,
+            lambda: len(self.choices),
+            lambda offset, limit: [
+                self.describe(*choice)
+                for choice in self.choices[offset : offset + limit]
+            ],
+        )
+
+    def describe(self, tag, question_ids):
+        if question_ids is not None:
+            return f"The {len(question_ids)} questions added this session"
+        total = game.question_count() if tag is None else game.bank.count(tag)
+        source = "the whole bank" if tag is None else f"'{tag}'"
+        return (
+            f"{min(game.questions_per_round, total)} random of {total} "
+            f"questions from {source}"
+        )
+
+    def choose(self, tag, question_ids):
+        if tag is not None and game.bank.count(tag) == 0:
+            return
+        game.choose_round(tag, question_ids)
+        scenes.pop()
+        self.start()
+
+    def display(self):
+        self.display_background()
+        prompt_text = text_cache.render(
+            fonts.get(*MAIN_FONT), "Which questions should this game ask?", True, WHITE
+        )
+        self.screen.blit(prompt_text, (50, 50))
+        self.list_view.draw(self.screen)
+        self.widgets.draw(self.screen)
+
+    def update_display(self):
+        if self.list_view.changed:
+            renderer.invalidate(self.list_view.draw(self.screen))
+        super().update_display()
+
+    def handle_event(self, event):
+        if self.list_view.handle_event(event):
+            return
+        if is_click(event):
+            index = self.list_view.row_at(event.pos)
+            if index is not None:
+                self.choose(*self.choices[index])
+                return
+        super().handle_event(event)
+
+
+class StatsMenu(BaseMenu):
+    screen_name = "stats"
+
+    def __init__(self, screen):
+        super().__init__(screen, "Statistics")
+        self.back_button = self.widgets.add(
+            Button(
+                (SCREEN_WIDTH // 2 - 150, 500, 300, 50),
+                BUTTON_BG_COLOR,
+                "Back to main menu",
+                scenes.pop,
+            )
+        )
+        self.stats = []
+        self.answers = 0
+        self.correct = 0
+        self.list_view = VirtualList(
+            LIST_RECT,
+            lambda: len(self.stats),
+            lambda offset, limit: [
+                (row, game.bank.get_question(row["question_id"]))
+                for row in self.stats[offset : offset + limit]
+            ],
+            render=self.render_row,
+        )
+
+    def enter(self):
+        super().enter()
+        # Aggregated once per visit; the hardest questions come first
+        self.stats = sorted(
+            game.analytics.question_stats(),
+            key=lambda row: (row["correct_rate"], -row["answers"]),
+        )
+        self.answers = sum(row["answers"] for row in self.stats)
+        self.correct = sum(row["correct_rate"] * row["answers"] for row in self.stats)
+        self.list_view.reset()
+
+    def render_row(self, item):
+        row, question = item
+        surface = pygame.Surface(
+            (self.list_view.rect.width - 2 * LIST_SCROLLBAR_WIDTH, LIST_ROW_HEIGHT),
+            pygame.SRCALPHA,
+        )
+        font = fonts.get(*STATS_FONT)
+        title = "(deleted question)" if question is None else question["question"]
+        surface.blit(fonts.get(*MAIN_FONT).render(title, True, WHITE), (0, 0))
+        summary = (
+            f"{row['correct_rate']:.0%} correct, {row['answers']} answers, "
+            f"median {row['median_latency']:.1f} s"
+        )
+        surface.blit(font.render(summary, True, WHITE), (0, 26))
+        if question is not None:
+            picks = ", ".join(
+                f"{answer} {rate:.0%}"
+                for answer, rate in zip(
+                    question["incorrect_answers"], row["pick_rates"][1:CHOICES]
+                )
+            )
+            surface.blit(font.render(f"Wrong picks: {picks}", True, WHITE), (0, 45))
+        return surface
+
+    def display(self):
+        self.display_background()
+        self.list_view.draw(self.screen)
+        if self.stats:
+            summary = (
+                f"{self.answers} answers to {len(self.stats)} questions, "
+                f"{self.correct / self.answers:.0%} correct"
+            )
+        else:
+            summary = "No answers yet!"
+        summary_text = text_cache.render(fonts.get(*MAIN_FONT), summary, True, WHITE)
+        self.screen.blit(
+            summary_text,
+            (
+                SCREEN_WIDTH // 2 - summary_text.get_width() // 2,
+                STATS_SUMMARY_Y if self.stats else 200,
+            ),
+        )
+        self.widgets.draw(self.screen)
+
+    def update_display(self):
+        if self.list_view.changed:
+            renderer.invalidate(self.list_view.draw(self.screen))
+        super().update_display()
+
+    def handle_event(self, event):
+        if self.list_view.handle_event(event):
+            return
+        super().handle_event(event)
+
+
+class HostMenu(BaseMenu):
+    screen_name = "host"
+
+    def __init__(self, screen, port=DEFAULT_PORT):
+        super().__init__(screen)
+        self.update_posted = False
+        self.snapshot = None
+        self.room = Room(game, on_change=self.room_changed)
+        self.server = GameServer(self.room, port=port)
+        self.slide = None
+        self.slide_index = None
+        self.timer_value = None
+        self.start_button = self.widgets.add(
+            Button(
+                (SCREEN_WIDTH // 2 - 310, SCREEN_HEIGHT - 90, 300, 50),
+                BUTTON_BG_COLOR,
+                "Start the Game",
+                self.start_game,
+            )
+        )
+        self.widgets.add(
+            Button(
+                (SCREEN_WIDTH // 2 + 10, SCREEN_HEIGHT - 90, 300, 50),
+                BUTTON_BG_COLOR,
+                "Back to main menu",
+                self.close,
+            )
+        )
+
+    def room_changed(self, snapshot):
+        # Runs on the server thread. One pending event is enough to wake the
+        # idle loop, so a burst of answers costs one redraw, not one each.
+        self.snapshot = snapshot
+        if not self.update_posted:
+            self.update_posted = True
+            pygame.event.post(pygame.event.Event(ROOM_UPDATED))
+
+    def handle_event(self, event):
+        phase = self.snapshot["phase"]
+        if event.type == ROOM_UPDATED:
+            self.update_posted = False
+            self.needs_redraw = True
+        elif phase == "lobby":
+            super().handle_event(event)
+        elif phase == "score" and event.type in (
+            pygame.KEYDOWN,
+            pygame.MOUSEBUTTONDOWN,
+        ):
+            self.close()
+
+    def enter(self):
+        super().enter()
+        # Updates posted while another screen was on top were dropped there
+        self.update_posted = False
+
+    def start_game(self):
+        if self.snapshot["players"] > 0:
+            scenes.push(RoundMenu(self.screen, self.begin_game))
+
+    def begin_game(self):
+        game.start_round()
+        self.server.start_game_threadsafe()
+
+    def close(self):
+        self.server.stop()
+        game.reset_scores()
+        game.analytics.flush()
+        scenes.pop()
+
+    def next_wake(self):
+        snapshot = self.snapshot
+        if snapshot["phase"] != "question":
+            return None
+        elapsed = clock.now() - snapshot["started_at"]
+        return snapshot["started_at"] + math.floor(elapsed) + 1
+
+    def display(self):
+        snapshot = self.snapshot
+        if snapshot["phase"] == "lobby":
+            self.display_lobby(snapshot)
+        elif snapshot["phase"] in ("question", "results"):
+            self.display_question(snapshot)
+        else:
+            self.display_scores(snapshot)
+
+    def update_display(self):
+        if self.snapshot["phase"] == "lobby":
+            super().update_display()
+        elif self.snapshot["phase"] == "question":
+            self.update_timer()
+
+    def display_lobby(self, snapshot):
+        self.display_background()
+        heading = text_cache.render(
+            fonts.get(*HEADING_FONT), "Waiting for players", True, WHITE
+        )
+        self.screen.blit(heading, (SCREEN_WIDTH // 2 - heading.get_width() // 2, 40))
+        lines = (
+            f"Join with: python client.py {socket.gethostname()} NAME "
+            f"--port {self.server.port}",
+            f"{snapshot['players']} players joined",
+        )
+        for index, line in enumerate(lines):
+            text = text_cache.render(fonts.get(*MAIN_FONT), line, True, WHITE)
+            self.screen.blit(
+                text, (SCREEN_WIDTH // 2 - text.get_width() // 2, 120 + index * 40)
+            )
+        column_width = (SCREEN_WIDTH - 100) // HOST_NAME_COLUMNS
+        names = snapshot["names"][: HOST_NAME_COLUMNS * HOST_NAME_ROWS]
+        for index, name in enumerate(names):
+            column, row = divmod(index, HOST_NAME_ROWS)
+            text = text_cache.render(fonts.get(*MAIN_FONT), name, True, WHITE)
+            self.screen.blit(text, (50 + column * column_width, 230 + row * 40))
+        self.widgets.draw(self.screen)
+
+    def display_question(self, snapshot):
+        if snapshot["index"] != self.slide_index:
+            self.slide_index = snapshot["index"]
+            self.slide = render_question_slide(
+                snapshot["question"], snapshot["answers"]
+            )
+        self.screen.blit(self.slide.surface, (0, 0))
+        if snapshot["phase"] == "results":
+            correct_answer = snapshot["question"]["correct_answer"]
+            for button in self.slide.buttons:
+                if button.text == correct_answer:
+                    pygame.draw.rect(self.screen, (102, 191, 58), button.rect, 8)
+        answered = text_cache.render(
+            fonts.get(*MAIN_FONT),
+            f"Question {snapshot['index'] + 1} / {snapshot['total']}   "
+            f"Answers: {snapshot['answered']} / {snapshot['players']}",
+            True,
+            WHITE,
+        )
+        self.screen.blit(answered, (60, SCREEN_HEIGHT - 40))
+        self.timer_value = None
+        if snapshot["phase"] == "question":
+            self.update_timer()
+
+    def update_timer(self):
+        elapsed_time = clock.now() - self.snapshot["started_at"]
+        remaining_time = max(0, int(QUESTION_SECONDS - elapsed_time))
+        if remaining_time != self.timer_value:
+            self.timer_value = remaining_time
+            draw_timer(self.screen, remaining_time)
+
+    def display_scores(self, snapshot):
+        self.display_background()
+        heading = text_cache.render(fonts.get(*HEADING_FONT), "Scoreboard", True, WHITE)
+        self.screen.blit(heading, (SCREEN_WIDTH // 2 - heading.get_width() // 2, 100))
+        for index, row in enumerate(snapshot["scores"]):
+            self.screen.blit(score_rows.render(*row), (100, 200 + index * 50))
+        footer = text_cache.render(
+            fonts.get(*MAIN_FONT), "Press any key to return to the menu", True, WHITE
+        )
+        self.screen.blit(
+            footer, (SCREEN_WIDTH // 2 - footer.get_width() // 2, SCREEN_HEIGHT - 45)
+        )
+
+
+game = None
+
+
+def export_answer_log(path):
+    if game is not None:
+        game.export_answer_log(path)
+
+
+def flush_analytics():
+    if game is not None:
+        game.analytics.flush()
+
+
+def open_game(bank=None, analytics=None):
+    global game
+    game = Game(bank, analytics=analytics)
+    return game
+
+
+def start_recording(writer):
+    global clock, events
+    seed = random.getrandbits(64)
+    writer.start(seed)
+    # The game read its players before recording began
+    writer.bank("players", game.players)
+    game.bank = RecordingBank(game.bank, writer)
+    random.seed(seed)
+    clock = RecordingClock(writer)
+    events = RecordingEvents(writer)
+
+
+def start_replay(reader):
+    global clock, events
+    random.seed(reader.seed)
+    clock = ReplayClock(reader)
+    events = ReplayEvents(reader)
+
+
+def replay_session(screen, startup, path):
+    reader = SessionReader(path)
+    try:
+        scenes.run(LoadingScene(screen, startup, replay=reader))
+    except SystemExit:
+        pass
+    events.report()
+    players = {}
+    for record in game.answer_log:
+        players[record["player"]] = players.get(record["player"], 0) + record["score"]
+    print(f"{len(game.answer_log)} answers replayed")
+    for name, score in sorted(players.items(), key=lambda item: -item[1]):
+        print(f"  {name}: {score} points")
 
 
-# Initialize Game
-game = Game()
+def recording_path():
+    os.makedirs(RECORDINGS_DIRECTORY, exist_ok=True)
+    # Only the newest sessions are kept; their names sort by start time
+    recordings = sorted(
+        name
+        for name in os.listdir(RECORDINGS_DIRECTORY)
+        if name.startswith("session-") and name.endswith(".kqs")
+    )
+    for name in recordings[: max(0, len(recordings) - RECORDINGS_KEPT + 1)]:
+        os.remove(os.path.join(RECORDINGS_DIRECTORY, name))
+    name = time.strftime("session-%Y%m%d-%H%M%S.kqs")
+    return os.path.join(RECORDINGS_DIRECTORY, name)
 
 
 # Main Function
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Kahoot-like quiz game.")
+    parser.add_argument(
+        "--profile-export",
+        metavar="PATH",
+        help="write frame-time percentiles to a .csv or .json file on exit",
+    )
+    parser.add_argument(
+        "--answer-log",
+        metavar="PATH",
+        help="write per-answer response times and latencies to a .csv file on exit",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="print how long each startup phase took once the main menu is ready",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=DEFAULT_PORT,
+        help="TCP port players connect to when hosting a network game",
+    )
+    parser.add_argument(
+        "--record",
+        metavar="PATH",
+        help="where to record this session (default: a new file in "
+        f"{RECORDINGS_DIRECTORY}/)",
+    )
+    parser.add_argument(
+        "--no-record", action="store_true", help="do not record this session"
+    )
+    parser.add_argument(
+        "--replay",
+        metavar="PATH",
+        help="replay a recorded session headless, as fast as possible, and compare "
+        "its screens and frame times with the recording",
+    )
+    args = parser.parse_args(argv)
+    if args.replay:
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    if args.profile_export:
+        atexit.register(profiler.export, args.profile_export)
+    if args.answer_log:
+        atexit.register(export_answer_log, args.answer_log)
+    atexit.register(flush_analytics)
+    startup = StartupProfile()
+    pygame.display.init()
+    pygame.font.init()
+    startup.mark("sdl init")
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Kahoot-like Game")
-    main_menu = MainMenu(screen)
-    main_menu.run()
+    startup.mark("display mode")
+    if args.replay:
+        replay_session(screen, startup, args.replay)
+        return
+    writer = None
+    if not args.no_record:
+        writer = SessionWriter(args.record or recording_path())
+        atexit.register(writer.close)
+    scenes.run(LoadingScene(screen, startup, args.profile_startup, args.port, writer))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,255 @@
+import argparse
+import csv
+import json
+import os
+import sys
+
+from storage import DEFAULT_DATABASE, QuestionBank
+
+BATCH_SIZE = 1000
+JSON_CHUNK_SIZE = 1 << 16
+# No question comes close; past this a record that will not parse is an error
+MAX_JSON_RECORD_SIZE = 1 << 20
+MAX_REPORTED_ERRORS = 100
+INCORRECT_ANSWER_COUNT = 3
+
+
+class ImportReport:
+    def __init__(self):
+        self.rows = 0
+        self.imported = 0
+        self.error_count = 0
+        self.errors = []
+        self.duplicate_count = 0
+        self.duplicates = []
+
+    def add_error(self, row_number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((row_number, message))
+
+    def add_duplicate(self, row_number, kind, question_id):
+        self.duplicate_count += 1
+        if len(self.duplicates) < MAX_REPORTED_ERRORS:
+            self.duplicates.append((row_number, kind, question_id))
+
+
+def read_csv(file):
+    for row_number, row in enumerate(csv.DictReader(file), 2):
+        record = {
+            "question": row.get("question"),
+            "correct_answer": row.get("correct_answer"),
+            "incorrect_answers": [
+                row.get(f"incorrect_answer_{i}")
+                for i in range(1, INCORRECT_ANSWER_COUNT + 1)
+                if row.get(f"incorrect_answer_{i}")
+            ],
+            "tags": [tag for tag in (row.get("tags") or "").split(";") if tag],
+        }
+        if None in row:
+            record["extra"] = row[None]
+        yield row_number, record
+
+
+def read_json_lines(file):
+    for row_number, line in enumerate(file, 1):
+        if not line.strip():
+            continue
+        try:
+            yield row_number, json.loads(line)
+        except json.JSONDecodeError as error:
+            yield row_number, ValueError(f"invalid JSON: {error.msg}")
+
+
+def read_json_array(file):
+    decoder = json.JSONDecoder()
+    buffer = file.read(JSON_CHUNK_SIZE).lstrip()
+    if not buffer.startswith("["):
+        yield 1, ValueError("expected a JSON array of questions")
+        return
+    buffer = buffer[1:]
+    eof = False
+    row_number = 0
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            record, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError as error:
+            # Stop at the first record that cannot parse within the size limit,
+            # instead of reading the rest of the file into the buffer.
+            if eof or len(buffer) > MAX_JSON_RECORD_SIZE:
+                yield row_number + 1, ValueError(f"invalid JSON: {error.msg}")
+                return
+            record = None
+        # A value that ends exactly at the buffer edge may continue in the next chunk
+        if record is None or (end == len(buffer) and not eof):
+            chunk = file.read(JSON_CHUNK_SIZE)
+            eof = not chunk
+            buffer += chunk
+            if eof and not buffer.strip():
+                yield row_number + 1, ValueError("unterminated JSON array")
+                return
+            continue
+        row_number += 1
+        yield row_number, record
+        buffer = buffer[end:]
+
+
+def read_rows(path):
+    extension = os.path.splitext(path)[1].lower()
+    with open(path, newline="", encoding="utf-8-sig") as file:
+        if extension == ".csv":
+            yield from read_csv(file)
+        elif extension in (".jsonl", ".ndjson"):
+            yield from read_json_lines(file)
+        elif extension == ".json":
+            yield from read_json_array(file)
+        else:
+            raise ValueError(f"unsupported question bank format: {extension}")
+
+
+def answers_from_record(record):
+    if "answers" in record:
+        answers = record["answers"]
+        if not isinstance(answers, list) or not all(
+            isinstance(answer, dict) for answer in answers
+        ):
+            raise ValueError("answers must be a list of objects")
+        correct = [a.get("text") for a in answers if a.get("correct")]
+        incorrect = [a.get("text") for a in answers if not a.get("correct")]
+    else:
+        correct = record.get("correct_answer")
+        correct = correct if isinstance(correct, list) else [correct]
+        incorrect = record.get("incorrect_answers") or []
+        if not isinstance(incorrect, list):
+            raise ValueError("incorrect_answers must be a list")
+    if len(correct) != 1:
+        raise ValueError(f"expected exactly one correct answer, got {len(correct)}")
+    if len(incorrect) != INCORRECT_ANSWER_COUNT:
+        raise ValueError(
+            f"expected {INCORRECT_ANSWER_COUNT} incorrect answers, got {len(incorrect)}"
+        )
+    return correct[0], incorrect
+
+
+def validate_record(record):
+    if not isinstance(record, dict):
+        raise ValueError("row is not an object")
+    if "extra" in record:
+        raise ValueError("row has more fields than the header")
+    question = record.get("question")
+    if not isinstance(question, str) or not question.strip():
+        raise ValueError("missing question")
+    correct_answer, incorrect_answers = answers_from_record(record)
+    if not isinstance(correct_answer, str) or not correct_answer.strip():
+        raise ValueError("missing correct answer")
+    for value in incorrect_answers:
+        if not isinstance(value, str) or not value.strip():
+            raise ValueError("empty incorrect answer")
+    tags = record.get("tags") or []
+    if isinstance(tags, str):
+        tags = [tags]
+    elif not isinstance(tags, list) or not all(isinstance(tag, str) for tag in tags):
+        raise ValueError("tags must be a list of strings or a string")
+    return {
+        "question": question.strip(),
+        "correct_answer": correct_answer.strip(),
+        "incorrect_answers": [answer.strip() for answer in incorrect_answers],
+    }, [tag.strip() for tag in tags if tag.strip()]
+
+
+def validate_rows(rows, report):
+    for row_number, record in rows:
+        report.rows += 1
+        if isinstance(record, Exception):
+            report.add_error(row_number, str(record))
+            continue
+        try:
+            yield (row_number, *validate_record(record))
+        except ValueError as error:
+            report.add_error(row_number, str(error))
+
+
+def batched(items, size):
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def import_file(path, bank, batch_size=BATCH_SIZE, progress=None, skip_duplicates=True):
+    report = ImportReport()
+    for batch in batched(validate_rows(read_rows(path), report), batch_size):
+
+        def on_duplicate(index, kind, question_id):
+            report.add_duplicate(batch[index][0], kind, question_id)
+
+        ids = bank.add_questions(
+            [(question, tags) for _, question, tags in batch],
+            skip_duplicates,
+            on_duplicate,
+        )
+        report.imported += len(ids) - ids.count(None)
+        if progress is not None:
+            progress(report)
+    return report
+
+
+def print_progress(report):
+    print(
+        f"\r{report.rows} rows read, {report.imported} imported, "
+        f"{report.error_count} errors, {report.duplicate_count} duplicates",
+        end="",
+        file=sys.stderr,
+    )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Import questions from a CSV, JSON or JSON Lines file."
+    )
+    parser.add_argument("path")
+    parser.add_argument("--database", default=DEFAULT_DATABASE)
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument(
+        "--keep-duplicates",
+        action="store_true",
+        help="import questions even if they repeat ones already in the bank",
+    )
+    args = parser.parse_args(argv)
+    bank = QuestionBank(args.database)
+    try:
+        report = import_file(
+            args.path,
+            bank,
+            args.batch_size,
+            print_progress,
+            not args.keep_duplicates,
+        )
+    finally:
+        bank.close()
+    print_progress(report)
+    print(file=sys.stderr)
+    for row_number, message in report.errors:
+        print(f"row {row_number}: {message}")
+    if report.error_count > len(report.errors):
+        print(f"... and {report.error_count - len(report.errors)} more errors")
+    for row_number, kind, question_id in report.duplicates:
+        label = "duplicate" if kind == "exact" else "near-duplicate"
+        print(f"row {row_number}: skipped, {label} of question {question_id}")
+    if report.duplicate_count > len(report.duplicates):
+        print(
+            f"... and {report.duplicate_count - len(report.duplicates)} "
+            "more duplicates"
+        )
+    return 1 if report.error_count else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
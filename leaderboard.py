@@ -0,0 +1,62 @@
+import bisect
+import itertools
+
+QUESTION_SECONDS = 30
+
+
+def answer_score(correct, time_taken):
+    # Full marks for an instant answer, ten points fewer for every second
+    return max(0, 100 - int(time_taken * 10)) if correct else 0
+
+
+class Leaderboard:
+    def __init__(self):
+        # (-score, arrival, name) keeps the highest score first and breaks ties
+        # by the order players first scored, matching the old stable sort.
+        self.entries = []
+        self.keys = {}
+        self.arrivals = itertools.count()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, name):
+        return name in self.keys
+
+    def score(self, name):
+        key = self.keys.get(name)
+        return -key[0] if key is not None else 0
+
+    def add(self, name, points):
+        key = self.keys.get(name)
+        if key is None:
+            key = (0, next(self.arrivals), name)
+        else:
+            del self.entries[bisect.bisect_left(self.entries, key)]
+        key = (key[0] - points, key[1], name)
+        bisect.insort(self.entries, key)
+        self.keys[name] = key
+        return -key[0]
+
+    def rank(self, name):
+        return bisect.bisect_left(self.entries, self.keys[name]) + 1
+
+    def top(self, count):
+        return self.page(0, count)
+
+    def page(self, offset, limit):
+        previous = -self.entries[offset - 1][0] if 0 < offset <= len(self) else None
+        rows = []
+        for rank, (negative_score, _, name) in enumerate(
+            self.entries[offset : offset + limit], offset + 1
+        ):
+            score = -negative_score
+            difference = None if previous is None else previous - score
+            rows.append((rank, name, score, difference))
+            previous = score
+        return rows
+
+    def clear(self):
+        self.entries = []
+        self.keys = {}
+        self.arrivals = itertools.count()
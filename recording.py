@@ -0,0 +1,229 @@
+import ast
+import struct
+
+import pygame
+
+MAGIC = b"KQSR"
+VERSION = 4
+HEADER = struct.Struct("<4sHQ")
+TAG = struct.Struct("<B")
+TIME = struct.Struct("<d")
+COUNT = struct.Struct("<H")
+TEXT_SIZE = struct.Struct("<I")
+EVENT_TYPE = struct.Struct("<I")
+KEY = struct.Struct("<iH")
+POINT = struct.Struct("<hh")
+BUTTON = struct.Struct("<hhB")
+JOY_BUTTON = struct.Struct("<iB")
+INSTANCE_ID = struct.Struct("<i")
+FLAG = struct.Struct("<?")
+FRAME = struct.Struct("<HfI")
+
+# One tag byte before every record, so a replay that asks for something the
+# recording never read fails on the spot instead of drifting silently.
+TIME_RECORD = 1
+EVENTS_RECORD = 2
+MOUSE_RECORD = 3
+CLIPBOARD_RECORD = 4
+JOYSTICKS_RECORD = 5
+FRAME_RECORD = 6
+SCREEN_NAME_RECORD = 7
+MUSIC_RECORD = 8
+BANK_RECORD = 9
+RECORD_NAMES = {
+    TIME_RECORD: "clock",
+    EVENTS_RECORD: "events",
+    MOUSE_RECORD: "mouse",
+    CLIPBOARD_RECORD: "clipboard",
+    JOYSTICKS_RECORD: "joysticks",
+    FRAME_RECORD: "frame",
+    SCREEN_NAME_RECORD: "screen name",
+    MUSIC_RECORD: "music",
+    BANK_RECORD: "question bank",
+}
+
+# Only events some screen reacts to are kept; motion and window events
+# would dominate the log without changing what a replay does.
+RECORDED_EVENTS = (
+    pygame.QUIT,
+    pygame.KEYDOWN,
+    pygame.TEXTINPUT,
+    pygame.MOUSEBUTTONDOWN,
+    pygame.MOUSEWHEEL,
+    pygame.JOYBUTTONDOWN,
+)
+
+
+def pack_text(text):
+    data = text.encode("utf-8")
+    return TEXT_SIZE.pack(len(data)) + data
+
+
+def pack_event(event):
+    data = EVENT_TYPE.pack(event.type)
+    if event.type == pygame.KEYDOWN:
+        return data + KEY.pack(event.key, event.mod)
+    if event.type == pygame.TEXTINPUT:
+        return data + pack_text(event.text)
+    if event.type == pygame.MOUSEBUTTONDOWN:
+        return data + BUTTON.pack(*event.pos, event.button)
+    if event.type == pygame.MOUSEWHEEL:
+        return data + POINT.pack(event.x, event.y)
+    if event.type == pygame.JOYBUTTONDOWN:
+        return data + JOY_BUTTON.pack(event.instance_id, event.button)
+    return data
+
+
+class SessionWriter:
+    def __init__(self, path):
+        self.file = open(path, "wb")
+        self.screen_names = {}
+
+    def start(self, seed):
+        self.file.write(HEADER.pack(MAGIC, VERSION, seed))
+
+    def record(self, tag, data=b""):
+        self.file.write(TAG.pack(tag) + data)
+
+    def time(self, value):
+        self.record(TIME_RECORD, TIME.pack(value))
+
+    def events(self, received):
+        kept = [
+            pack_event(event) for event in received if event.type in RECORDED_EVENTS
+        ]
+        self.record(EVENTS_RECORD, COUNT.pack(len(kept)) + b"".join(kept))
+
+    def mouse(self, pos):
+        self.record(MOUSE_RECORD, POINT.pack(*pos))
+
+    def clipboard(self, text):
+        self.record(CLIPBOARD_RECORD, pack_text(text))
+
+    def joysticks(self, instance_ids):
+        self.record(
+            JOYSTICKS_RECORD,
+            COUNT.pack(len(instance_ids))
+            + b"".join(INSTANCE_ID.pack(instance_id) for instance_id in instance_ids),
+        )
+
+    def music_busy(self, busy):
+        self.record(MUSIC_RECORD, FLAG.pack(busy))
+
+    def bank(self, method, result):
+        # Bank answers are plain dicts, lists, tuples and scalars
+        self.record(BANK_RECORD, pack_text(method) + pack_text(repr(result)))
+
+    def frame(self, screen_name, seconds, checksum):
+        index = self.screen_names.get(screen_name)
+        if index is None:
+            index = self.screen_names[screen_name] = len(self.screen_names)
+            self.record(SCREEN_NAME_RECORD, pack_text(screen_name))
+        self.record(FRAME_RECORD, FRAME.pack(index, seconds, checksum))
+        # A session cut short by a crash still replays up to its last frame
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class SessionReader:
+    def __init__(self, path):
+        with open(path, "rb") as file:
+            self.data = file.read()
+        if len(self.data) < HEADER.size:
+            raise ValueError(f"{path} is not a recorded session")
+        magic, version, self.seed = HEADER.unpack_from(self.data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not a version {VERSION} recorded session")
+        self.offset = HEADER.size
+        self.screen_names = []
+        self.frames = 0
+
+    def unpack(self, layout):
+        values = layout.unpack_from(self.data, self.offset)
+        self.offset += layout.size
+        return values
+
+    def text(self):
+        (size,) = self.unpack(TEXT_SIZE)
+        text = self.data[self.offset : self.offset + size].decode("utf-8")
+        self.offset += size
+        return text
+
+    def expect(self, tag):
+        if self.offset >= len(self.data):
+            raise EOFError("end of recorded session")
+        found = self.data[self.offset]
+        if found != tag:
+            raise ValueError(
+                f"replay diverged after {self.frames} frames: expected a "
+                f"{RECORD_NAMES[tag]} record, found "
+                f"{RECORD_NAMES.get(found, found)}"
+            )
+        self.offset += TAG.size
+
+    def time(self):
+        self.expect(TIME_RECORD)
+        return self.unpack(TIME)[0]
+
+    def events(self):
+        self.expect(EVENTS_RECORD)
+        received = []
+        for _ in range(self.unpack(COUNT)[0]):
+            (event_type,) = self.unpack(EVENT_TYPE)
+            if event_type == pygame.KEYDOWN:
+                key, mod = self.unpack(KEY)
+                attributes = {"key": key, "mod": mod}
+            elif event_type == pygame.TEXTINPUT:
+                attributes = {"text": self.text()}
+            elif event_type == pygame.MOUSEBUTTONDOWN:
+                x, y, button = self.unpack(BUTTON)
+                attributes = {"pos": (x, y), "button": button}
+            elif event_type == pygame.MOUSEWHEEL:
+                x, y = self.unpack(POINT)
+                attributes = {"x": x, "y": y}
+            elif event_type == pygame.JOYBUTTONDOWN:
+                instance_id, button = self.unpack(JOY_BUTTON)
+                attributes = {"instance_id": instance_id, "button": button}
+            else:
+                attributes = {}
+            received.append(pygame.event.Event(event_type, attributes))
+        return received
+
+    def mouse(self):
+        self.expect(MOUSE_RECORD)
+        return self.unpack(POINT)
+
+    def clipboard(self):
+        self.expect(CLIPBOARD_RECORD)
+        return self.text()
+
+    def joysticks(self):
+        self.expect(JOYSTICKS_RECORD)
+        (count,) = self.unpack(COUNT)
+        return [self.unpack(INSTANCE_ID)[0] for _ in range(count)]
+
+    def music_busy(self):
+        self.expect(MUSIC_RECORD)
+        return self.unpack(FLAG)[0]
+
+    def bank(self, method):
+        self.expect(BANK_RECORD)
+        recorded = self.text()
+        if recorded != method:
+            raise ValueError(
+                f"replay diverged after {self.frames} frames: recorded a call to "
+                f"{recorded}, replayed {method}"
+            )
+        return ast.literal_eval(self.text())
+
+    def frame(self):
+        next_tag = self.data[self.offset] if self.offset < len(self.data) else None
+        if next_tag == SCREEN_NAME_RECORD:
+            self.offset += TAG.size
+            self.screen_names.append(self.text())
+        self.expect(FRAME_RECORD)
+        index, seconds, checksum = self.unpack(FRAME)
+        self.frames += 1
+        return self.screen_names[index], seconds, checksum
@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import multiprocessing
+import multiprocessing.connection
+import os
+import random
+import sys
+import time
+from collections import deque
+
+from analytics import AnswerStore
+from server import DEFAULT_HOST, RESULT_SECONDS, GameServer, Room
+from session import QUESTIONS_PER_ROUND, Game
+from storage import DEFAULT_DATABASE, QuestionBank
+
+DEFAULT_BASE_PORT = 9000
+TICK_SECONDS = 0.05
+TICK_WINDOW = 200
+REPORT_SECONDS = 2.0
+LOBBY_SECONDS = 10
+RESTART_DELAY_SECONDS = 1.0
+ANSWER_LOG_LIMIT = 10_000
+# One answer store per room, named after it, so rooms never share files
+DEFAULT_ANALYTICS_DIRECTORY = os.path.join("analytics", "rooms")
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+class RoomSpec:
+    def __init__(
+        self,
+        name,
+        port,
+        host=DEFAULT_HOST,
+        tag=None,
+        seed=None,
+        questions=QUESTIONS_PER_ROUND,
+        min_players=1,
+        lobby_seconds=LOBBY_SECONDS,
+        result_seconds=RESULT_SECONDS,
+    ):
+        self.name = name
+        self.port = port
+        self.host = host
+        self.tag = tag
+        self.seed = seed
+        self.questions = questions
+        self.min_players = min_players
+        self.lobby_seconds = lobby_seconds
+        self.result_seconds = result_seconds
+
+
+class HostedRoom:
+    # One headless room: its own Game, scores, question stream and server
+    def __init__(self, spec, bank, analytics_directory):
+        self.spec = spec
+        self.game = Game(
+            bank,
+            random.Random(spec.seed),
+            analytics=AnswerStore(os.path.join(analytics_directory, spec.name)),
+            answer_log_limit=ANSWER_LOG_LIMIT,
+        )
+        self.game.questions_per_round = spec.questions
+        self.game.choose_round(spec.tag)
+        self.room = Room(self.game, result_seconds=spec.result_seconds)
+        self.server = GameServer(self.room, spec.host, spec.port)
+        self.ticks = deque(maxlen=TICK_WINDOW)
+        self.games = 0
+
+    async def run(self):
+        await self.server.start()
+        ticker = asyncio.create_task(self.tick())
+        try:
+            await self.host()
+        finally:
+            ticker.cancel()
+            self.game.analytics.flush()
+            await self.server.close()
+
+    async def tick(self):
+        # How late the room's timers fire is how far its shared question
+        # clock can drift; a busy neighbour on the same worker shows up here.
+        loop = asyncio.get_running_loop()
+        deadline = loop.time()
+        while True:
+            deadline += TICK_SECONDS
+            await asyncio.sleep(max(0.0, deadline - loop.time()))
+            late = loop.time() - deadline
+            self.ticks.append(max(0.0, late))
+            if late > TICK_SECONDS:
+                deadline = loop.time()
+
+    async def host(self):
+        while True:
+            while len(self.room.clients) < self.spec.min_players:
+                await asyncio.sleep(TICK_SECONDS)
+            await asyncio.sleep(self.spec.lobby_seconds)
+            if not self.room.clients:
+                continue
+            self.game.start_round()
+            await self.server.start_game()
+            self.games += 1
+            # Written out after every round, so memory holds one round at most
+            self.game.analytics.flush()
+            self.room.reset()
+
+    def stats(self):
+        ticks = sorted(self.ticks)
+        return {
+            "room": self.spec.name,
+            "port": self.server.port,
+            "pid": os.getpid(),
+            "phase": self.room.phase,
+            "players": len(self.room.clients),
+            "games": self.games,
+            "answers": self.room.answer_count,
+            "tick_p50": percentile(ticks, 0.5),
+            "tick_p99": percentile(ticks, 0.99),
+            "tick_max": ticks[-1] if ticks else 0.0,
+        }
+
+
+class RoomWorker:
+    def __init__(self, worker_id, specs, database, analytics_directory, reports):
+        self.worker_id = worker_id
+        self.specs = specs
+        self.database = database
+        self.analytics_directory = analytics_directory
+        self.reports = reports
+        self.bank = None
+        self.rooms = {}
+        self.restarts = dict.fromkeys((spec.name for spec in specs), 0)
+
+    async def run(self):
+        # One connection per process; every room on this worker shares it
+        # from the worker's single event-loop thread.
+        self.bank = QuestionBank(self.database)
+        await asyncio.gather(
+            self.report(), *(self.supervise(spec) for spec in self.specs)
+        )
+
+    async def supervise(self, spec):
+        # A room that raises is rebuilt on its own; the worker's other rooms
+        # keep their games and connections.
+        while True:
+            hosted = HostedRoom(spec, self.bank, self.analytics_directory)
+            self.rooms[spec.name] = hosted
+            try:
+                await hosted.run()
+            except Exception as error:
+                self.restarts[spec.name] += 1
+                self.reports.send(
+                    ("room_crashed", self.worker_id, spec.name, repr(error))
+                )
+            await asyncio.sleep(RESTART_DELAY_SECONDS)
+
+    async def report(self):
+        while True:
+            await asyncio.sleep(REPORT_SECONDS)
+            rows = []
+            for name, hosted in self.rooms.items():
+                row = hosted.stats()
+                row["restarts"] = self.restarts[name]
+                rows.append(row)
+            self.reports.send(("stats", self.worker_id, rows))
+
+
+def run_worker(worker_id, specs, database, analytics_directory, reports, cpu=None):
+    if cpu is not None and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, {cpu})
+    asyncio.run(
+        RoomWorker(worker_id, specs, database, analytics_directory, reports).run()
+    )
+
+
+class RoomScheduler:
+    def __init__(
+        self,
+        specs,
+        workers=None,
+        database=DEFAULT_DATABASE,
+        analytics_directory=DEFAULT_ANALYTICS_DIRECTORY,
+    ):
+        if hasattr(os, "sched_getaffinity"):
+            self.cpus = sorted(os.sched_getaffinity(0))
+        else:
+            self.cpus = list(range(os.cpu_count() or 1))
+        workers = min(workers or len(self.cpus), len(specs))
+        # Round-robin keeps room counts per core within one of each other
+        self.shards = [specs[index::workers] for index in range(workers)]
+        self.database = database
+        self.analytics_directory = analytics_directory
+        # Spawned rather than forked: a worker respawned mid-game would
+        # otherwise inherit whatever sockets the parent has open by then.
+        self.context = multiprocessing.get_context("spawn")
+        self.processes = {}
+        self.pipes = {}
+        self.worker_restarts = [0] * workers
+        self.stats = {}
+        self.events = []
+
+    def start(self):
+        for worker_id in range(len(self.shards)):
+            self.spawn(worker_id)
+
+    def spawn(self, worker_id):
+        # A pipe per worker rather than one shared Queue: a worker killed
+        # while holding a Queue's lock would silence every other worker too.
+        reader, writer = self.context.Pipe(duplex=False)
+        process = self.context.Process(
+            target=run_worker,
+            args=(
+                worker_id,
+                self.shards[worker_id],
+                self.database,
+                self.analytics_directory,
+                writer,
+                self.cpus[worker_id % len(self.cpus)],
+            ),
+            name=f"room-worker-{worker_id}",
+            daemon=True,
+        )
+        process.start()
+        writer.close()
+        self.processes[worker_id] = process
+        self.pipes[worker_id] = reader
+
+    def poll(self, timeout=REPORT_SECONDS):
+        deadline = time.monotonic() + timeout
+        while self.pipes:
+            ready = multiprocessing.connection.wait(
+                list(self.pipes.values()), max(0.0, deadline - time.monotonic())
+            )
+            if not ready:
+                break
+            for worker_id, reader in list(self.pipes.items()):
+                if reader not in ready:
+                    continue
+                try:
+                    message = reader.recv()
+                except EOFError:
+                    reader.close()
+                    del self.pipes[worker_id]
+                    continue
+                if message[0] == "stats":
+                    for row in message[2]:
+                        row["worker"] = worker_id
+                        self.stats[row["room"]] = row
+                else:
+                    self.events.append(message)
+        self.check_workers()
+
+    def check_workers(self):
+        # A worker that died takes only its shard down; it is respawned with
+        # the same rooms while every other worker keeps running.
+        for worker_id, process in self.processes.items():
+            if process.is_alive():
+                continue
+            self.events.append(("worker_crashed", worker_id, process.exitcode))
+            # Both hold a descriptor; a scheduler outliving many crashes
+            # would otherwise run out of them
+            process.close()
+            reader = self.pipes.pop(worker_id, None)
+            if reader is not None:
+                reader.close()
+            self.worker_restarts[worker_id] += 1
+            for spec in self.shards[worker_id]:
+                if spec.name in self.stats:
+                    self.stats[spec.name]["phase"] = "restarting"
+            self.spawn(worker_id)
+
+    def stop(self):
+        for process in self.processes.values():
+            process.terminate()
+        for process in self.processes.values():
+            process.join()
+        for reader in self.pipes.values():
+            reader.close()
+
+    def report(self, file=None):
+        file = sys.stdout if file is None else file
+        print(
+            f"{'room':<10} {'port':>5} {'pid':>7} {'phase':<10} {'players':>7} "
+            f"{'games':>5} {'answers':>7} {'tick p50':>9} {'p99':>7} {'max':>7} "
+            f"{'restarts':>8}",
+            file=file,
+        )
+        for name in sorted(self.stats):
+            row = self.stats[name]
+            print(
+                f"{row['room']:<10} {row['port']:>5} {row['pid']:>7} "
+                f"{row['phase']:<10} {row['players']:>7} {row['games']:>5} "
+                f"{row['answers']:>7} {row['tick_p50'] * 1000:>7.2f}ms "
+                f"{row['tick_p99'] * 1000:>5.2f}ms {row['tick_max'] * 1000:>5.2f}ms "
+                f"{row['restarts']:>8}",
+                file=file,
+            )
+        for event in self.events:
+            if event[0] == "worker_crashed":
+                print(f"worker {event[1]} exited with {event[2]}, restarted", file=file)
+            else:
+                print(f"room {event[2]} crashed: {event[3]}, restarted", file=file)
+        self.events = []
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Host many independent network games across CPU cores."
+    )
+    parser.add_argument("--rooms", type=int, default=4)
+    parser.add_argument("--workers", type=int, help="default: one per CPU core")
+    parser.add_argument("--database", default=DEFAULT_DATABASE)
+    parser.add_argument(
+        "--analytics",
+        default=DEFAULT_ANALYTICS_DIRECTORY,
+        help="directory for each room's recorded answers",
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--base-port", type=int, default=DEFAULT_BASE_PORT)
+    parser.add_argument("--questions", type=int, default=QUESTIONS_PER_ROUND)
+    parser.add_argument(
+        "--tags",
+        help="comma-separated tags, assigned to rooms in turn as their question "
+        "stream",
+    )
+    parser.add_argument("--min-players", type=int, default=1)
+    parser.add_argument("--lobby-seconds", type=float, default=LOBBY_SECONDS)
+    args = parser.parse_args(argv)
+    tags = args.tags.split(",") if args.tags else [None]
+    specs = [
+        RoomSpec(
+            f"room{index + 1}",
+            args.base_port + index,
+            args.host,
+            tags[index % len(tags)],
+            questions=args.questions,
+            min_players=args.min_players,
+            lobby_seconds=args.lobby_seconds,
+        )
+        for index in range(args.rooms)
+    ]
+    scheduler = RoomScheduler(specs, args.workers, args.database, args.analytics)
+    scheduler.start()
+    try:
+        while True:
+            scheduler.poll()
+            scheduler.report()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        scheduler.stop()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+import asyncio
+import itertools
+import json
+import threading
+import time
+from collections import deque
+
+from leaderboard import QUESTION_SECONDS, answer_score
+
+DEFAULT_HOST = "0.0.0.0"
+DEFAULT_PORT = 8765
+RESULT_SECONDS = 3
+SCORE_ROWS = 7
+LOBBY_NAMES = 12
+MAX_MESSAGE_BYTES = 1 << 16
+# Rooms run all day; latency stats cover only the most recent answers
+HANDLING_TIMES_WINDOW = 10_000
+
+
+def encode(message):
+    return json.dumps(message, separators=(",", ":")).encode() + b"\n"
+
+
+class Room:
+    def __init__(
+        self,
+        game,
+        clock=time.perf_counter,
+        on_change=None,
+        result_seconds=RESULT_SECONDS,
+    ):
+        self.game = game
+        self.clock = clock
+        self.on_change = on_change
+        self.result_seconds = result_seconds
+        self.clients = {}
+        self.phase = "lobby"
+        self.index = None
+        self.question = None
+        self.answers = []
+        self.started_at = None
+        self.responses = {}
+        self.everyone_answered = asyncio.Event()
+        self.handling_times = deque(maxlen=HANDLING_TIMES_WINDOW)
+        self.answer_count = 0
+        self.snapshot = None
+        self.changed()
+
+    def changed(self):
+        # The host screen runs on another thread; it only ever reads the
+        # latest snapshot, which is replaced whole and never mutated.
+        self.snapshot = {
+            "phase": self.phase,
+            "index": self.index,
+            "total": len(self.game.question_sets),
+            "question": self.question,
+            "answers": self.answers,
+            "started_at": self.started_at,
+            "players": len(self.clients),
+            "names": list(itertools.islice(reversed(self.clients), LOBBY_NAMES)),
+            "answered": len(self.responses),
+            "scores": self.game.leaderboard.top(SCORE_ROWS),
+        }
+        if self.on_change is not None:
+            self.on_change(self.snapshot)
+
+    def reset(self):
+        # Back to the lobby for another round with everyone still connected
+        self.game.reset_scores()
+        for name in self.clients:
+            self.game.leaderboard.add(name, 0)
+        self.phase = "lobby"
+        self.index = None
+        self.question = None
+        self.answers = []
+        self.started_at = None
+        self.responses = {}
+        self.changed()
+
+    def join(self, name, writer):
+        if not isinstance(name, str) or not name.strip():
+            return None
+        name = name.strip()
+        if name in self.clients:
+            return None
+        self.clients[name] = writer
+        if name not in self.game.leaderboard:
+            self.game.leaderboard.add(name, 0)
+        writer.write(encode({"type": "welcome", "name": name, "phase": self.phase}))
+        if self.phase == "question":
+            writer.write(self.question_message())
+        self.changed()
+        return name
+
+    def leave(self, name):
+        del self.clients[name]
+        self.check_everyone_answered()
+        self.changed()
+
+    def broadcast(self, message):
+        data = encode(message)
+        for writer in self.clients.values():
+            writer.write(data)
+
+    def question_message(self):
+        remaining = QUESTION_SECONDS - (self.clock() - self.started_at)
+        return encode(
+            {
+                "type": "question",
+                "index": self.index,
+                "total": len(self.game.question_sets),
+                "question": self.question["question"],
+                "answers": self.answers,
+                "seconds": max(0.0, remaining),
+            }
+        )
+
+    async def play(self):
+        # The round is drawn by the caller: the bank's SQLite connection
+        # belongs to the thread that opened it, not to the server loop.
+        for index, question in enumerate(self.game.question_sets):
+            self.begin_question(index, question)
+            try:
+                await asyncio.wait_for(self.everyone_answered.wait(), QUESTION_SECONDS)
+            except TimeoutError:
+                pass
+            self.end_question()
+            await asyncio.sleep(self.result_seconds)
+        self.phase = "score"
+        self.broadcast(
+            {"type": "scoreboard", "rows": self.game.leaderboard.top(SCORE_ROWS)}
+        )
+        self.changed()
+
+    def begin_question(self, index, question):
+        self.phase = "question"
+        self.index = index
+        self.question = question
+        self.answers = question["incorrect_answers"] + [question["correct_answer"]]
+        self.game.rng.shuffle(self.answers)
+        self.responses = {}
+        self.everyone_answered.clear()
+        # One shared clock: every player's time counts from the same broadcast
+        self.started_at = self.clock()
+        data = self.question_message()
+        for writer in self.clients.values():
+            writer.write(data)
+        self.changed()
+
+    def answer(self, name, index, chosen, received_at):
+        if self.phase != "question" or index != self.index or name in self.responses:
+            return False
+        time_taken = max(0.0, received_at - self.started_at)
+        correct = chosen == self.question["correct_answer"]
+        score = answer_score(correct, time_taken)
+        self.responses[name] = (chosen, score)
+        self.game.leaderboard.add(name, score)
+        self.game.analytics.add_answer(self.question, name, chosen, time_taken)
+        handled_at = self.clock()
+        self.handling_times.append(handled_at - received_at)
+        self.answer_count += 1
+        self.game.answer_log.append(
+            {
+                "player": name,
+                "question": self.question["question"],
+                "correct": correct,
+                "score": score,
+                "response_seconds": time_taken,
+                "handling_delay": handled_at - received_at,
+                "presentation_delay": None,
+            }
+        )
+        self.clients[name].write(encode({"type": "ack", "index": index}))
+        self.check_everyone_answered()
+        self.changed()
+        return True
+
+    def check_everyone_answered(self):
+        if self.phase == "question" and all(
+            name in self.responses for name in self.clients
+        ):
+            self.everyone_answered.set()
+
+    def end_question(self):
+        self.phase = "results"
+        correct_answer = self.question["correct_answer"]
+        leaderboard = self.game.leaderboard
+        for name, writer in self.clients.items():
+            chosen, score = self.responses.get(name, (None, 0))
+            writer.write(
+                encode(
+                    {
+                        "type": "result",
+                        "index": self.index,
+                        "correct_answer": correct_answer,
+                        "correct": chosen == correct_answer,
+                        "score": score,
+                        "total": leaderboard.score(name),
+                        "rank": leaderboard.rank(name),
+                    }
+                )
+            )
+        self.changed()
+
+
+class GameServer:
+    def __init__(self, room, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.room = room
+        self.host = host
+        self.port = port
+        self.server = None
+        self.loop = None
+        self.thread = None
+        self.game_task = None
+        self.connections = {}
+
+    async def start(self):
+        self.loop = asyncio.get_running_loop()
+        self.server = await asyncio.start_server(
+            self.handle_client, self.host, self.port, limit=MAX_MESSAGE_BYTES
+        )
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    async def handle_client(self, reader, writer):
+        name = None
+        task = asyncio.current_task()
+        self.connections[task] = writer
+        try:
+            while line := await reader.readline():
+                received_at = self.room.clock()
+                try:
+                    message = json.loads(line)
+                except ValueError:
+                    message = None
+                if not isinstance(message, dict):
+                    writer.write(
+                        encode({"type": "error", "message": "invalid message"})
+                    )
+                elif name is not None:
+                    if message.get("type") == "answer":
+                        self.room.answer(
+                            name,
+                            message.get("index"),
+                            message.get("answer"),
+                            received_at,
+                        )
+                elif message.get("type") == "join":
+                    name = self.room.join(message.get("name"), writer)
+                    if name is None:
+                        writer.write(
+                            encode({"type": "error", "message": "name taken or empty"})
+                        )
+                else:
+                    writer.write(encode({"type": "error", "message": "join first"}))
+        # readline() raises ValueError once a line outgrows the stream limit
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            if name is not None:
+                self.room.leave(name)
+            del self.connections[task]
+            writer.close()
+
+    def start_game(self):
+        if self.game_task is None or self.game_task.done():
+            self.game_task = self.loop.create_task(self.room.play())
+            self.game_task.add_done_callback(self.game_finished)
+        return self.game_task
+
+    def game_finished(self, task):
+        # Surfaces a crashed game right away instead of when the task is collected
+        if not task.cancelled():
+            task.result()
+
+    async def close(self):
+        if self.game_task is not None:
+            self.game_task.cancel()
+        self.server.close()
+        # Closing the transports hands every handler an EOF, so they all
+        # unwind through leave() instead of being cancelled mid-read.
+        handlers = list(self.connections)
+        for writer in self.connections.values():
+            writer.close()
+        await asyncio.gather(*handlers, return_exceptions=True)
+        await self.server.wait_closed()
+
+    def start_in_thread(self):
+        # The host screen keeps the pygame loop; the server gets its own
+        # asyncio loop on a daemon thread and is driven via call_soon_threadsafe.
+        started = threading.Event()
+        errors = []
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                loop.run_until_complete(self.start())
+            except OSError as error:
+                errors.append(error)
+                loop.close()
+                started.set()
+                return
+            started.set()
+            loop.run_forever()
+            loop.run_until_complete(self.close())
+            loop.close()
+
+        self.thread = threading.Thread(target=run, name="game-server", daemon=True)
+        self.thread.start()
+        started.wait()
+        if errors:
+            raise errors[0]
+
+    def start_game_threadsafe(self):
+        self.loop.call_soon_threadsafe(self.start_game)
+
+    def stop(self):
+        if self.thread is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.thread = None
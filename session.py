@@ -0,0 +1,84 @@
+import csv
+import random
+from collections import deque
+
+from analytics import AnswerStore
+from leaderboard import Leaderboard
+from storage import QuestionBank
+
+QUESTIONS_PER_ROUND = 10
+ANSWER_LOG_FIELDS = (
+    "player",
+    "question",
+    "correct",
+    "score",
+    "response_seconds",
+    "handling_delay",
+    "presentation_delay",
+)
+
+
+class Game:
+    # Everything one quiz needs and nothing that needs a display, so the
+    # local UI, a network room or a headless room worker each own one.
+    def __init__(self, bank=None, rng=random, analytics=None, answer_log_limit=None):
+        self.bank = bank if bank is not None else QuestionBank()
+        self.rng = rng
+        self.players = self.bank.players()
+        self.question_sets = []
+        self.questions_per_round = QUESTIONS_PER_ROUND
+        # Questions typed in since launch, so a teacher can play just those
+        self.session_question_ids = []
+        self.round_tag = None
+        self.round_question_ids = None
+        self.current_player_index = 0
+        self.leaderboard = Leaderboard()
+        # Unbounded for a local session; long-running rooms keep only the tail
+        self.answer_log = deque(maxlen=answer_log_limit)
+        self.analytics = analytics if analytics is not None else AnswerStore()
+
+    def question_count(self):
+        return self.bank.count()
+
+    def add_question(self, question, tags=(), skip_duplicates=True):
+        question_id = self.bank.add_question(question, tags, skip_duplicates)
+        if question_id is not None:
+            self.session_question_ids.append(question_id)
+        return question_id
+
+    def find_duplicate(self, question):
+        return self.bank.find_duplicate(question)
+
+    def add_player(self, name):
+        self.bank.add_player(name)
+        self.players.append((name, 0))
+
+    def clear_players(self):
+        self.bank.clear_players()
+        self.players = []
+
+    def choose_round(self, tag=None, question_ids=None):
+        self.round_tag = tag
+        self.round_question_ids = question_ids
+
+    def start_round(self):
+        if self.round_question_ids is not None:
+            # A hand-picked set is asked in full, in the order it was added
+            self.question_sets = self.bank.questions(self.round_question_ids)
+        else:
+            # The draw gets its own generator, so a replayed bank that never
+            # samples leaves self.rng where the recorded session left it
+            self.question_sets = self.bank.round_questions(
+                self.questions_per_round,
+                self.round_tag,
+                random.Random(self.rng.getrandbits(64)),
+            )
+
+    def reset_scores(self):
+        self.leaderboard.clear()
+
+    def export_answer_log(self, path):
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.DictWriter(file, ANSWER_LOG_FIELDS)
+            writer.writeheader()
+            writer.writerows(self.answer_log)
@@ -0,0 +1,300 @@
+import argparse
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame  # noqa: E402
+
+import game  # noqa: E402
+from storage import QuestionBank  # noqa: E402
+
+
+class SimulationFinished(Exception):
+    pass
+
+
+class SimulatedClock:
+    def __init__(self, speed=0.0):
+        self.speed = speed
+        self.time = 0.0
+        self.last_tick = 0.0
+
+    def now(self):
+        return self.time
+
+    def tick(self, framerate):
+        elapsed = self.time - self.last_tick
+        if elapsed < 1 / framerate:
+            self.advance(1 / framerate - elapsed)
+        elapsed = self.time - self.last_tick
+        self.last_tick = self.time
+        return int(elapsed * 1000)
+
+    def advance(self, seconds):
+        self.time += seconds
+        if self.speed > 0:
+            time.sleep(seconds / self.speed)
+
+
+class Bot:
+    def __init__(self, rng, accuracy, min_delay, max_delay, script=()):
+        self.rng = rng
+        self.accuracy = accuracy
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.script = iter(script)
+
+    def next_answer(self):
+        scripted = next(self.script, None)
+        if scripted is not None:
+            delay, correct = scripted
+            return delay, correct
+        delay = self.rng.uniform(self.min_delay, self.max_delay)
+        return delay, self.rng.random() < self.accuracy
+
+
+class BotDriver(game.EventSource):
+    def __init__(self, clock, bots, rng, skip_feedback=False):
+        super().__init__()
+        self.clock = clock
+        self.bots = bots
+        self.rng = rng
+        self.skip_feedback = skip_feedback
+        self.started = False
+        self.current_question = None
+        self.answer_delay = None
+        self.answer_correct = None
+        self.answers = 0
+        self.planned_delays = []
+        self.correct_answers = 0
+        self.questions = 0
+
+    def get(self, screen_name, owner=None, timeout=0):
+        queued = self.poll(screen_name, owner)
+        if not queued and timeout > 0:
+            wake_at = self.next_action(screen_name, owner)
+            if wake_at is not None:
+                timeout = min(timeout, max(0.0, wake_at - self.clock.now()))
+            self.clock.advance(timeout)
+            queued = self.poll(screen_name, owner)
+        return queued
+
+    def poll(self, screen_name, owner):
+        queued = [event for event in pygame.event.get() if event.type == pygame.QUIT]
+        handler = getattr(self, f"on_{screen_name}", None)
+        if handler is not None:
+            queued.extend(handler(owner))
+        for event in queued:
+            if not hasattr(event, "timestamp"):
+                event.timestamp = self.clock.now()
+        return queued
+
+    def next_action(self, screen_name, owner):
+        if (
+            screen_name != "question"
+            or self.answer_delay is None
+            or owner.start_time is None
+        ):
+            return None
+        return owner.start_time + self.answer_delay
+
+    def click(self, button, **attributes):
+        return pygame.event.Event(
+            pygame.MOUSEBUTTONDOWN, pos=button.rect.center, button=1, **attributes
+        )
+
+    def on_main_menu(self, menu):
+        if self.started:
+            raise SimulationFinished()
+        self.started = True
+        for button in menu.widgets:
+            if button.text == "Start the Game":
+                return [self.click(button)]
+        return []
+
+    def on_round_setup(self, menu):
+        # The first choice without a hand-picked set is the whole bank
+        index = next(
+            index
+            for index, (_, question_ids) in enumerate(menu.choices)
+            if question_ids is None
+        )
+        rect = menu.list_view.rect
+        pos = (rect.x + 1, rect.y + index * menu.list_view.row_height + 1)
+        return [pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1)]
+
+    def on_get_ready(self, menu):
+        return [pygame.event.Event(pygame.KEYDOWN, key=pygame.K_RETURN, mod=0)]
+
+    def on_feedback(self, menu):
+        if not self.skip_feedback:
+            return []
+        return [pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE, mod=0)]
+
+    def on_question(self, menu):
+        key = (game.game.current_player_index, menu.current_question_index)
+        if key != self.current_question:
+            self.current_question = key
+            self.questions += 1
+            self.answer_delay, self.answer_correct = self.bots[key[0]].next_answer()
+        if (
+            self.answer_delay is None
+            or menu.start_time is None
+            or self.clock.now() - menu.start_time < self.answer_delay
+        ):
+            return []
+        # Stamp the click with the moment the bot decided to answer, the way a
+        # real input event carries its arrival time regardless of frame pacing.
+        answered_at = menu.start_time + self.answer_delay
+        self.planned_delays.append(self.answer_delay)
+        self.answer_delay = None
+        question = game.game.question_sets[menu.current_question_index]
+        candidates = [
+            button
+            for button in menu.widgets
+            if (button.text == question["correct_answer"]) == self.answer_correct
+        ]
+        button = self.rng.choice(candidates or menu.widgets.widgets)
+        self.answers += 1
+        if button.text == question["correct_answer"]:
+            self.correct_answers += 1
+        return [self.click(button, timestamp=answered_at)]
+
+
+def build_game(players, questions):
+    bank = QuestionBank(":memory:")
+    bank.add_questions(
+        (
+            {
+                "question": f"Question {i + 1}?",
+                "correct_answer": f"Right {i + 1}",
+                "incorrect_answers": [f"Wrong {i + 1}.{j}" for j in range(1, 4)],
+            },
+            (),
+        )
+        for i in range(questions)
+    )
+    session = game.Game(bank)
+    for i in range(players):
+        session.add_player(f"Bot {i + 1}")
+    session.questions_per_round = questions
+    return session
+
+
+def print_report(driver, profiler, wall_time, simulated_time):
+    print(f"questions shown: {driver.questions}")
+    print(f"answers: {driver.answers} ({driver.correct_answers} correct)")
+    print(f"timeouts: {driver.questions - driver.answers}")
+    print(
+        f"wall time: {wall_time:.2f} s, simulated time: {simulated_time:.0f} s "
+        f"({simulated_time / wall_time:.0f}x real time)"
+    )
+    print(
+        f"throughput: {driver.answers / wall_time:.1f} answers/s, "
+        f"{driver.questions / wall_time:.1f} questions/s"
+    )
+    answer_log = game.game.answer_log
+    if answer_log:
+        drift = [
+            abs(record["response_seconds"] - planned)
+            for record, planned in zip(answer_log, driver.planned_delays)
+        ]
+        handling = sorted(record["handling_delay"] for record in answer_log)
+        presentation = sorted(record["presentation_delay"] for record in answer_log)
+        print(
+            f"response time drift: max {max(drift) * 1000:.3f} ms over "
+            f"{len(drift)} answers"
+        )
+        print(
+            f"handling delay: p50 {game.percentile(handling, 0.5) * 1000:.2f} ms, "
+            f"max {handling[-1] * 1000:.2f} ms; presentation delay: "
+            f"p50 {game.percentile(presentation, 0.5) * 1000:.2f} ms, "
+            f"max {presentation[-1] * 1000:.2f} ms"
+        )
+    print(
+        f"{'screen':<14} {'frames':>8} {'mean ms':>9} {'p50 ms':>9} "
+        f"{'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'cpu %':>7}"
+    )
+    for screen_name, phases in sorted(profiler.summary().items()):
+        stats = phases.get("frame")
+        if stats is None:
+            continue
+        print(
+            f"{screen_name:<14} {phases['frames']:>8} {stats['mean']:>9.3f} "
+            f"{stats['p50']:>9.3f} {stats['p95']:>9.3f} {stats['p99']:>9.3f} "
+            f"{stats['max']:>9.3f} {phases['cpu_percent'] or 0:>7.1f}"
+        )
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Play a headless session with bot players and report timings."
+    )
+    parser.add_argument("--players", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=0.0,
+        help="simulated seconds per real second, 0 runs as fast as possible",
+    )
+    parser.add_argument("--accuracy", type=float, default=0.7)
+    parser.add_argument("--min-delay", type=float, default=0.5)
+    parser.add_argument("--max-delay", type=float, default=5.0)
+    parser.add_argument(
+        "--script",
+        help="JSON list of [delay, correct] pairs every bot plays before going random",
+    )
+    parser.add_argument(
+        "--skip-feedback",
+        action="store_true",
+        help="bots dismiss the answer feedback screen instead of waiting it out",
+    )
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--export", metavar="PATH", help="write frame timings to a .csv or .json file"
+    )
+    parser.add_argument(
+        "--answer-log", metavar="PATH", help="write per-answer timings to a .csv file"
+    )
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    script = []
+    if args.script:
+        with open(args.script, encoding="utf-8") as file:
+            script = [
+                (float(delay), bool(correct)) for delay, correct in json.load(file)
+            ]
+    clock = SimulatedClock(args.speed)
+    bots = [
+        Bot(rng, args.accuracy, args.min_delay, args.max_delay, script)
+        for _ in range(args.players)
+    ]
+    driver = BotDriver(clock, bots, rng, args.skip_feedback)
+    game.game = build_game(args.players, args.questions)
+    game.clock = clock
+    game.events = driver
+    game.profiler = game.FrameProfiler(window=None)
+
+    pygame.init()
+    screen = pygame.display.set_mode((game.SCREEN_WIDTH, game.SCREEN_HEIGHT))
+    start = time.perf_counter()
+    try:
+        game.scenes.run(game.MainMenu(screen))
+    except SimulationFinished:
+        pass
+    print_report(driver, game.profiler, time.perf_counter() - start, clock.now())
+    if args.export:
+        game.profiler.export(args.export)
+    if args.answer_log:
+        game.game.export_answer_log(args.answer_log)
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,477 @@
+import random
+import re
+import sqlite3
+from collections import OrderedDict
+
+from dedup import BANDS, QuestionSketch, normalize
+
+DEFAULT_DATABASE = "kahoot.db"
+# Lists remember the id before every this-many rows, so fetching any page
+# skips at most this many rows instead of everything before it.
+PAGE_BOUND_INTERVAL = 64
+PAGE_BOUND_QUERIES = 16
+# Stored in PRAGMA user_version; the duplicate index is rebuilt when older
+DEDUP_INDEX_VERSION = 3
+# A near-duplicate check reads at most this many questions from each band's
+# bucket and compares signatures with the ones sharing the most bands, so an
+# insert costs the same however large the bank or a crowded bucket gets.
+DUPLICATE_BUCKET_LIMIT = 64
+DUPLICATE_CANDIDATES = 16
+# Round draws probe random ids until this many miss, then read the ids
+ROUND_SAMPLE_MISSES = 256
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    question TEXT NOT NULL,
+    correct_answer TEXT NOT NULL,
+    incorrect_answer_1 TEXT NOT NULL,
+    incorrect_answer_2 TEXT NOT NULL,
+    incorrect_answer_3 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tags (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS question_tags (
+    tag_id INTEGER NOT NULL REFERENCES tags (id),
+    question_id INTEGER NOT NULL REFERENCES questions (id) ON DELETE CASCADE,
+    PRIMARY KEY (tag_id, question_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS players (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL
+);
+"""
+
+# External-content FTS5 index over the question and its answers. Triggers
+# keep it in step with every insert, including bulk imports; the prefix
+# indexes make the short one- and two-letter terms typed first cheap.
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS question_search USING fts5 (
+    question, correct_answer,
+    incorrect_answer_1, incorrect_answer_2, incorrect_answer_3,
+    content = 'questions', content_rowid = 'id', prefix = '1 2'
+);
+CREATE TRIGGER IF NOT EXISTS questions_search_insert AFTER INSERT ON questions
+BEGIN
+    INSERT INTO question_search (rowid, question, correct_answer,
+        incorrect_answer_1, incorrect_answer_2, incorrect_answer_3)
+    VALUES (new.id, new.question, new.correct_answer,
+        new.incorrect_answer_1, new.incorrect_answer_2, new.incorrect_answer_3);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_search_delete AFTER DELETE ON questions
+BEGIN
+    INSERT INTO question_search (question_search, rowid, question, correct_answer,
+        incorrect_answer_1, incorrect_answer_2, incorrect_answer_3)
+    VALUES ('delete', old.id, old.question, old.correct_answer,
+        old.incorrect_answer_1, old.incorrect_answer_2, old.incorrect_answer_3);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_search_update AFTER UPDATE ON questions
+BEGIN
+    INSERT INTO question_search (question_search, rowid, question, correct_answer,
+        incorrect_answer_1, incorrect_answer_2, incorrect_answer_3)
+    VALUES ('delete', old.id, old.question, old.correct_answer,
+        old.incorrect_answer_1, old.incorrect_answer_2, old.incorrect_answer_3);
+    INSERT INTO question_search (rowid, question, correct_answer,
+        incorrect_answer_1, incorrect_answer_2, incorrect_answer_3)
+    VALUES (new.id, new.question, new.correct_answer,
+        new.incorrect_answer_1, new.incorrect_answer_2, new.incorrect_answer_3);
+END;
+"""
+
+# Ingest-time duplicate index: one fingerprint of the normalized question
+# and answer for exact repeats, plus the MinHash signature of the question's
+# shingles and its band buckets so a near-duplicate check only looks at
+# questions with the same answer sharing a bucket.
+DEDUP_SCHEMA = """
+CREATE TABLE IF NOT EXISTS question_fingerprints (
+    question_id INTEGER PRIMARY KEY REFERENCES questions (id) ON DELETE CASCADE,
+    fingerprint INTEGER NOT NULL,
+    signature BLOB NOT NULL
+);
+CREATE INDEX IF NOT EXISTS question_fingerprints_lookup
+    ON question_fingerprints (fingerprint);
+CREATE TABLE IF NOT EXISTS question_buckets (
+    bucket INTEGER NOT NULL,
+    question_id INTEGER NOT NULL REFERENCES questions (id) ON DELETE CASCADE,
+    PRIMARY KEY (bucket, question_id)
+) WITHOUT ROWID;
+"""
+
+QUESTION_COLUMNS = (
+    "id, question, correct_answer, "
+    "incorrect_answer_1, incorrect_answer_2, incorrect_answer_3"
+)
+SEARCHED_COLUMNS = QUESTION_COLUMNS.split(", ")[1:]
+SEARCH_RESULT_COLUMNS = ", ".join(
+    f"questions.{column}" for column in QUESTION_COLUMNS.split(", ")
+)
+
+
+DUPLICATE_CANDIDATES_QUERY = (
+    "SELECT question_id, signature, correct_answer FROM ("
+    "SELECT question_id, COUNT(*) AS bands FROM ("
+    + " UNION ALL ".join(
+        [
+            "SELECT * FROM (SELECT question_id FROM question_buckets "
+            "WHERE bucket = ? ORDER BY question_id LIMIT ?)"
+        ]
+        * BANDS
+    )
+    + ") GROUP BY question_id ORDER BY bands DESC, question_id LIMIT ?) "
+    "JOIN question_fingerprints USING (question_id) "
+    "JOIN questions ON questions.id = question_id "
+    "ORDER BY bands DESC, question_id"
+)
+
+
+def search_terms(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def question_from_row(row):
+    return {
+        "id": row[0],
+        "question": row[1],
+        "correct_answer": row[2],
+        "incorrect_answers": [row[3], row[4], row[5]],
+    }
+
+
+class QuestionBank:
+    def __init__(self, path=DEFAULT_DATABASE):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute("PRAGMA foreign_keys = ON")
+        self.connection.executescript(SCHEMA)
+        self.search_enabled = self.create_search_index()
+        self.create_dedup_index()
+        self._count = None
+        self._tag_ids = {}
+        self._page_bounds = OrderedDict()
+
+    def create_search_index(self):
+        existed = self.connection.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'question_search'"
+        ).fetchone()
+        try:
+            self.connection.executescript(SEARCH_SCHEMA)
+        except sqlite3.OperationalError:
+            # SQLite built without FTS5: search() falls back to LIKE scans
+            return False
+        if existed is None:
+            with self.connection:
+                self.connection.execute(
+                    "INSERT INTO question_search (question_search) VALUES ('rebuild')"
+                )
+        return True
+
+    def create_dedup_index(self):
+        version = self.connection.execute("PRAGMA user_version").fetchone()[0]
+        if version < DEDUP_INDEX_VERSION:
+            # Banks indexed before the index or its current layout existed
+            # get it (re)built once here.
+            self.connection.executescript(
+                "DROP TABLE IF EXISTS question_fingerprints;"
+                "DROP TABLE IF EXISTS question_buckets;"
+            )
+        self.connection.executescript(DEDUP_SCHEMA)
+        if version < DEDUP_INDEX_VERSION:
+            with self.connection:
+                for question_id, text, correct_answer in self.connection.execute(
+                    "SELECT id, question, correct_answer FROM questions"
+                ).fetchall():
+                    self.index_question(
+                        question_id, QuestionSketch(text, correct_answer)
+                    )
+                self.connection.execute(f"PRAGMA user_version = {DEDUP_INDEX_VERSION}")
+
+    def index_question(self, question_id, sketch):
+        self.connection.execute(
+            "INSERT INTO question_fingerprints (question_id, fingerprint, signature) "
+            "VALUES (?, ?, ?)",
+            (question_id, sketch.fingerprint, sketch.signature),
+        )
+        self.connection.executemany(
+            "INSERT OR IGNORE INTO question_buckets (bucket, question_id) "
+            "VALUES (?, ?)",
+            [(bucket, question_id) for bucket in sketch.buckets],
+        )
+
+    def find_duplicate(self, question, sketch=None):
+        # Only a question with the same correct answer counts: similar wording
+        # with another answer ("capital of Austria" and "of Australia") or the
+        # same stem with other options is a different question.
+        if sketch is None:
+            sketch = QuestionSketch(question["question"], question["correct_answer"])
+        row = self.connection.execute(
+            "SELECT question_id FROM question_fingerprints WHERE fingerprint = ? "
+            "ORDER BY question_id LIMIT 1",
+            (sketch.fingerprint,),
+        ).fetchone()
+        if row is not None:
+            return "exact", row[0]
+        parameters = []
+        for bucket in sketch.buckets:
+            parameters += [bucket, DUPLICATE_BUCKET_LIMIT]
+        candidates = self.connection.execute(
+            DUPLICATE_CANDIDATES_QUERY, (*parameters, DUPLICATE_CANDIDATES)
+        )
+        for question_id, signature, correct_answer in candidates:
+            # The bucket key already holds the answer; this only guards
+            # against a hash collision
+            if normalize(correct_answer) == sketch.answer and (
+                sketch.is_near_duplicate(signature)
+            ):
+                return "near", question_id
+        return None
+
+    def close(self):
+        self.connection.close()
+
+    def add_question(self, question, tags=(), skip_duplicates=True):
+        return self.add_questions([(question, tags)], skip_duplicates)[0]
+
+    def add_questions(self, questions, skip_duplicates=True, on_duplicate=None):
+        # Skipped duplicates keep their place in the returned ids as None.
+        # Earlier rows of the same batch are already indexed, so repeats
+        # inside one import are caught too.
+        ids = []
+        with self.connection:
+            for index, (question, tags) in enumerate(questions):
+                sketch = QuestionSketch(
+                    question["question"], question["correct_answer"]
+                )
+                if skip_duplicates:
+                    duplicate = self.find_duplicate(question, sketch)
+                    if duplicate is not None:
+                        ids.append(None)
+                        if on_duplicate is not None:
+                            on_duplicate(index, *duplicate)
+                        continue
+                cursor = self.connection.execute(
+                    "INSERT INTO questions (question, correct_answer, "
+                    "incorrect_answer_1, incorrect_answer_2, incorrect_answer_3) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (
+                        question["question"],
+                        question["correct_answer"],
+                        *question["incorrect_answers"],
+                    ),
+                )
+                ids.append(cursor.lastrowid)
+                self.index_question(cursor.lastrowid, sketch)
+                for tag in tags:
+                    self.connection.execute(
+                        "INSERT INTO question_tags (tag_id, question_id) VALUES (?, ?)",
+                        (self.tag_id(tag), cursor.lastrowid),
+                    )
+        if self._count is not None:
+            self._count += len(ids) - ids.count(None)
+        self._page_bounds.clear()
+        return ids
+
+    def tag_id(self, name):
+        tag_id = self._tag_ids.get(name)
+        if tag_id is not None:
+            return tag_id
+        row = self.connection.execute(
+            "SELECT id FROM tags WHERE name = ?", (name,)
+        ).fetchone()
+        if row is not None:
+            tag_id = row[0]
+        else:
+            tag_id = self.connection.execute(
+                "INSERT INTO tags (name) VALUES (?)", (name,)
+            ).lastrowid
+        self._tag_ids[name] = tag_id
+        return tag_id
+
+    def tags(self):
+        return [
+            row[0]
+            for row in self.connection.execute("SELECT name FROM tags ORDER BY name")
+        ]
+
+    def question_tags(self, question_id):
+        return [
+            row[0]
+            for row in self.connection.execute(
+                "SELECT tags.name FROM tags JOIN question_tags "
+                "ON tags.id = question_tags.tag_id "
+                "WHERE question_tags.question_id = ? ORDER BY tags.name",
+                (question_id,),
+            )
+        ]
+
+    def count(self, tag=None):
+        if tag is not None:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM question_tags JOIN tags "
+                "ON tags.id = question_tags.tag_id WHERE tags.name = ?",
+                (tag,),
+            ).fetchone()[0]
+        if self._count is None:
+            self._count = self.connection.execute(
+                "SELECT COUNT(*) FROM questions"
+            ).fetchone()[0]
+        return self._count
+
+    def get_question(self, question_id):
+        row = self.connection.execute(
+            f"SELECT {QUESTION_COLUMNS} FROM questions WHERE id = ?", (question_id,)
+        ).fetchone()
+        return question_from_row(row) if row is not None else None
+
+    def questions(self, question_ids):
+        placeholders = ", ".join("?" * len(question_ids))
+        return [
+            question_from_row(row)
+            for row in self.connection.execute(
+                f"SELECT {QUESTION_COLUMNS} FROM questions "
+                f"WHERE id IN ({placeholders}) ORDER BY id",
+                list(question_ids),
+            )
+        ]
+
+    def keyset_rows(self, key, offset, limit, query, conditions, parameters, id_column):
+        # Keyset pagination: start from the nearest remembered id at or before
+        # offset, so the cost of a page does not grow with how far down it is.
+        bounds = self._page_bounds.get(key)
+        if bounds is None:
+            bounds = self._page_bounds[key] = {0: None}
+            if len(self._page_bounds) > PAGE_BOUND_QUERIES:
+                self._page_bounds.popitem(last=False)
+        else:
+            self._page_bounds.move_to_end(key)
+        start = max(position for position in bounds if position <= offset)
+        if bounds[start] is not None:
+            conditions = [*conditions, f"{id_column} > ?"]
+            parameters = [*parameters, bounds[start]]
+        if conditions:
+            query += f" WHERE {' AND '.join(conditions)}"
+        rows = self.connection.execute(
+            f"{query} ORDER BY {id_column} LIMIT ? OFFSET ?",
+            (*parameters, limit, offset - start),
+        ).fetchall()
+        for position, row in enumerate(rows, offset + 1):
+            if position % PAGE_BOUND_INTERVAL == 0:
+                bounds[position] = row[0]
+        return [question_from_row(row) for row in rows]
+
+    def page(self, offset, limit):
+        return self.keyset_rows(
+            (), offset, limit, f"SELECT {QUESTION_COLUMNS} FROM questions", [], [], "id"
+        )
+
+    def search_query(self, terms, columns):
+        # The query, its WHERE conditions, their parameters and the id column
+        # results are ordered by, kept apart so search() can page by id.
+        if self.search_enabled:
+            return (
+                f"SELECT {columns} FROM question_search "
+                "JOIN questions ON questions.id = question_search.rowid",
+                ["question_search MATCH ?"],
+                [" ".join(f'"{term}"*' for term in terms)],
+                "question_search.rowid",
+            )
+        clauses = []
+        parameters = []
+        for term in terms:
+            clauses.append(
+                "("
+                + " OR ".join(
+                    f"questions.{column} LIKE ?" for column in SEARCHED_COLUMNS
+                )
+                + ")"
+            )
+            parameters += [f"%{term}%"] * len(SEARCHED_COLUMNS)
+        return f"SELECT {columns} FROM questions", clauses, parameters, "questions.id"
+
+    def search_count(self, text):
+        terms = search_terms(text)
+        if not terms:
+            return self.count()
+        if self.search_enabled:
+            return self.connection.execute(
+                "SELECT COUNT(*) FROM question_search WHERE question_search MATCH ?",
+                (" ".join(f'"{term}"*' for term in terms),),
+            ).fetchone()[0]
+        query, conditions, parameters, _ = self.search_query(terms, "COUNT(*)")
+        return self.connection.execute(
+            f"{query} WHERE {' AND '.join(conditions)}", parameters
+        ).fetchone()[0]
+
+    def search(self, text, offset, limit):
+        terms = search_terms(text)
+        if not terms:
+            return self.page(offset, limit)
+        return self.keyset_rows(
+            tuple(terms),
+            offset,
+            limit,
+            *self.search_query(terms, SEARCH_RESULT_COLUMNS),
+        )
+
+    def round_questions(self, limit, tag=None, rng=random):
+        # Ids are drawn uniformly from the id range and kept when they exist,
+        # so each pick is a primary key lookup instead of an OFFSET scan.
+        if tag is None:
+            parameters = ()
+            # Separate subqueries, so both ends are single index lookups
+            low, high = self.connection.execute(
+                "SELECT (SELECT MIN(id) FROM questions), "
+                "(SELECT MAX(id) FROM questions)"
+            ).fetchone()
+            members = "SELECT id FROM questions"
+            probe = "SELECT 1 FROM questions WHERE id = ?"
+        else:
+            row = self.connection.execute(
+                "SELECT id FROM tags WHERE name = ?", (tag,)
+            ).fetchone()
+            if row is None:
+                return []
+            parameters = (row[0],)
+            low, high = self.connection.execute(
+                "SELECT (SELECT MIN(question_id) FROM question_tags WHERE tag_id = ?), "
+                "(SELECT MAX(question_id) FROM question_tags WHERE tag_id = ?)",
+                parameters * 2,
+            ).fetchone()
+            members = "SELECT question_id FROM question_tags WHERE tag_id = ?"
+            probe = "SELECT 1 FROM question_tags WHERE tag_id = ? AND question_id = ?"
+        if low is None:
+            return []
+        chosen = set()
+        misses = 0
+        while len(chosen) < limit and misses < ROUND_SAMPLE_MISSES:
+            question_id = rng.randint(low, high)
+            if (
+                question_id not in chosen
+                and self.connection.execute(
+                    probe, (*parameters, question_id)
+                ).fetchone()
+            ):
+                chosen.add(question_id)
+            else:
+                misses += 1
+        if len(chosen) < limit:
+            # Too few questions, or a tag spread thinly over a large bank:
+            # reading its ids costs less than probing the gaps between them
+            ids = [row[0] for row in self.connection.execute(members, parameters)]
+            chosen = rng.sample(ids, min(limit, len(ids)))
+        return self.questions(chosen)
+
+    def players(self):
+        return [
+            (row[0], 0)
+            for row in self.connection.execute("SELECT name FROM players ORDER BY id")
+        ]
+
+    def add_player(self, name):
+        with self.connection:
+            self.connection.execute("INSERT INTO players (name) VALUES (?)", (name,))
+
+    def clear_players(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM players")
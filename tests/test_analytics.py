@@ -0,0 +1,43 @@
+import os
+
+from analytics import AnswerStore
+
+QUESTION = {"id": 3, "correct_answer": "a", "incorrect_answers": ["b", "c", "d"]}
+
+
+def answer_all(store, answers):
+    for player, chosen, latency in answers:
+        store.add_answer(QUESTION, player, chosen, latency)
+
+
+def test_history_is_read_only_when_stats_are_asked_for(tmp_path):
+    directory = str(tmp_path)
+    store = AnswerStore(directory)
+    answer_all(store, [("ann", "a", 1.0), ("bob", "b", 2.0)])
+    store.flush()
+    store = AnswerStore(directory)
+    assert len(store) == 2
+    assert len(store.columns["question_id"]) == 0
+    answer_all(store, [("ann", "a", 3.0), ("cy", "c", 4.0)])
+    store.flush()
+    assert len(store.columns["question_id"]) == 0
+    answer_all(store, [("bob", "a", 5.0)])
+    [stats] = store.question_stats()
+    assert stats["answers"] == 5
+    assert stats["median_latency"] == 3.0
+    assert stats["pick_rates"] == (0.6, 0.2, 0.2, 0.0)
+    store.flush()
+    assert AnswerStore(directory).question_stats() == [stats]
+    assert AnswerStore(directory).players == ["ann", "bob", "cy"]
+
+
+def test_a_row_torn_by_a_crash_is_dropped_on_open(tmp_path):
+    directory = str(tmp_path)
+    store = AnswerStore(directory)
+    answer_all(store, [("ann", "a", 1.0), ("bob", "b", 2.0)])
+    store.flush()
+    with open(os.path.join(directory, "question_id.bin"), "ab") as file:
+        file.write(b"\0" * 12)
+    store = AnswerStore(directory)
+    assert len(store) == 2
+    assert store.question_stats()[0]["answers"] == 2
@@ -0,0 +1,128 @@
+import sqlite3
+
+import pytest
+
+import storage
+from dedup import QuestionSketch, normalize
+from storage import QuestionBank
+
+
+def question(text, correct_answer, incorrect_answers=("a", "b", "c")):
+    return {
+        "question": text,
+        "correct_answer": correct_answer,
+        "incorrect_answers": list(incorrect_answers),
+    }
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        ("What is 2+2?", "What is 2-2?"),
+        ("Is 5 > 3?", "Is 5 < 3?"),
+        ("What is 3.5 + 1?", "What is 35 + 1?"),
+    ],
+)
+def test_normalize_keeps_operators_and_numbers(first, second):
+    assert normalize(first) != normalize(second)
+
+
+def test_normalize_ignores_case_spacing_and_sentence_punctuation():
+    assert normalize("What is 2+2?") == normalize("  what is 2 + 2 ")
+    assert normalize("Who wrote “Hamlet”?") == normalize("who wrote hamlet")
+
+
+@pytest.mark.parametrize(
+    "first, second",
+    [
+        (question("What is 2+2?", "4"), question("What is 2-2?", "0")),
+        (question("Is 5 > 3?", "True"), question("Is 5 < 3?", "False")),
+        (
+            question("What is the capital of Austria?", "Vienna"),
+            question("What is the capital of Australia?", "Canberra"),
+        ),
+        (
+            question("Which element has the symbol Na?", "Sodium"),
+            question("Which element has the symbol Ne?", "Neon"),
+        ),
+        (
+            question("What is the largest planet?", "Jupiter"),
+            question("What is the smallest planet?", "Mercury"),
+        ),
+        (
+            question("Which of these is a mammal?", "Whale", ("Shark", "Cod", "Eel")),
+            question("Which of these is a mammal?", "Bat", ("Crow", "Moth", "Owl")),
+        ),
+    ],
+)
+def test_different_questions_are_not_duplicates(first, second):
+    bank = QuestionBank(":memory:")
+    bank.add_question(first)
+    assert bank.find_duplicate(second) is None
+    assert bank.add_questions([(second, ())]) != [None]
+
+
+@pytest.mark.parametrize(
+    "first, second, kind",
+    [
+        (
+            question("What is the capital of France?", "Paris"),
+            question("what is the capital of France", "paris"),
+            "exact",
+        ),
+        (
+            question("Which city is the capital of France?", "Paris"),
+            question("What city is the capital of France?", "Paris"),
+            "near",
+        ),
+    ],
+)
+def test_repeats_with_the_same_answer_are_duplicates(first, second, kind):
+    bank = QuestionBank(":memory:")
+    first_id = bank.add_question(first)
+    assert bank.find_duplicate(second) == (kind, first_id)
+    assert bank.add_question(second) is None
+    assert bank.add_question(second, skip_duplicates=False) is not None
+
+
+def test_old_index_is_rebuilt_with_current_normalization(tmp_path):
+    path = str(tmp_path / "bank.db")
+    bank = QuestionBank(path)
+    first_id = bank.add_question(question("What is 2+2?", "4"))
+    bank.close()
+    connection = sqlite3.connect(path)
+    with connection:
+        connection.execute("UPDATE question_fingerprints SET fingerprint = 0")
+        connection.execute("PRAGMA user_version = 0")
+    connection.close()
+    bank = QuestionBank(path)
+    assert bank.find_duplicate(question("what is 2 + 2", "4")) == ("exact", first_id)
+
+
+@pytest.fixture
+def verified(monkeypatch):
+    calls = []
+
+    def is_near_duplicate(sketch, signature):
+        calls.append(signature)
+        return False
+
+    monkeypatch.setattr(QuestionSketch, "is_near_duplicate", is_near_duplicate)
+    return calls
+
+
+def test_questions_with_other_answers_are_never_candidates(verified):
+    bank = QuestionBank(":memory:")
+    bank.add_questions(
+        (question(f"What is {i} + {i}?", str(2 * i)), ()) for i in range(2000)
+    )
+    assert verified == []
+
+
+def test_candidates_are_capped_in_a_crowded_bucket(verified):
+    bank = QuestionBank(":memory:")
+    repeated = question("Which city is the capital of France?", "Paris")
+    bank.add_questions([(repeated, ())] * 300, skip_duplicates=False)
+    rephrased = question("What city is the capital of France?", "Paris")
+    assert bank.find_duplicate(rephrased) is None
+    assert len(verified) == storage.DUPLICATE_CANDIDATES
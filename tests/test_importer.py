@@ -0,0 +1,105 @@
+import io
+import json
+
+import pytest
+
+import importer
+from importer import import_file, read_json_array, validate_record
+from storage import QuestionBank
+
+VALID = {
+    "question": "What is the capital of Spain?",
+    "correct_answer": "Madrid",
+    "incorrect_answers": ["Lisbon", "Rome", "Paris"],
+}
+
+
+def write_lines(path, records):
+    path.write_text("".join(json.dumps(record) + "\n" for record in records))
+    return str(path)
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        {"incorrect_answers": 5},
+        {"incorrect_answers": "abc"},
+        {"incorrect_answers": ["Lisbon", "Rome", 3]},
+        {"answers": ["Madrid", "x"]},
+        {"answers": "Madrid"},
+        {"tags": 7},
+        {"tags": ["geography", 7]},
+    ],
+)
+def test_malformed_rows_raise_value_error(changes):
+    with pytest.raises(ValueError):
+        validate_record({**VALID, **changes})
+
+
+def test_valid_row_with_answer_objects_and_string_tag():
+    question, tags = validate_record(
+        {
+            "question": " What is 2 + 2? ",
+            "answers": [
+                {"text": "4", "correct": True},
+                {"text": "3"},
+                {"text": "5"},
+                {"text": "22"},
+            ],
+            "tags": "maths",
+        }
+    )
+    assert question == {
+        "question": "What is 2 + 2?",
+        "correct_answer": "4",
+        "incorrect_answers": ["3", "5", "22"],
+    }
+    assert tags == ["maths"]
+
+
+def test_bad_rows_are_reported_and_the_rest_imported(tmp_path):
+    path = write_lines(
+        tmp_path / "bank.jsonl",
+        [
+            {**VALID, "incorrect_answers": 5},
+            {**VALID, "question": "Capital of Italy?", "answers": ["Rome", "x"]},
+            {**VALID, "question": "Capital of France?", "tags": 7},
+            {**VALID, "question": "Capital of Peru?", "incorrect_answers": "abc"},
+            VALID,
+        ],
+    )
+    bank = QuestionBank(":memory:")
+    report = import_file(path, bank)
+    assert report.rows == 5
+    assert report.imported == 1
+    assert [row for row, _ in report.errors] == [1, 2, 3, 4]
+    assert bank.page(0, 10)[0]["incorrect_answers"] == ["Lisbon", "Rome", "Paris"]
+
+
+class CountingReader(io.StringIO):
+    def __init__(self, text):
+        super().__init__(text)
+        self.characters_read = 0
+
+    def read(self, size=-1):
+        data = super().read(size)
+        self.characters_read += len(data)
+        return data
+
+
+def test_json_array_stops_at_a_syntax_error_without_reading_the_rest():
+    filler = ", ".join([json.dumps(VALID)] * 200_000)
+    file = CountingReader(f'[{json.dumps(VALID)}, {{"question": oops}}, {filler}]')
+    rows = list(read_json_array(file))
+    assert rows[0] == (1, VALID)
+    assert isinstance(rows[1][1], ValueError)
+    assert len(rows) == 2
+    limit = importer.MAX_JSON_RECORD_SIZE + 2 * importer.JSON_CHUNK_SIZE
+    assert file.characters_read < limit < len(file.getvalue())
+
+
+def test_json_array_records_across_chunk_boundaries(monkeypatch):
+    monkeypatch.setattr(importer, "JSON_CHUNK_SIZE", 7)
+    records = [{**VALID, "question": f"Question {i}?"} for i in range(20)]
+    rows = list(read_json_array(io.StringIO(json.dumps(records))))
+    assert [record for _, record in rows] == records
@@ -0,0 +1,65 @@
+import pytest
+
+from leaderboard import Leaderboard
+
+SCORES = [("ann", 50), ("bob", 80), ("cy", 50), ("dee", 100), ("eve", 80), ("fay", 0)]
+
+
+@pytest.fixture
+def leaderboard():
+    leaderboard = Leaderboard()
+    for name, points in SCORES:
+        leaderboard.add(name, points)
+    return leaderboard
+
+
+def expected_rows(scores):
+    # The scoreboard before the leaderboard: a stable sort of the scores
+    # dict, each row showing how far it trails the row above
+    ranked = sorted(scores.items(), key=lambda item: -item[1])
+    return [
+        (rank, name, score, None if rank == 1 else ranked[rank - 2][1] - score)
+        for rank, (name, score) in enumerate(ranked, 1)
+    ]
+
+
+def test_ties_keep_the_order_players_first_scored(leaderboard):
+    assert leaderboard.top(6) == [
+        (1, "dee", 100, None),
+        (2, "bob", 80, 20),
+        (3, "eve", 80, 0),
+        (4, "ann", 50, 30),
+        (5, "cy", 50, 0),
+        (6, "fay", 0, 50),
+    ]
+    for rank, name in enumerate(["dee", "bob", "eve", "ann", "cy", "fay"], 1):
+        assert leaderboard.rank(name) == rank
+
+
+def test_ranks_follow_every_add(leaderboard):
+    scores = dict(SCORES)
+    for name, points in [("fay", 60), ("cy", 50), ("eve", 20), ("ann", 0), ("gus", 80)]:
+        scores[name] = scores.get(name, 0) + points
+        assert leaderboard.add(name, points) == scores[name]
+        assert leaderboard.top(len(scores)) == expected_rows(scores)
+        for rank, name, score, _ in expected_rows(scores):
+            assert leaderboard.rank(name) == rank
+            assert leaderboard.score(name) == score
+
+
+@pytest.mark.parametrize("limit", [1, 2, 4, 6])
+def test_pages_split_the_board_and_keep_differences(leaderboard, limit):
+    rows = expected_rows(dict(SCORES))
+    for offset in range(0, len(rows), limit):
+        # The first row of a page still trails the last row of the one before
+        assert leaderboard.page(offset, limit) == rows[offset : offset + limit]
+    assert leaderboard.page(len(rows), limit) == []
+    assert leaderboard.page(len(rows) + 3, limit) == []
+
+
+def test_clear_starts_a_new_board(leaderboard):
+    leaderboard.clear()
+    assert len(leaderboard) == 0 and "ann" not in leaderboard
+    leaderboard.add("cy", 10)
+    leaderboard.add("ann", 10)
+    assert leaderboard.top(5) == [(1, "cy", 10, None), (2, "ann", 10, 0)]
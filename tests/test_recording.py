@@ -0,0 +1,56 @@
+import pygame
+import pytest
+
+import game
+from game import RecordingBank, ReplayBank
+from recording import SessionReader, SessionWriter
+from storage import QuestionBank
+
+
+def test_large_clipboard_and_text_input_round_trip(tmp_path):
+    path = str(tmp_path / "session.kqs")
+    pasted = "é" * 70_000
+    writer = SessionWriter(path)
+    writer.start(1)
+    writer.clipboard(pasted)
+    writer.events([pygame.event.Event(pygame.TEXTINPUT, text=pasted)])
+    writer.close()
+    reader = SessionReader(path)
+    assert reader.clipboard() == pasted
+    assert [event.text for event in reader.events()] == [pasted]
+
+
+def test_replayed_bank_answers_without_a_database(tmp_path):
+    path = str(tmp_path / "session.kqs")
+    bank = QuestionBank(":memory:")
+    question = {
+        "question": "What is 2+2?",
+        "correct_answer": "4",
+        "incorrect_answers": ["3", "5", "22"],
+    }
+    writer = SessionWriter(path)
+    writer.start(1)
+    recording = RecordingBank(bank, writer)
+    question_id = recording.add_question(question, ["maths"])
+    recorded = [
+        recording.page(0, 10),
+        recording.find_duplicate(question),
+        recording.count("maths"),
+    ]
+    writer.close()
+    replay = ReplayBank(SessionReader(path))
+    assert replay.add_question(question, ["maths"]) == question_id
+    assert [replay.page(0, 10), replay.find_duplicate(question)] == recorded[:2]
+    with pytest.raises(ValueError, match="diverged"):
+        replay.tags()
+
+
+def test_only_the_newest_recordings_are_kept(tmp_path, monkeypatch):
+    monkeypatch.setattr(game, "RECORDINGS_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(game, "RECORDINGS_KEPT", 3)
+    names = [f"session-20260101-00000{second}.kqs" for second in range(5)]
+    for name in names + ["keep-me.kqs"]:
+        (tmp_path / name).touch()
+    game.recording_path()
+    kept = sorted(path.name for path in tmp_path.iterdir())
+    assert kept == ["keep-me.kqs"] + names[3:]
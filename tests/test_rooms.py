@@ -0,0 +1,76 @@
+import asyncio
+import multiprocessing
+
+from analytics import AnswerStore
+from rooms import HostedRoom, RoomScheduler, RoomSpec
+from storage import QuestionBank
+
+
+class Writer:
+    def write(self, data):
+        pass
+
+
+def test_every_round_is_flushed_to_the_rooms_answer_store(tmp_path):
+    bank = QuestionBank(":memory:")
+    bank.add_questions(
+        (
+            {
+                "question": f"What is {i} + {i}?",
+                "correct_answer": str(2 * i),
+                "incorrect_answers": [str(2 * i + j) for j in range(1, 4)],
+            },
+            (),
+        )
+        for i in range(10)
+    )
+    spec = RoomSpec("room1", 0, seed=1, questions=3, lobby_seconds=0)
+    hosted = HostedRoom(spec, bank, str(tmp_path))
+    room = hosted.room
+    room.clients["ann"] = Writer()
+
+    async def start_game():
+        for index, question in enumerate(hosted.game.question_sets):
+            room.begin_question(index, question)
+            room.answer("ann", index, question["correct_answer"], room.started_at)
+
+    async def play(rounds):
+        hosted.server.start_game = start_game
+        task = asyncio.create_task(hosted.host())
+        while hosted.games < rounds:
+            await asyncio.sleep(0)
+        task.cancel()
+
+    asyncio.run(play(2))
+    assert len(hosted.game.analytics.columns["question_id"]) == 0
+    store = AnswerStore(str(tmp_path / "room1"))
+    assert len(store) == 6
+    assert all(row["correct_rate"] == 1.0 for row in store.question_stats())
+
+
+class DeadProcess:
+    exitcode = -9
+    closed = False
+
+    def is_alive(self):
+        return False
+
+    def close(self):
+        self.closed = True
+
+
+def test_a_crashed_workers_pipe_and_process_are_closed(monkeypatch):
+    scheduler = RoomScheduler([RoomSpec("room1", 0)], workers=1)
+    monkeypatch.setattr(scheduler, "spawn", lambda worker_id: None)
+    ended, writer = multiprocessing.Pipe(duplex=False)
+    crashed, _ = multiprocessing.Pipe(duplex=False)
+    writer.close()
+    scheduler.pipes = {0: ended}
+    scheduler.processes = {0: DeadProcess()}
+    scheduler.poll(timeout=0)
+    assert ended.closed
+    scheduler.pipes = {0: crashed}
+    process = scheduler.processes[0] = DeadProcess()
+    scheduler.check_workers()
+    assert crashed.closed and process.closed
+    assert scheduler.worker_restarts == [2]
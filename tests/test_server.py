@@ -0,0 +1,59 @@
+import random
+
+import server
+from server import Room
+from session import Game
+from storage import QuestionBank
+
+
+class Writer:
+    def write(self, data):
+        pass
+
+
+def build_room(seed, answer_log_limit=None):
+    bank = QuestionBank(":memory:")
+    bank.add_questions(
+        (
+            {
+                "question": f"What is {i} + {i}?",
+                "correct_answer": str(2 * i),
+                "incorrect_answers": [str(2 * i + j) for j in range(1, 4)],
+            },
+            (),
+        )
+        for i in range(20)
+    )
+    game = Game(bank, random.Random(seed), answer_log_limit=answer_log_limit)
+    game.start_round()
+    return Room(game, clock=lambda: 0.0)
+
+
+def shuffled_answers(room):
+    orders = []
+    for index, question in enumerate(room.game.question_sets):
+        room.begin_question(index, question)
+        orders.append(list(room.answers))
+    return orders
+
+
+def test_rooms_with_the_same_seed_ask_and_shuffle_alike():
+    random.seed(1)
+    first = shuffled_answers(build_room(7))
+    random.seed(2)
+    assert shuffled_answers(build_room(7)) == first
+    assert shuffled_answers(build_room(8)) != first
+
+
+def test_answer_history_is_bounded(monkeypatch):
+    monkeypatch.setattr(server, "HANDLING_TIMES_WINDOW", 5)
+    room = build_room(0, answer_log_limit=5)
+    for index, question in enumerate(room.game.question_sets):
+        room.begin_question(index, question)
+        for player in range(3):
+            name = f"player{player}"
+            room.clients[name] = Writer()
+            room.answer(name, index, question["correct_answer"], 1.0)
+    assert room.answer_count == 30
+    assert len(room.game.answer_log) == 5
+    assert len(room.handling_times) == 5
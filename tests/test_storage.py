@@ -0,0 +1,92 @@
+import random
+
+import pytest
+
+import storage
+from storage import QuestionBank
+
+
+@pytest.fixture
+def bank(monkeypatch):
+    monkeypatch.setattr(storage, "PAGE_BOUND_INTERVAL", 4)
+    bank = QuestionBank(":memory:")
+    bank.add_questions(
+        (
+            {
+                "question": f"Question {i} about {'rivers' if i % 3 else 'capitals'}?",
+                "correct_answer": "a",
+                "incorrect_answers": ["b", "c", "d"],
+            },
+            (),
+        )
+        for i in range(50)
+    )
+    return bank
+
+
+def expected_ids(bank, offset, limit, word=None):
+    ids = [
+        row[0]
+        for row in bank.connection.execute(
+            "SELECT id, question FROM questions ORDER BY id"
+        )
+        if word is None or word in row[1]
+    ]
+    return ids[offset : offset + limit]
+
+
+@pytest.mark.parametrize("search_enabled", [True, False])
+def test_pages_match_offsets_in_any_order(bank, search_enabled):
+    bank.search_enabled = bank.search_enabled and search_enabled
+    for offset in [0, 3, 4, 5, 46, 17, 2, 30, 29, 0]:
+        assert [q["id"] for q in bank.page(offset, 4)] == expected_ids(bank, offset, 4)
+    for offset in [0, 12, 8, 13, 1, 14]:
+        assert [q["id"] for q in bank.search("capitals", offset, 3)] == (
+            expected_ids(bank, offset, 3, "capitals")
+        )
+
+
+def test_page_bounds_are_dropped_when_questions_change(bank):
+    bank.page(40, 4)
+    assert bank._page_bounds
+    bank.add_question(
+        {"question": "New?", "correct_answer": "a", "incorrect_answers": ["b"] * 3}
+    )
+    assert not bank._page_bounds
+
+
+@pytest.mark.parametrize("misses", [storage.ROUND_SAMPLE_MISSES, 0])
+@pytest.mark.parametrize("tag, members", [(None, 50), ("capitals", 17), ("rare", 5)])
+def test_round_questions_sample_members_without_offset_scans(
+    bank, monkeypatch, tag, members, misses
+):
+    # With no misses allowed every draw falls back to reading the ids
+    monkeypatch.setattr(storage, "ROUND_SAMPLE_MISSES", misses)
+    rare = [{"question": f"Rare {i}?", "correct_answer": "a"} for i in range(3)]
+    bank.add_questions(
+        ({**question, "incorrect_answers": ["b", "c", "d"]}, ["rare"])
+        for question in rare
+    )
+    with bank.connection:
+        bank.connection.execute("DELETE FROM questions WHERE id IN (20, 21, 23)")
+    with bank.connection:
+        for tag_name, question_ids in (
+            ("capitals", range(1, 51, 3)),
+            ("rare", (2, 40)),
+        ):
+            for question_id in question_ids:
+                bank.connection.execute(
+                    "INSERT INTO question_tags (tag_id, question_id) VALUES (?, ?)",
+                    (bank.tag_id(tag_name), question_id),
+                )
+    statements = []
+    bank.connection.set_trace_callback(statements.append)
+    rng = random.Random(3)
+    drawn = set()
+    for _ in range(200):
+        round_ids = [q["id"] for q in bank.round_questions(3, tag, rng)]
+        assert len(round_ids) == 3 == len(set(round_ids))
+        drawn.update(round_ids)
+    assert not any("OFFSET" in statement for statement in statements)
+    assert len(drawn) == members
+    assert {q["id"] for q in bank.round_questions(members + 5, tag)} == drawn